@@ -0,0 +1,124 @@
+"""
+Cold-start cost of `bot.py`: a `python -X importtime` breakdown of `import bot` and the time to
+first byte of a fresh interpreter (spawn + import + first request), default vs FAST_STARTUP.
+
+    python benchmarks/bench_startup.py [--runs 10] [--path /] [--top 15]
+    python benchmarks/bench_startup.py --mongo-uri mongodb://127.0.0.1:27017 --template-cache
+
+Every run is a new process, so nothing is shared between samples. Without --mongo-uri the
+MongoClient is mongomock (no network), which isolates the Python-side cost. --template-cache
+first runs `flask compile-templates` into a temporary directory and points the FAST_STARTUP
+runs at it, i.e. the bytecode cache that would ship with the deployment.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CHILD = r"""
+import json, os, sys, time
+started = time.perf_counter()
+if not os.environ.get("BENCH_MONGO_URI"):
+    import mongomock, pymongo
+    pymongo.MongoClient = mongomock.MongoClient
+sys.path.insert(0, os.environ["BENCH_ROOT"])
+import bot
+imported = time.perf_counter()
+response = bot.app.test_client().get(os.environ["BENCH_PATH"])
+response.get_data()
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "request_ms": (done - imported) * 1000,
+                  "status": response.status_code}))
+"""
+
+
+def child_env(args, fast, template_cache=None):
+    env = dict(os.environ)
+    for name in ("BOT_TOKEN", "TMDB_API_KEY", "ADMIN_CHANNEL_ID", "BOT_USERNAME", "ADMIN_USERNAME",
+                 "ADMIN_PASSWORD", "ADMIN_USER_IDS", "MAIN_CHANNEL_LINK", "UPDATE_CHANNEL_LINK",
+                 "DEVELOPER_USER_LINK", "PUBLIC_CHANNEL_ID", "WEBSITE_URL"):
+        env.setdefault(name, "bench")
+    env.update(BENCH_ROOT=ROOT, BENCH_PATH=args.path, FAST_STARTUP="1" if fast else "0",
+               MONGO_URI=args.mongo_uri or "mongodb://127.0.0.1:27017/?serverSelectionTimeoutMS=500",
+               MONGO_DB_NAME=os.environ.get("MONGO_DB_NAME", "moviezone_bench"))
+    env.pop("JINJA_BYTECODE_CACHE_DIR", None)
+    if args.mongo_uri: env["BENCH_MONGO_URI"] = args.mongo_uri
+    if template_cache: env["JINJA_BYTECODE_CACHE_DIR"] = template_cache
+    return env
+
+
+def import_breakdown(env, top):
+    """Sum `-X importtime` self times per top-level package (self, not cumulative, so nothing is counted twice)."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD], env=env, cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    packages, total = {}, 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2: continue
+        own, _, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit(): continue
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(own) / 1000
+        total += int(own) / 1000
+    return total, sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+
+def measure(env, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", CHILD], env=env, cwd=ROOT, capture_output=True, text=True)
+        total = (time.perf_counter() - started) * 1000
+        if result.returncode != 0:
+            sys.exit(f"child failed:\n{result.stdout}{result.stderr}")
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        sample["ttfb_ms"] = total
+        samples.append(sample)
+    return samples
+
+
+def compile_template_cache(env):
+    out_dir = tempfile.mkdtemp(prefix="moviezone-templates-")
+    subprocess.run([sys.executable, "-m", "flask", "compile-templates", "--out", out_dir],
+                   env={**env, "FLASK_APP": "bot"}, cwd=ROOT, capture_output=True, text=True, check=True)
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--mongo-uri", help="real mongod instead of mongomock")
+    parser.add_argument("--template-cache", action="store_true", help="use a precompiled template bytecode cache")
+    args = parser.parse_args()
+
+    template_cache = compile_template_cache(child_env(args, fast=True)) if args.template_cache else None
+    modes = [("default", child_env(args, fast=False)), ("FAST_STARTUP", child_env(args, fast=True, template_cache=template_cache))]
+
+    for label, env in modes:
+        total, packages = import_breakdown(env, args.top)
+        print(f"\n-X importtime, {label}: {total:.1f} ms total (top {args.top} packages, self ms)")
+        for package, ms in packages:
+            print(f"  {package:<28}{ms:>10.1f}")
+
+    print(f"\n{'mode':<16}{'import ms':>12}{'1st req ms':>12}{'TTFB p50':>12}{'TTFB max':>12}  status")
+    results = {}
+    for label, env in modes:
+        samples = measure(env, args.runs)
+        ttfb = [sample["ttfb_ms"] for sample in samples]
+        results[label] = statistics.median(ttfb)
+        print(f"{label:<16}{statistics.median(s['import_ms'] for s in samples):>12.1f}"
+              f"{statistics.median(s['request_ms'] for s in samples):>12.1f}{results[label]:>12.1f}{max(ttfb):>12.1f}"
+              f"  {samples[-1]['status']}")
+    print(f"\nTTFB reduction: {results['default'] - results['FAST_STARTUP']:.1f} ms "
+          f"({(1 - results['FAST_STARTUP'] / results['default']) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Per-request template render latency: `render_template_string` (old path) vs the
+precompiled template registry (`render_page`).
+
+    python benchmarks/bench_templates.py [--iterations 500] [--episodes 200]
+
+MongoDB is not needed: the settings lookup done by the context processor is
+replaced with an empty in-memory result so only template work is measured.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+for _name in ("BOT_TOKEN", "TMDB_API_KEY", "ADMIN_CHANNEL_ID", "BOT_USERNAME", "ADMIN_USERNAME",
+              "ADMIN_PASSWORD", "ADMIN_USER_IDS", "MAIN_CHANNEL_LINK", "UPDATE_CHANNEL_LINK",
+              "DEVELOPER_USER_LINK", "PUBLIC_CHANNEL_ID", "WEBSITE_URL"):
+    os.environ.setdefault(_name, "bench")
+os.environ.setdefault("MONGO_URI", "mongodb://127.0.0.1:27017/?serverSelectionTimeoutMS=100")
+
+from flask import render_template_string  # noqa: E402
+import bot  # noqa: E402
+
+
+class _EmptySettings:
+    def find_one(self, *args, **kwargs):
+        return {}
+
+
+def _card(i):
+    return {"_id": f"{i:024x}", "title": f"Title {i}", "poster": f"https://image.tmdb.org/t/p/w500/{i}.jpg",
+            "poster_badge": "Hindi" if i % 3 else None, "vote_average": 7.3, "release_date": "2023-05-01",
+            "overview": "Lorem ipsum dolor sit amet " * 8, "type": "movie",
+            "watch_links": [{"lang": "Hindi", "url": "https://example.com/w"}]}
+
+
+def homepage_context():
+    shelf = [_card(i) for i in range(bot.HOME_SHELF_LIMIT)]
+    return {"trending_movies": shelf, "latest_movies": shelf, "latest_series": shelf, "coming_soon_movies": shelf,
+            "recently_added_full": shelf, "recently_added": shelf[:bot.HOME_HERO_LIMIT],
+            "all_badges": ["Bangla", "Dual Audio", "Hindi", "English"], "is_full_page_list": False, "query": ""}
+
+
+def series_context(episodes):
+    links = [{"lang": "Hindi", "url": "https://example.com/a"}, {"lang": "English", "url": "https://example.com/b"}]
+    movie = {**_card(0), "type": "series", "genres": ["Drama", "Crime"], "languages": ["Hindi"], "view_count": 12345,
+             "season_packs": [{"season": s, "watch_links": links, "download_links": links, "message_id": 10 + s} for s in range(1, 5)],
+             "episodes": [{"season": 1 + i // 50, "episode_number": 1 + i % 50, "title": f"Episode {i}", "watch_links": links,
+                           "download_links": links, "message_id": 1000 + i} for i in range(episodes)]}
+    return {"movie": movie, "trailer_key": "dQw4w9WgXcQ", "related_movies": [_card(i) for i in range(12)]}
+
+
+def measure(render, iterations):
+    render()  # warm-up
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        render()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--episodes", type=int, default=200)
+    args = parser.parse_args()
+
+    bot.settings = _EmptySettings()
+    cases = [
+        ("homepage", "/", bot.index_html, "index.html", homepage_context()),
+        (f"series detail ({args.episodes} episodes)", "/movie/" + "0" * 24, bot.detail_html, "detail.html", series_context(args.episodes)),
+    ]
+    print(f"{'page':<32}{'path':<26}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for label, path, source, name, context in cases:
+        with bot.app.test_request_context(path):
+            before = measure(lambda: render_template_string(source, **context), args.iterations)
+            after = measure(lambda: bot.render_page(name, **context), args.iterations)
+        for variant, (mean, p50, p95) in (("render_template_string", before), ("precompiled", after)):
+            print(f"{label:<32}{variant:<26}{mean:>10.3f}{p50:>10.3f}{p95:>10.3f}")
+        print(f"{'':<32}{'speed-up':<26}{before[0] / after[0]:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+End-to-end load test: seeds a synthetic catalog, serves the app on a local port and drives the
+public pages, admin and webhook at a fixed concurrency, reporting p50/p95/p99 and req/s.
+
+    python benchmarks/load_test.py [--titles 2000] [--episodes 200] [--concurrency 16] [--requests 400]
+    python benchmarks/load_test.py --mongo-uri mongodb://127.0.0.1:27017 --save baseline.json
+    python benchmarks/load_test.py --mongo-uri mongodb://127.0.0.1:27017 --baseline baseline.json
+
+Telegram and TMDb are replaced by a local HTTP stub (TELEGRAM_API_BASE / TMDB_API_URL), so no
+network access or real tokens are needed. Without --mongo-uri the catalog lives in mongomock,
+which is fine for comparing Python-side changes but does not reflect real query costs; use a
+local mongod for anything involving indexes. The benchmark database (MONGO_DB_NAME, default
+"moviezone_bench") is dropped before seeding.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+GENRES = ["Action", "Drama", "Comedy", "Thriller", "Crime", "Romance", "Horror", "Sci-Fi", "Animation", "Family"]
+BADGES = ["Hindi", "Bangla", "English", "Dual Audio", "Tamil", None]
+WORDS = ["dark", "night", "river", "king", "love", "story", "shadow", "city", "fire", "secret", "last", "road",
+         "moon", "storm", "hidden", "empire", "garden", "winter", "golden", "wild"]
+ADMIN_CHAT_ID = 1001
+
+
+# ----------------------------------------------------------------------
+# Telegram / TMDb stand-in
+# ----------------------------------------------------------------------
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body):
+        if self.latency: time.sleep(self.latency)
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._reply({"ok": True, "result": {"message_id": 1}})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if parts[0].startswith("bot"):
+            return self._reply({"ok": True, "result": {"message_id": 1}})
+        if len(parts) >= 3 and parts[1] == "search":
+            query = parse_qs(url.query).get("query", [""])[0]
+            return self._reply({"results": [{"id": zlib.crc32(query.lower().encode()) % 1_000_000 + 1}]})
+        tmdb_id = int(parts[-1])
+        return self._reply({"id": tmdb_id, "title": f"TMDb Title {tmdb_id}", "name": f"TMDb Title {tmdb_id}",
+                            "poster_path": f"/{tmdb_id}.jpg", "overview": "A synthetic overview for benchmarking.",
+                            "release_date": "2021-06-01", "first_air_date": "2021-06-01", "vote_average": 7.1,
+                            "genres": [{"name": GENRES[tmdb_id % len(GENRES)]}], "spoken_languages": [{"english_name": "Hindi"}],
+                            "videos": {"results": [{"key": "dQw4w9WgXcQ", "type": "Trailer", "site": "YouTube"}]}})
+
+
+def start_server(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ----------------------------------------------------------------------
+# Environment and catalog
+# ----------------------------------------------------------------------
+def configure_environment(args, stub_port):
+    stub = f"http://127.0.0.1:{stub_port}"
+    env = {"BOT_TOKEN": "bench", "TMDB_API_KEY": "bench", "ADMIN_CHANNEL_ID": "-100123", "BOT_USERNAME": "bench_bot",
+           "ADMIN_USERNAME": "admin", "ADMIN_PASSWORD": "admin", "ADMIN_USER_IDS": str(ADMIN_CHAT_ID),
+           "MAIN_CHANNEL_LINK": "https://t.me/bench", "UPDATE_CHANNEL_LINK": "https://t.me/bench",
+           "DEVELOPER_USER_LINK": "https://t.me/bench", "PUBLIC_CHANNEL_ID": "-100456", "WEBSITE_URL": "http://127.0.0.1",
+           "TELEGRAM_API_BASE": stub, "TMDB_API_URL": f"{stub}/3", "TMDB_RATE_LIMIT": "1000",
+           "MONGO_DB_NAME": os.environ.get("MONGO_DB_NAME", "moviezone_bench"),
+           "MONGO_URI": args.mongo_uri or "mongodb://127.0.0.1:27017/?serverSelectionTimeoutMS=500"}
+    if args.cold:
+        env.update(PAGE_CACHE_TTL="0", HOMEPAGE_CACHE_TTL="0")
+    os.environ.update(env)
+    if not args.mongo_uri:
+        import mongomock
+        import pymongo
+        pymongo.MongoClient = mongomock.MongoClient
+
+
+def make_title(rng, index):
+    return " ".join(rng.sample(WORDS, 2)).title() + f" {index}"
+
+
+def seed_catalog(bot, args):
+    rng = random.Random(args.seed)
+    bot.db.client.drop_database(bot.db.name)
+    now = datetime.now(timezone.utc)
+    links = [{"lang": "Hindi", "url": "https://example.com/w"}, {"lang": "English", "url": "https://example.com/e"}]
+    series_count = int(args.titles * args.series_fraction)
+    docs, media = [], {}
+    for index in range(args.titles):
+        is_series = index < series_count
+        doc = {"title": make_title(rng, index), "type": "series" if is_series else "movie", "tmdb_id": 10_000_000 + index,
+               "poster": f"https://image.tmdb.org/t/p/w500/{index}.jpg", "overview": " ".join(rng.choices(WORDS, k=30)),
+               "release_date": f"{rng.randint(1990, 2024)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+               "genres": rng.sample(GENRES, rng.randint(1, 3)), "languages": ["Hindi"], "poster_badge": rng.choice(BADGES),
+               "vote_average": round(rng.uniform(4, 9), 1), "is_trending": rng.random() < 0.05,
+               "is_coming_soon": rng.random() < 0.03, "created_at": now - timedelta(minutes=index),
+               "view_count": rng.randint(0, 100_000)}
+        if is_series:
+            episodes = [{"season": 1 + e // 50, "episode_number": 1 + e % 50, "title": f"Episode {1 + e % 50}",
+                         "watch_links": links, "download_links": links, "message_id": 1000 + e} for e in range(args.episodes)]
+            packs = [{"season": s, "watch_links": links, "download_links": links, "message_id": 50 + s}
+                     for s in range(1, 2 + args.episodes // 50)]
+            if bot.EPISODES_IN_COLLECTION:
+                media[index] = (episodes, packs)
+            else:
+                doc.update(episodes=episodes, season_packs=packs)
+        else:
+            doc.update(watch_links=links, download_links=links, files=[{"quality": "720p", "message_id": 10 + index}])
+        docs.append(doc)
+    bot.movies.insert_many(docs)
+    for index, (episodes, packs) in media.items():
+        bot.write_media(docs[index]["_id"], "episode", episodes)
+        bot.write_media(docs[index]["_id"], "pack", packs)
+    bot.feedback.insert_many([{"type": "Movie Request", "content_title": make_title(rng, i), "message": "Please add",
+                               "email": "", "timestamp": now - timedelta(hours=i)} for i in range(200)])
+    if args.mongo_uri:
+        bot.ensure_indexes()
+    bot.invalidate_catalog_cache()
+    return docs
+
+
+# ----------------------------------------------------------------------
+# Scenarios
+# ----------------------------------------------------------------------
+def build_scenarios(docs, args):
+    rng = random.Random(args.seed + 1)
+    update_ids = count(int(time.time() * 1000))
+    series = [d for d in docs if d["type"] == "series"]
+    films = [d for d in docs if d["type"] == "movie"]
+    admin = ("admin", "admin")
+
+    def webhook(text, chat_id):
+        return {"update_id": next(update_ids), "message": {"message_id": 1, "chat": {"id": chat_id}, "text": text}}
+
+    def start_payload():
+        if series and rng.random() < 0.6:
+            doc = rng.choice(series)
+            episode = rng.randrange(max(args.episodes, 1))
+            return f"{doc['_id']}_{1 + episode // 50}_{1 + episode % 50}"
+        return f"{rng.choice(films)['_id']}_720p"
+
+    return {
+        "home": lambda: ("GET", "/", {}),
+        "movie_detail": lambda: ("GET", f"/movie/{rng.choice(films)['_id']}", {}),
+        "series_detail": lambda: ("GET", f"/movie/{rng.choice(series or films)['_id']}", {}),
+        "genre": lambda: ("GET", f"/genre/{rng.choice(GENRES)}", {}),
+        "search": lambda: ("GET", f"/?q={rng.choice(WORDS)}", {}),
+        "admin": lambda: ("GET", "/admin", {"auth": admin}),
+        "admin_api": lambda: ("GET", "/admin/api/content?sort=view_count&limit=50", {"auth": admin}),
+        "webhook_start": lambda: ("POST", "/webhook", {"json": webhook(f"/start {start_payload()}", 5000 + rng.randrange(500))}),
+        "webhook_add": lambda: ("POST", "/webhook", {"json": webhook(f"/add {make_title(rng, rng.randrange(10**6))} (2021) [Hindi] | Hindi: https://example.com/w | 720p: https://example.com/d", ADMIN_CHAT_ID)}),
+    }
+
+
+def percentile(samples, fraction):
+    return samples[max(math.ceil(fraction * len(samples)) - 1, 0)] if samples else float("nan")
+
+
+def run_scenario(base_url, make_request, total, concurrency):
+    import requests
+    local = threading.local()
+    remaining = count()
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def worker():
+        session = getattr(local, "session", None) or requests.Session()
+        local.session = session
+        while next(remaining) < total:
+            method, path, kwargs = make_request()
+            started = time.perf_counter()
+            try:
+                response = session.request(method, base_url + path, timeout=30, **kwargs)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if not ok: errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]: future.result()
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {"requests": len(latencies), "errors": errors[0], "rps": round(len(latencies) / wall, 1),
+            "p50": round(percentile(latencies, 0.50), 2), "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2)}
+
+
+def print_report(results, baseline):
+    print(f"\n{'scenario':<16}{'reqs':>7}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in results.items():
+        print(f"{name:<16}{row['requests']:>7}{row['errors']:>8}{row['rps']:>10}{row['p50']:>10}{row['p95']:>10}{row['p99']:>10}")
+        before = baseline.get(name)
+        if before:
+            delta = lambda key: f"{(row[key] - before[key]) / before[key] * 100:+.0f}%" if before[key] else "n/a"
+            print(f"{'  vs baseline':<16}{'':>7}{'':>8}{delta('rps'):>10}{delta('p50'):>10}{delta('p95'):>10}{delta('p99'):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--titles", type=int, default=2000)
+    parser.add_argument("--series-fraction", type=float, default=0.2)
+    parser.add_argument("--episodes", type=int, default=200, help="episodes per series")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400, help="requests per scenario")
+    parser.add_argument("--scenarios", help="comma-separated subset of scenarios to run")
+    parser.add_argument("--mongo-uri", help="local mongod to use instead of mongomock")
+    parser.add_argument("--base-url", help="drive an already running server (same MONGO_URI/MONGO_DB_NAME) instead of an in-process one")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="artificial Telegram/TMDb latency")
+    parser.add_argument("--cold", action="store_true", help="disable the page and homepage caches")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against a JSON file written by --save")
+    args = parser.parse_args()
+
+    StubHandler.latency = args.stub_latency_ms / 1000
+    stub = start_server(ThreadingHTTPServer(("127.0.0.1", 0), StubHandler))
+    configure_environment(args, stub.server_address[1])
+
+    import bot
+    print(f"INFO: Seeding {args.titles} titles ({args.series_fraction:.0%} series x {args.episodes} episodes)...")
+    started = time.perf_counter()
+    docs = seed_catalog(bot, args)
+    print(f"INFO: Seeded in {time.perf_counter() - started:.1f}s.")
+
+    if args.base_url:
+        base_url = args.base_url.rstrip("/")
+    else:
+        from werkzeug.serving import make_server
+        server = start_server(make_server("127.0.0.1", 0, bot.app, threaded=True))
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+    scenarios = build_scenarios(docs, args)
+    selected = args.scenarios.split(",") if args.scenarios else list(scenarios)
+    results = {}
+    for name in selected:
+        run_scenario(base_url, scenarios[name], min(args.concurrency * 2, args.requests), args.concurrency)  # warm-up
+        results[name] = run_scenario(base_url, scenarios[name], args.requests, args.concurrency)
+        print(f"INFO: {name}: {results[name]['rps']} req/s, p95 {results[name]['p95']} ms")
+    bot.update_workers.drain(30)
+    bot.telegram.drain(30)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
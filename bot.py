@@ -1,14 +1,62 @@
 import os
 import sys
 import re
-import requests
+import time
+import threading
+import atexit
+import queue
+import importlib
 import json
-from flask import Flask, render_template_string, request, redirect, url_for, Response, jsonify
-from pymongo import MongoClient
+import hashlib
+import bisect
+import heapq
+import math
+import base64
+import io
+import tempfile
+import cProfile
+import pstats
+import csv
+import gzip
+import zlib
+import fcntl
+import click
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, request, redirect, url_for, Response, jsonify, g, stream_with_context
+from pymongo import MongoClient, IndexModel, UpdateOne, ReplaceOne, ReturnDocument, monitoring
+from pymongo.errors import DuplicateKeyError
+from bson import json_util
 from bson.objectid import ObjectId
 from functools import wraps
+from urllib.parse import unquote
+from xml.sax.saxutils import escape as xml_escape
 from datetime import datetime, timedelta, timezone
-from apscheduler.schedulers.background import BackgroundScheduler
+from jinja2 import ChoiceLoader, DictLoader, FileSystemBytecodeCache
+
+class LazyModule:
+    """প্রথম attribute ব্যবহারের সময় মডিউল import করে, যাতে কোল্ড স্টার্টে অপ্রয়োজনীয় import-এর খরচ না লাগে।"""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None: self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+# শুধু webhook/TMDb/Telegram কলে লাগে; সাধারণ পেজ রিকোয়েস্টে import হয় না
+requests = LazyModule("requests")
+
+# ঐচ্ছিক: থাকলে API দ্রুত JSON এনকোডিং ও brotli কমপ্রেশন ব্যবহার করে
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # ======================================================================
 # --- আপনার ব্যক্তিগত ও অ্যাডমিন তথ্য (এনভায়রনমেন্ট থেকে লোড হবে) ---
@@ -16,6 +64,7 @@ from apscheduler.schedulers.background import BackgroundScheduler
 MONGO_URI = os.environ.get("MONGO_URI")
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
 TMDB_API_KEY = os.environ.get("TMDB_API_KEY")
+TMDB_API_URL = os.environ.get("TMDB_API_URL", "https://api.themoviedb.org/3")
 ADMIN_CHANNEL_ID = os.environ.get("ADMIN_CHANNEL_ID")
 BOT_USERNAME = os.environ.get("BOT_USERNAME")
 ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME")
@@ -47,9 +96,19 @@ if missing_vars:
 # ======================================================================
 # --- অ্যাপ্লিকেশন সেটআপ এবং অন্যান্য ফাংশন ---
 # ======================================================================
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{BOT_TOKEN}"
+TELEGRAM_API_BASE = os.environ.get("TELEGRAM_API_BASE", "https://api.telegram.org").rstrip("/")
+TELEGRAM_API_URL = f"{TELEGRAM_API_BASE}/bot{BOT_TOKEN}"
 app = Flask(__name__)
 
+def env_flag(name, default=False):
+    value = os.environ.get(name)
+    return default if value is None else value.strip().lower() in ("1", "true", "yes", "on")
+
+# Vercel-এ রেসপন্স ফেরত দেওয়ার পর ফাংশন ফ্রিজ হয়ে যায়, তাই ব্যাকগ্রাউন্ড থ্রেডের ওপর ভরসা করা যায় না
+SERVERLESS = bool(os.environ.get("VERCEL"))
+# serverless মোড: Mongo ক্লায়েন্ট ও টেমপ্লেট প্রথম ব্যবহারের সময় তৈরি হয়, import-এর সময় নয়
+FAST_STARTUP = env_flag("FAST_STARTUP", default=SERVERLESS)
+
 def check_auth(username, password): return username == ADMIN_USERNAME and password == ADMIN_PASSWORD
 def authenticate(): return Response('Could not verify your access level.', 401, {'WWW-Authenticate': 'Basic realm="Login Required"'})
 
@@ -62,18 +121,265 @@ def requires_auth(f):
         return f(*args, **kwargs)
     return decorated
 
-try:
-    client = MongoClient(MONGO_URI)
-    db = client["movie_db"]
-    movies, settings, feedback = db["movies"], db["settings"], db["feedback"]
-    print("SUCCESS: Successfully connected to MongoDB!")
-except Exception as e:
-    print(f"FATAL: Error connecting to MongoDB: {e}. Exiting.")
-    sys.exit(1)
+# ======================================================================
+# --- Metrics & Profiling (Prometheus text format) ---
+# ======================================================================
+METRIC_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+class Metrics:
+    """
+    প্রসেসের ভেতরের হালকা histogram/counter রেজিস্ট্রি। `/metrics` এগুলো Prometheus text
+    format-এ দেয়। মেট্রিক প্রথমবার ব্যবহারের আগে `describe()` করতে হয়।
+    """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._help = {}
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, kind, help_text):
+        self._help[name] = (kind, help_text)
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None: series = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def render(self, gauges=()):
+        """Prometheus exposition format। `gauges`: স্ক্রেপের সময় পড়া (name, help, value) তালিকা।"""
+        with self._lock:
+            histograms = {key: ([*value[0]], value[1], value[2]) for key, value in self._histograms.items()}
+            counters = dict(self._counters)
+        lines = []
+        for name in sorted({key[0] for key in histograms} | {key[0] for key in counters}):
+            kind, help_text = self._help.get(name, ("untyped", name))
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name: continue
+                cumulative = 0
+                for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{format_labels(labels, le=bound)} {cumulative}")
+                lines += [f"{name}_sum{format_labels(labels)} {total:.6f}", f"{name}_count{format_labels(labels)} {count}"]
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name: lines.append(f"{name}{format_labels(labels)} {value}")
+        for name, help_text, value in gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+def format_labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    if not pairs: return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+metrics = Metrics(METRIC_BUCKETS)
+metrics.describe("http_request_duration_seconds", "histogram", "Flask request latency by endpoint, method and status.")
+metrics.describe("mongo_command_duration_seconds", "histogram", "MongoDB command latency by command and collection.")
+metrics.describe("mongo_command_failures_total", "counter", "Failed MongoDB commands.")
+metrics.describe("template_render_duration_seconds", "histogram", "Precompiled Jinja template render time.")
+metrics.describe("context_processor_duration_seconds", "histogram", "Time spent in the global template context processor.")
+metrics.describe("telegram_request_duration_seconds", "histogram", "Telegram Bot API call latency by method.")
+metrics.describe("telegram_errors_total", "counter", "Failed Telegram Bot API calls by method and reason.")
+metrics.describe("tmdb_request_duration_seconds", "histogram", "TMDb API call latency by endpoint.")
+metrics.describe("tmdb_errors_total", "counter", "Failed TMDb API calls by endpoint and reason.")
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """প্রতিটি Mongo কমান্ডের সময় (driver-এর মাপা duration) histogram-এ যোগ করে।"""
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._collections[event.request_id] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event):
+        collection = self._collections.pop(event.request_id, "")
+        metrics.observe("mongo_command_duration_seconds", event.duration_micros / 1e6, command=event.command_name, collection=collection)
+
+    def failed(self, event):
+        collection = self._collections.pop(event.request_id, "")
+        metrics.observe("mongo_command_duration_seconds", event.duration_micros / 1e6, command=event.command_name, collection=collection)
+        metrics.inc("mongo_command_failures_total", command=event.command_name, collection=collection)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # অ্যাডমিন `X-Profile: 1` হেডার পাঠালে এই রিকোয়েস্টটি cProfile দিয়ে প্রোফাইল হবে
+    if request.headers.get("X-Profile") == "1":
+        auth = request.authorization
+        if auth and check_auth(auth.username, auth.password):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+@app.after_request
+def record_request_metrics(response):
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        report = io.StringIO()
+        limit = request.headers.get("X-Profile-Limit", "")
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(int(limit) if limit.isdigit() else 40)
+        response = Response(report.getvalue(), mimetype="text/plain", headers={"X-Profiled-Status": str(response.status_code)})
+    started = g.get("request_started")
+    if started is not None:
+        metrics.observe("http_request_duration_seconds", time.perf_counter() - started,
+                        endpoint=request.endpoint or "unmatched", method=request.method, status=response.status_code)
+    return response
+
+# ======================================================================
+# --- MongoDB Connection (lazy) ---
+# ======================================================================
+# serverless-এ একটি ইনস্ট্যান্স একসাথে কয়েকটি রিকোয়েস্টই চালায়, তাই পুল ছোট; ফ্রিজ হওয়া ইনস্ট্যান্সের
+# পুরোনো সকেট যাতে জমে না থাকে সেজন্য idle timeout, আর Mongo না পেলে ৩০ সেকেন্ড ঝুলে না থেকে দ্রুত এরর।
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE", 10 if FAST_STARTUP else 100)),
+    "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE", 0)),
+    "maxIdleTimeMS": int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", 60000)),
+    "serverSelectionTimeoutMS": int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+    "connectTimeoutMS": int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 5000)),
+}
+
+class LazyProxy:
+    """
+    প্রথমবার ব্যবহারের সময় `factory()` ডেকে আসল অবজেক্ট তৈরি করে, তারপর সব attribute/item সেখানে
+    পাঠায়। MongoClient তৈরি (mongodb+srv-এর DNS lookup, মনিটর থ্রেড) এভাবে import থেকে সরে যায়।
+    """
+    __slots__ = ("_factory", "_target", "_lock")
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __getitem__(self, key):
+        return self._resolve()[key]
+
+    def _resolve(self):
+        target = self._target
+        if target is None:
+            with self._lock:
+                if self._target is None: self._target = self._factory()
+                target = self._target
+        return target
+
+def connect_mongo():
+    started = time.perf_counter()
+    mongo_client = MongoClient(MONGO_URI, event_listeners=[MongoCommandTimer()], **MONGO_CLIENT_OPTIONS)
+    print(f"SUCCESS: MongoDB client created in {(time.perf_counter() - started) * 1000:.0f} ms.")
+    return mongo_client
+
+client = LazyProxy(connect_mongo)
+db = LazyProxy(lambda: client[os.environ.get("MONGO_DB_NAME", "movie_db")])
+def lazy_collection(name): return LazyProxy(lambda: db[name])
+movies, settings, feedback = lazy_collection("movies"), lazy_collection("settings"), lazy_collection("feedback")
+webhook_updates, tmdb_cache = lazy_collection("webhook_updates"), lazy_collection("tmdb_cache")
+episodes_collection, deeplinks, meta = lazy_collection("episodes"), lazy_collection("deeplinks"), lazy_collection("meta")
+import_jobs = lazy_collection("import_jobs")
+
+if not FAST_STARTUP:
+    # দীর্ঘমেয়াদী সার্ভারে (gunicorn) আগের মতো স্টার্টআপেই ভুল URI ধরা পড়ে
+    try:
+        db._resolve()
+    except Exception as e:
+        print(f"FATAL: Error connecting to MongoDB: {e}. Exiting.")
+        sys.exit(1)
+
+# ======================================================================
+# --- Settings / Ad-code Cache ---
+# ======================================================================
+SETTINGS_CACHE_TTL = int(os.environ.get("SETTINGS_CACHE_TTL", 300))
+
+class SettingsCache:
+    """
+    বিজ্ঞাপন কোডসহ `settings` ডকুমেন্ট প্রসেসের মেমোরিতে রাখে, যাতে প্রতিটি টেমপ্লেট রেন্ডারে
+    `find_one()` না চলে। TTL শেষে আবার লোড হয়; SETTINGS_CHANGE_STREAM চালু থাকলে (রেপ্লিকা সেট
+    লাগবে) অন্য ওয়ার্কারের পরিবর্তনেও সাথে সাথে ইনভ্যালিডেট হয়। `version` (শেয়ার করা ভার্সন
+    ফেরত দেয় এমন ফাংশন) দিলে ভার্সন বদলালেও আবার লোড হয়, তাই অন্য ওয়ার্কারে সেভ করা বিজ্ঞাপন
+    কোড TTL-এর অপেক্ষা ছাড়াই আসে।
+    """
+    def __init__(self, ttl, use_change_stream=False, version=None):
+        self.ttl = ttl
+        self.use_change_stream = use_change_stream
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._value = None
+        self._version = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def get(self):
+        version = self.version() if self.version else None
+        value = self._value
+        if value is not None and self._expires_at > time.monotonic() and self._version == version:
+            self.hits += 1
+            return value
+        with self._lock:
+            if self._value is None or self._expires_at <= time.monotonic() or self._version != version:
+                self.misses += 1
+                self._value = settings.find_one() or {}
+                self._expires_at = time.monotonic() + self.ttl
+                self._version = version
+            else:
+                self.hits += 1
+            value = self._value
+        if self.use_change_stream and self._watcher is None: self._start_watcher()
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": round(self.hits / total, 4) if total else None,
+                "ttl": self.ttl, "change_stream": self._watcher is not None and self._watcher.is_alive()}
+
+    def _start_watcher(self):
+        def watch():
+            try:
+                with settings.watch() as stream:
+                    for _ in stream:
+                        self.invalidate()
+                        page_cache.invalidate("settings")
+            except Exception as e:
+                print(f"WARNING: Settings change stream stopped, falling back to TTL refresh: {e}")
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=watch, name="settings-change-stream", daemon=True)
+                self._watcher.start()
+
+settings_cache = SettingsCache(SETTINGS_CACHE_TTL, env_flag("SETTINGS_CHANGE_STREAM"), lambda: current_catalog_version(settings_version))
 
 @app.context_processor
 def inject_global_vars():
-    ad_codes = settings.find_one() or {}
+    with metrics.timer("context_processor_duration_seconds"):
+        ad_codes = settings_cache.get()
     
     def format_links_for_edit(links_list):
         if not links_list or not isinstance(links_list, list): return ""
@@ -106,6 +412,231 @@ def parse_links_from_string(link_string: str) -> list:
             links.append({'lang': 'Link', 'url': part})
     return links
 
+# ======================================================================
+# --- Telegram Outbound Queue (rate-limit aware) ---
+# ======================================================================
+TELEGRAM_WORKERS = int(os.environ.get("TELEGRAM_WORKERS", 4))
+TELEGRAM_GLOBAL_RATE = 30          # সব চ্যাট মিলিয়ে প্রতি সেকেন্ডে সর্বোচ্চ মেসেজ
+TELEGRAM_PRIVATE_INTERVAL = 1.0    # একই প্রাইভেট চ্যাটে দুই মেসেজের মাঝে (সেকেন্ড)
+TELEGRAM_GROUP_INTERVAL = 3.0      # গ্রুপ/চ্যানেলে মিনিটে ২০টি
+TELEGRAM_MAX_RETRIES = 4
+TELEGRAM_TIMEOUT = 10
+TELEGRAM_SYNC_MAX_WAIT = 2.0       # sync মোডে রিকোয়েস্টের ভেতরে রিট্রাইয়ের মোট অপেক্ষা (সেকেন্ড)
+
+class RateLimiter:
+    """Token bucket; `acquire()` টোকেন না পাওয়া পর্যন্ত অপেক্ষা করে।"""
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class KeyedWorkerPool:
+    """
+    ব্যাকগ্রাউন্ড থ্রেড পুল। একই key-এর কাজ সবসময় একই থ্রেডে যায়, তাই এক চ্যাটের মেসেজ
+    ক্রম বজায় রেখে যায়; ভিন্ন key-এর কাজ সমান্তরালে চলে। প্রথম submit-এ থ্রেড চালু হয়।
+    `submit_at` দেরিতে চালানোর কাজ একটি টাইমার থ্রেডের heap-এ রাখে, তাই অপেক্ষায় কোনো ওয়ার্কার আটকে থাকে না।
+    """
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = max(workers, 1)
+        self._queues = []
+        self._lock = threading.Lock()
+        self._delayed = []
+        self._delayed_seq = 0
+        self._delayed_ready = threading.Condition()
+
+    def submit(self, key, fn, *args, **kwargs):
+        if not self._queues: self._start()
+        self._queues[hash(str(key)) % self.workers].put((fn, args, kwargs))
+
+    def submit_at(self, when, key, fn, *args, **kwargs):
+        """`when` (time.monotonic()) সময়ের আগে কাজটি ওয়ার্কারে যায় না।"""
+        if when <= time.monotonic(): return self.submit(key, fn, *args, **kwargs)
+        if not self._queues: self._start()
+        with self._delayed_ready:
+            self._delayed_seq += 1
+            heapq.heappush(self._delayed, (when, self._delayed_seq, key, fn, args, kwargs))
+            self._delayed_ready.notify()
+
+    def pending(self):
+        return sum(q.unfinished_tasks for q in self._queues) + len(self._delayed)
+
+    def drain(self, timeout=10):
+        """শাটডাউনের সময় বাকি কাজ শেষ হওয়ার জন্য সর্বোচ্চ `timeout` সেকেন্ড অপেক্ষা করে।"""
+        deadline = time.monotonic() + timeout
+        while self.pending() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def _start(self):
+        with self._lock:
+            if self._queues: return
+            queues = [queue.Queue() for _ in range(self.workers)]
+            for index, work_queue in enumerate(queues):
+                threading.Thread(target=self._run, args=(work_queue,), name=f"{self.name}-{index}", daemon=True).start()
+            threading.Thread(target=self._run_delayed, name=f"{self.name}-timer", daemon=True).start()
+            self._queues = queues
+            atexit.register(self.drain)
+
+    def _run_delayed(self):
+        while True:
+            with self._delayed_ready:
+                while not self._delayed or self._delayed[0][0] > time.monotonic():
+                    self._delayed_ready.wait(self._delayed[0][0] - time.monotonic() if self._delayed else None)
+                _, _, key, fn, args, kwargs = heapq.heappop(self._delayed)
+            self.submit(key, fn, *args, **kwargs)
+
+    def _run(self, work_queue):
+        while True:
+            fn, args, kwargs = work_queue.get()
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                print(f"ERROR: {self.name} task failed: {e}")
+            finally:
+                work_queue.task_done()
+
+class TelegramClient:
+    """
+    Telegram Bot API-তে মেসেজ পাঠানোর কিউ। persistent `requests.Session` (connection pooling)
+    ব্যবহার করে, গ্লোবাল ও প্রতি-চ্যাট লিমিট মেনে চলে, 429-এ `retry_after` অনুযায়ী অপেক্ষা
+    করে এবং নেটওয়ার্ক/5xx ত্রুটিতে exponential backoff দিয়ে আবার চেষ্টা করে।
+    কিউ মোডে প্রতিটি চ্যাটের মেসেজ আলাদা FIFO-তে থাকে এবং শুধু সামনেরটি পরের স্লট/রিট্রাইয়ের
+    সময়সহ (`submit_at`) ওয়ার্কারে যায়, তাই অপেক্ষার জন্য কোনো ওয়ার্কার থ্রেড ঘুমায় না।
+    TELEGRAM_SYNC_SEND চালু থাকলে (যেমন serverless) কিউ ছাড়াই সরাসরি পাঠায়; তখন প্রতি-চ্যাট
+    বিরতি নেই এবং রিট্রাইয়ের মোট অপেক্ষা TELEGRAM_SYNC_MAX_WAIT-এ সীমিত।
+    """
+    def __init__(self, api_url, workers, sync=False):
+        self.api_url = api_url
+        self.sync = sync
+        self.sent = 0
+        self.failed = 0
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._global_limiter = RateLimiter(TELEGRAM_GLOBAL_RATE)
+        self._chat_next_slot = {}
+        self._chat_pending = {}
+        self._chat_lock = threading.Lock()
+        self._pool = KeyedWorkerPool("telegram-sender", workers)
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self._pool.workers * 2)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def send(self, method, **payload):
+        """মেসেজ কিউতে রাখে (এক চ্যাটের মেসেজ ক্রমানুসারে যায়)।"""
+        if self.sync: return self.call(method, payload)
+        chat_id = payload.get("chat_id")
+        with self._chat_lock:
+            pending = self._chat_pending.setdefault(chat_id, deque())
+            pending.append((method, payload))
+            if len(pending) > 1: return  # আগেরটি পাঠানো হলে এটি নিজে থেকেই শিডিউল হবে
+            when = self._chat_next_slot.get(chat_id, 0.0)
+        self._pool.submit_at(when, chat_id, self._send_next, chat_id)
+
+    def send_message(self, chat_id, text, **kwargs):
+        return self.send("sendMessage", chat_id=chat_id, text=text, **kwargs)
+
+    def call(self, method, payload):
+        """সরাসরি API কল (রিট্রাইসহ)। Returns the decoded response or None on failure."""
+        waited = 0.0
+        for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+            self._global_limiter.acquire()
+            result, error, delay = self._post(method, payload, attempt)
+            if error is None: return result
+            # রিকোয়েস্টের ভেতরে চলে, তাই বড় retry_after-এর জন্য বসে না থেকে ব্যর্থ ধরা হয়
+            if delay is None or attempt == TELEGRAM_MAX_RETRIES or waited + delay > TELEGRAM_SYNC_MAX_WAIT: break
+            time.sleep(delay)
+            waited += delay
+        return self._give_up(method, payload, error)
+
+    def drain(self, timeout=10):
+        self._pool.drain(timeout)
+
+    def stats(self):
+        with self._chat_lock:
+            waiting = sum(len(pending) - 1 for pending in self._chat_pending.values())
+        return {"sent": self.sent, "failed": self.failed, "queued": self._pool.pending() + waiting, "sync": self.sync}
+
+    def _send_next(self, chat_id, attempt=0):
+        """কিউ ওয়ার্কারে চলে: চ্যাটের সামনের মেসেজ একবার পাঠায়; রিট্রাই বা পরের মেসেজ সময়সহ আবার কিউতে যায়।"""
+        with self._chat_lock:
+            method, payload = self._chat_pending[chat_id][0]
+        self._global_limiter.acquire()
+        result, error, delay = self._post(method, payload, attempt)
+        if error is not None:
+            if delay is not None and attempt < TELEGRAM_MAX_RETRIES:
+                return self._pool.submit_at(time.monotonic() + delay, chat_id, self._send_next, chat_id, attempt + 1)
+            self._give_up(method, payload, error)
+        interval = 0.0 if chat_id is None else TELEGRAM_GROUP_INTERVAL if str(chat_id).startswith(("-", "@")) else TELEGRAM_PRIVATE_INTERVAL
+        with self._chat_lock:
+            now = time.monotonic()
+            self._chat_next_slot[chat_id] = when = now + interval
+            if len(self._chat_next_slot) > 10000:
+                self._chat_next_slot = {key: value for key, value in self._chat_next_slot.items() if value > now}
+            pending = self._chat_pending[chat_id]
+            pending.popleft()
+            more = bool(pending)
+            if not more: del self._chat_pending[chat_id]
+        if more: self._pool.submit_at(when, chat_id, self._send_next, chat_id)
+
+    def _post(self, method, payload, attempt):
+        """একটি API কল: (result, None, None), নাহলে (None, error, delay); delay None মানে আবার চেষ্টা বৃথা।"""
+        started = time.perf_counter()
+        try:
+            response = self.session.post(f"{self.api_url}/{method}", json=payload, timeout=TELEGRAM_TIMEOUT)
+        except requests.RequestException as e:
+            metrics.inc("telegram_errors_total", method=method, reason=type(e).__name__)
+            return None, str(e), 2 ** attempt
+        metrics.observe("telegram_request_duration_seconds", time.perf_counter() - started, method=method)
+        if response.status_code == 200:
+            self.sent += 1
+            return response.json(), None, None
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        error = f"{response.status_code} {body.get('description') or response.text[:200]}"
+        metrics.inc("telegram_errors_total", method=method, reason=response.status_code)
+        if response.status_code == 429: return None, error, (body.get("parameters") or {}).get("retry_after", 1)
+        if response.status_code >= 500: return None, error, 2 ** attempt
+        return None, error, None  # 4xx: আবার চেষ্টা করে লাভ নেই
+
+    def _give_up(self, method, payload, error):
+        self.failed += 1
+        print(f"ERROR: Telegram {method} to {payload.get('chat_id')} failed: {error}")
+        return None
+
+telegram = TelegramClient(TELEGRAM_API_URL, TELEGRAM_WORKERS, sync=env_flag("TELEGRAM_SYNC_SEND", default=SERVERLESS))
+
+# Webhook দ্রুত 200 ফেরত দেয়; আপডেট ব্যাকগ্রাউন্ড ওয়ার্কারে প্রসেস হয়। Serverless-এ ডিফল্ট বন্ধ,
+# কারণ 200 ফেরত দেওয়ার পর কিউতে থাকা আপডেট দেরিতে চলে বা হারিয়ে যায়।
+WEBHOOK_ASYNC = env_flag("WEBHOOK_ASYNC", default=not SERVERLESS)
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")
+WEBHOOK_DEDUP_TTL = int(os.environ.get("WEBHOOK_DEDUP_TTL", 86400))
+update_workers = KeyedWorkerPool("update-worker", int(os.environ.get("WEBHOOK_WORKERS", 4)))
+
 # ======================================================================
 # --- উন্নত ফাংশন: পাবলিক চ্যানেলে পোস্ট করার জন্য ---
 # ======================================================================
@@ -115,7 +646,7 @@ def post_to_public_channel(content_id, post_type='content', season_num=None):
         return
 
     try:
-        content = movies.find_one({"_id": ObjectId(content_id)})
+        content = movies.find_one({"_id": ObjectId(content_id)}, WITHOUT_MEDIA_PROJECTION)
         if not content:
             print(f"ERROR: Could not find content with ID {content_id} to post.")
             return
@@ -140,7 +671,7 @@ def post_to_public_channel(content_id, post_type='content', season_num=None):
 
         if post_type == 'season_pack' and season_num:
             caption_parts.insert(1, f"🔥 *Season {season_num} Pack Added*")
-            pack = next((p for p in content.get('season_packs', []) if p['season'] == season_num), None)
+            pack = find_season_pack(content['_id'], season_num)
             pack_langs = set()
             if pack:
                 for link in pack.get('watch_links', []) + pack.get('download_links', []):
@@ -161,22 +692,17 @@ def post_to_public_channel(content_id, post_type='content', season_num=None):
 
         caption = "\n\n".join(caption_parts)
 
-        with app.app_context():
+        # ব্যাকগ্রাউন্ড থ্রেডে কোনো request নেই, তাই url_for-এর জন্য একটি request context লাগে
+        with app.test_request_context():
             website_link = f"{WEBSITE_URL.rstrip('/')}{url_for('movie_detail', movie_id=str(content_id))}"
         
         keyboard = { "inline_keyboard": [[{"text": "🌐 Watch on Website", "url": website_link}]] }
 
         if poster_url:
-            payload = {'chat_id': PUBLIC_CHANNEL_ID, 'photo': poster_url, 'caption': caption, 'parse_mode': 'MarkdownV2', 'reply_markup': json.dumps(keyboard)}
-            response = requests.post(f"{TELEGRAM_API_URL}/sendPhoto", json=payload)
-        else:
-            payload = {'chat_id': PUBLIC_CHANNEL_ID, 'text': caption, 'parse_mode': 'MarkdownV2', 'reply_markup': json.dumps(keyboard)}
-            response = requests.post(f"{TELEGRAM_API_URL}/sendMessage", json=payload)
-
-        if response.status_code == 200:
-            print(f"SUCCESS: Successfully posted '{title}' (Type: {post_type}) to public channel.")
+            telegram.send("sendPhoto", chat_id=PUBLIC_CHANNEL_ID, photo=poster_url, caption=caption, parse_mode='MarkdownV2', reply_markup=json.dumps(keyboard))
         else:
-            print(f"ERROR: Failed to post to public channel. Status: {response.status_code}, Response: {response.text}")
+            telegram.send("sendMessage", chat_id=PUBLIC_CHANNEL_ID, text=caption, parse_mode='MarkdownV2', reply_markup=json.dumps(keyboard))
+        print(f"SUCCESS: Queued '{title}' (Type: {post_type}) for the public channel.")
 
     except Exception as e:
         print(f"FATAL ERROR in post_to_public_channel: {e}")
@@ -241,6 +767,9 @@ index_html = """
   .full-page-grid-container { padding-top: 100px; padding-bottom: 50px; }
   .full-page-grid-title { font-size: 2.5rem; font-weight: 700; margin-bottom: 30px; }
   .category-grid, .full-page-grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(200px, 1fr)); gap: 20px 15px; }
+  .load-more-container { text-align: center; margin-top: 30px; }
+  .load-more-btn { display: inline-block; padding: 10px 30px; border: 1px solid #444; border-radius: 50px; font-weight: 700; transition: all 0.3s; }
+  .load-more-btn:hover { background-color: var(--netflix-red); border-color: var(--netflix-red); }
   .category-section { margin: 40px 0; }
   .category-header { display: flex; justify-content: space-between; align-items: center; margin-bottom: 15px; }
   .category-title { font-family: 'Roboto', sans-serif; font-weight: 700; font-size: 1.6rem; margin: 0; }
@@ -298,6 +827,7 @@ index_html = """
                     {{ render_movie_card(m) }}
                 {% endfor %}
             </div>
+            {% if next_url %}<div class="load-more-container"><a href="{{ next_url }}" id="load-more" class="load-more-btn" data-next="{{ next_url }}">Load More</a></div>{% endif %}
         {% endif %}
     </div>
   {% else %}
@@ -357,6 +887,24 @@ index_html = """
 <script>
     const nav = document.querySelector('.main-nav');
     window.addEventListener('scroll', () => { window.scrollY > 50 ? nav.classList.add('scrolled') : nav.classList.remove('scrolled'); });
+    const grid = document.querySelector('.full-page-grid'), loadMoreBtn = document.getElementById('load-more');
+    if (grid && loadMoreBtn) {
+        const esc = (v) => String(v == null ? '' : v).replace(/[&<>"']/g, (c) => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+        const cardHtml = (m) => `<a href="${esc(m.url)}" class="movie-card"><div class="poster-wrapper"><div class="movie-poster-container"><img class="movie-poster" loading="lazy" src="${esc(m.poster || 'https://via.placeholder.com/400x600.png?text=No+Image')}" alt="${esc(m.title)}">${m.poster_badge ? `<div class="poster-badge">${esc(m.poster_badge)}</div>` : ''}${m.vote_average > 0 ? `<div class="rating-badge"><i class="fas fa-star"></i> ${Number(m.vote_average).toFixed(1)}</div>` : ''}</div><div class="card-info-static"><h4 class="card-info-title">${esc(m.title)}</h4>${m.release_date ? `<p class="card-info-meta">${esc(m.release_date.split('-')[0])}</p>` : ''}</div></div></a>`;
+        let loading = false;
+        const loadMore = (e) => {
+            if (e) e.preventDefault();
+            if (loading || !loadMoreBtn.dataset.next) return;
+            loading = true;
+            const next = loadMoreBtn.dataset.next;
+            fetch(next + (next.includes('?') ? '&' : '?') + 'format=json').then((r) => r.json()).then((data) => {
+                grid.insertAdjacentHTML('beforeend', data.items.map(cardHtml).join(''));
+                if (data.next_url) { loadMoreBtn.dataset.next = data.next_url; loadMoreBtn.href = data.next_url; } else { loadMoreBtn.parentElement.remove(); }
+            }).finally(() => { loading = false; });
+        };
+        loadMoreBtn.addEventListener('click', loadMore);
+        if ('IntersectionObserver' in window) new IntersectionObserver((entries) => { if (entries[0].isIntersecting) loadMore(); }, { rootMargin: '600px' }).observe(loadMoreBtn);
+    }
     document.addEventListener('DOMContentLoaded', function() { const slides = document.querySelectorAll('.hero-slide'); if (slides.length > 1) { let currentSlide = 0; const showSlide = (index) => slides.forEach((s, i) => s.classList.toggle('active', i === index)); setInterval(() => { currentSlide = (currentSlide + 1) % slides.length; showSlide(currentSlide); }, 5000); } });
 </script>
 {% if ad_settings.popunder_code %}{{ ad_settings.popunder_code|safe }}{% endif %}
@@ -507,6 +1055,9 @@ detail_html = """
             </div>
             {% endfor %}
           {% endif %}
+          {% if seasons|length > 1 %}
+            <div class="episode-buttons" style="margin: 15px 0;">{% for season in seasons %}<a href="{{ url_for('movie_detail', movie_id=movie._id, season=season) }}" class="episode-button{% if season != current_season %} download{% endif %}">Season {{ season }}</a>{% endfor %}</div>
+          {% endif %}
           {% if movie.episodes %}
             {% for ep in movie.episodes | sort(attribute='episode_number') | sort(attribute='season') %}
               <div class="episode-item">
@@ -617,20 +1168,36 @@ hr.section-divider { border: 0; height: 2px; background-color: var(--light-gray)
     <hr style="margin: 20px 0;"><button type="submit">Add Content</button>
   </form>
   <hr class="section-divider">
+  <h2>Bulk Import (CSV / JSONL)</h2>
+  <form method="post" action="{{ url_for('admin_import') }}" enctype="multipart/form-data">
+    <div class="form-group"><label>File (columns: title, type, year, badge, watch_links, download_links)</label><input type="file" name="catalog_file" accept=".csv,.jsonl,.json" required></div>
+    <div class="form-group"><label><input type="checkbox" name="announce" value="1"> Announce new titles on the public channel</label></div>
+    <button type="submit">Start Import</button>
+  </form>
+  <hr class="section-divider">
   <h2>Manage Content</h2>
   <form method="GET" action="{{ url_for('admin') }}" style="padding: 15px; background: #252525; display: flex; gap: 10px; align-items: center;">
     <input type="search" name="search" placeholder="Search by title..." value="{{ search_query or '' }}" style="flex-grow: 1;">
     <button type="submit">Search</button>
     {% if search_query %}<a href="{{ url_for('admin') }}" class="clear-btn">Clear</a>{% endif %}
   </form>
-  <table><thead><tr><th>Title</th><th>Type</th><th>Actions</th></tr></thead><tbody>
-    {% for movie in content_list %}
-    <tr><td>{{ movie.title }}</td><td>{{ movie.type | title }}</td><td class="action-buttons"><a href="{{ url_for('edit_movie', movie_id=movie._id) }}" class="edit-btn">Edit</a><button class="delete-btn" onclick="confirmDelete('{{ movie._id }}', '{{ movie.title }}')">Delete</button></td></tr>
-    {% else %}
-    <tr><td colspan="3" style="text-align: center;">No content found.</td></tr>
-    {% endfor %}
-  </tbody></table>
+  <div style="display: flex; gap: 10px; align-items: center; max-width: 800px; margin: 0 auto;">
+    <label for="content-sort" style="white-space: nowrap;">Sort by</label>
+    <select id="content-sort" {% if search_query %}disabled{% endif %}><option value="recent">Recently added</option><option value="created_at">Created at</option><option value="view_count">Views</option></select>
+    <select id="content-type" {% if search_query %}disabled{% endif %}><option value="">All types</option><option value="movie">Movies</option><option value="series">Series</option></select>
+  </div>
+  <table><thead><tr><th>Title</th><th>Type</th><th>Views</th><th>Created</th><th>Actions</th></tr></thead><tbody id="content-rows"></tbody></table>
+  <p style="text-align: center;"><button type="button" id="content-more" class="clear-btn" style="display: none;">Load More</button></p>
   
+  <hr class="section-divider">
+  <h2>Backup &amp; Restore</h2>
+  <p style="margin-bottom: 15px;"><a href="{{ url_for('admin_export') }}" class="add-btn">Download Backup (.jsonl.gz)</a></p>
+  <form method="post" action="{{ url_for('admin_restore') }}" enctype="multipart/form-data" onsubmit="return confirm('Restore this backup? Existing documents with the same ID will be replaced.');">
+    <div class="form-group"><label>Backup file</label><input type="file" name="backup_file" accept=".gz" required></div>
+    <div class="form-group"><label><input type="checkbox" name="drop" value="1"> Empty collections before restoring</label></div>
+    <button type="submit">Restore Backup</button>
+  </form>
+
   <div class="danger-zone">
       <h3>DANGER ZONE</h3>
       <p style="margin-bottom: 15px;">This will permanently delete all movies and series from the database. This action cannot be undone.</p>
@@ -639,8 +1206,43 @@ hr.section-divider { border: 0; height: 2px; background-color: var(--light-gray)
 
   <hr class="section-divider">
   <h2>User Feedback / Reports</h2>
-  {% if feedback_list %}<table><thead><tr><th>Date</th><th>Type</th><th>Title</th><th>Message</th><th>Email</th><th>Action</th></tr></thead><tbody>{% for item in feedback_list %}<tr><td style="min-width: 150px;">{{ item.timestamp.strftime('%Y-%m-%d %H:%M') }}</td><td>{{ item.type }}</td><td>{{ item.content_title }}</td><td style="white-space: pre-wrap; min-width: 300px;">{{ item.message }}</td><td>{{ item.email or 'N/A' }}</td><td><a href="{{ url_for('delete_feedback', feedback_id=item._id) }}" class="delete-btn" onclick="return confirm('Delete this feedback?');">Delete</a></td></tr>{% endfor %}</tbody></table>{% else %}<p>No new feedback or reports.</p>{% endif %}
+  <table><thead><tr><th>Date</th><th>Type</th><th>Title</th><th>Message</th><th>Email</th><th>Action</th></tr></thead><tbody id="feedback-rows"></tbody></table>
+  <p style="text-align: center;"><button type="button" id="feedback-more" class="clear-btn" style="display: none;">Load More</button></p>
   <script>
+    function esc(v) { return String(v == null ? '' : v).replace(/[&<>"']/g, c => ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'})[c]); }
+    function pagedTable(opts) {
+      const tbody = document.getElementById(opts.tbody), more = document.getElementById(opts.more);
+      let next = null, loading = false, seq = 0;
+      function load(reset) {
+        if (loading && !reset) return;
+        if (reset) { tbody.innerHTML = ''; next = null; }
+        loading = true; more.style.display = 'none';
+        const mine = ++seq, params = new URLSearchParams(opts.params());
+        if (next) params.set('cursor', next);
+        fetch(opts.url + '?' + params.toString(), {credentials: 'same-origin'}).then(r => r.json()).then(data => {
+          if (mine !== seq) return;
+          tbody.insertAdjacentHTML('beforeend', data.items.map(opts.row).join(''));
+          if (!tbody.children.length) tbody.innerHTML = '<tr><td colspan="' + opts.cols + '" style="text-align: center;">' + opts.empty + '</td></tr>';
+          next = data.next; more.style.display = next ? 'inline-block' : 'none';
+        }).finally(() => { if (mine === seq) loading = false; });
+      }
+      more.addEventListener('click', () => load(false));
+      if ('IntersectionObserver' in window) new IntersectionObserver(e => { if (e[0].isIntersecting && next) load(false); }, {rootMargin: '400px'}).observe(more);
+      load(true);
+      return load;
+    }
+    const loadContent = pagedTable({
+      url: '{{ url_for('admin_api_content') }}', tbody: 'content-rows', more: 'content-more', cols: 5, empty: 'No content found.',
+      params: () => ({q: {{ search_query|tojson }}, sort: document.getElementById('content-sort').value, type: document.getElementById('content-type').value, limit: 50}),
+      row: m => '<tr><td>' + esc(m.title) + '</td><td>' + esc((m.type || '').replace(/^./, c => c.toUpperCase())) + '</td><td>' + esc(m.view_count || 0) + '</td><td>' + esc((m.created_at || '').slice(0, 10)) + '</td><td class="action-buttons"><a href="' + esc(m.edit_url) + '" class="edit-btn">Edit</a><button class="delete-btn" data-id="' + esc(m._id) + '" data-title="' + esc(m.title) + '" onclick="confirmDelete(this.dataset.id, this.dataset.title)">Delete</button></td></tr>'
+    });
+    document.getElementById('content-sort').addEventListener('change', () => loadContent(true));
+    document.getElementById('content-type').addEventListener('change', () => loadContent(true));
+    pagedTable({
+      url: '{{ url_for('admin_api_feedback') }}', tbody: 'feedback-rows', more: 'feedback-more', cols: 6, empty: 'No new feedback or reports.',
+      params: () => ({limit: 25}),
+      row: f => '<tr><td style="min-width: 150px;">' + esc((f.timestamp || '').slice(0, 16).replace('T', ' ')) + '</td><td>' + esc(f.type) + '</td><td>' + esc(f.content_title) + '</td><td style="white-space: pre-wrap; min-width: 300px;">' + esc(f.message) + '</td><td>' + esc(f.email || 'N/A') + '</td><td><a href="' + esc(f.delete_url) + '" class="delete-btn" onclick="return confirm(\\'Delete this feedback?\\');">Delete</a></td></tr>'
+    });
     function confirmDelete(id, title) { if (confirm('Delete "' + title + '"?')) window.location.href = '/delete_movie/' + id; }
     function toggleFields() { var isSeries = document.getElementById('content_type').value === 'series'; document.getElementById('episode_fields').style.display = isSeries ? 'block' : 'none'; document.getElementById('movie_fields').style.display = isSeries ? 'none' : 'block'; }
     function addTelegramFileField() { const c = document.getElementById('telegram_files_container'); const d = document.createElement('div'); d.className = 'dynamic-item'; d.innerHTML = `<div class="form-group"><label>Quality (e.g., 720p):</label><input type="text" name="telegram_quality[]" required /></div><div class="form-group"><label>Message ID:</label><input type="number" name="telegram_message_id[]" required /></div><button type="button" onclick="this.parentElement.remove()" class="delete-btn">Remove</button>`; c.appendChild(d); }
@@ -668,6 +1270,7 @@ button[type="submit"], .add-btn { background: var(--netflix-red); color: white;
   <a href="{{ url_for('admin') }}" class="back-to-admin">← Back to Admin</a>
   <h2>Edit: {{ movie.title }}</h2>
   <form method="post">
+    {% if movie.type == 'series' %}{% for pack in movie.season_packs or [] %}<input type="hidden" name="shown_pack[]" value="{{ pack.season }}" />{% endfor %}{% for ep in movie.episodes or [] %}<input type="hidden" name="shown_episode[]" value="{{ ep.season }}:{{ ep.episode_number }}" />{% endfor %}{% endif %}
     <div class="form-group"><label>Title:</label><input type="text" name="title" value="{{ movie.title }}" required /></div>
     <div class="form-group"><label>Poster URL:</label><input type="url" name="poster" value="{{ movie.poster or '' }}" /></div><div class="form-group"><label>Overview:</label><textarea name="overview">{{ movie.overview or '' }}</textarea></div>
     <div class="form-group"><label>Genres (comma separated):</label><input type="text" name="genres" value="{{ movie.genres|join(', ') if movie.genres else '' }}" /></div>
@@ -757,6 +1360,191 @@ textarea { resize: vertical; min-height: 120px; } button[type="submit"] { backgr
 </div></body></html>
 """
 
+# ======================================================================
+# --- Template Registry (স্টার্টআপে একবার কম্পাইল) ---
+# ======================================================================
+PAGE_TEMPLATES = {
+    "index.html": index_html, "detail.html": detail_html, "genres.html": genres_html, "watch.html": watch_html,
+    "admin.html": admin_html, "edit.html": edit_html, "contact.html": contact_html,
+}
+# ডিস্কে bytecode ক্যাশ রাখলে নতুন প্রসেসে টেমপ্লেট আবার পার্স/কম্পাইল করতে হয় না।
+# `flask compile-templates` দিয়ে বানানো template_cache/ ডিরেক্টরি বান্ডেলে থাকলে সেটিই ডিফল্ট।
+BUNDLED_TEMPLATE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "template_cache")
+JINJA_BYTECODE_CACHE_DIR = os.environ.get("JINJA_BYTECODE_CACHE_DIR") or (BUNDLED_TEMPLATE_CACHE_DIR if os.path.isdir(BUNDLED_TEMPLATE_CACHE_DIR) else None)
+
+class BundledBytecodeCache(FileSystemBytecodeCache):
+    """Vercel-এর মতো read-only ফাইলসিস্টেমে ক্যাশ লেখা না গেলে চুপচাপ বাদ দেয়।"""
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+if JINJA_BYTECODE_CACHE_DIR:
+    try:
+        os.makedirs(JINJA_BYTECODE_CACHE_DIR, exist_ok=True)
+    except OSError:
+        pass
+    app.jinja_env.bytecode_cache = BundledBytecodeCache(JINJA_BYTECODE_CACHE_DIR)
+app.jinja_env.loader = ChoiceLoader([DictLoader(PAGE_TEMPLATES), app.jinja_env.loader])
+compiled_templates = {}
+
+def get_compiled_template(name):
+    template = compiled_templates.get(name)
+    if template is None: template = compiled_templates[name] = app.jinja_env.get_template(name)
+    return template
+
+# FAST_STARTUP-এ প্রতিটি টেমপ্লেট প্রথম রেন্ডারের সময় কম্পাইল হয় (হোমপেজের কোল্ড স্টার্টে admin/edit লাগে না)
+if not FAST_STARTUP:
+    for template_name in PAGE_TEMPLATES: get_compiled_template(template_name)
+
+def render_page(name, **context):
+    """`render_template_string`-এর বদলে আগে থেকে কম্পাইল করা `Template` দিয়ে রেন্ডার করে।"""
+    with metrics.timer("template_render_duration_seconds", template=name):
+        app.update_template_context(context)
+        return get_compiled_template(name).render(context)
+
+@app.cli.command("compile-templates")
+@click.option("--out", "out_dir", default=BUNDLED_TEMPLATE_CACHE_DIR, show_default=True)
+def compile_templates_command(out_dir):
+    """Write Jinja bytecode for every page template (ship the directory with the deployment)."""
+    os.makedirs(out_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(out_dir)
+    app.jinja_env.cache.clear()
+    compiled_templates.clear()
+    for template_name in PAGE_TEMPLATES: get_compiled_template(template_name)
+    print(f"SUCCESS: Compiled {len(PAGE_TEMPLATES)} templates to {out_dir} (Python {sys.version_info[0]}.{sys.version_info[1]}).")
+
+# ======================================================================
+# --- TMDb Client (persistent cache) ---
+# ======================================================================
+TMDB_CACHE_TTL = int(os.environ.get("TMDB_CACHE_TTL", 7 * 86400))
+TMDB_NEGATIVE_TTL = int(os.environ.get("TMDB_NEGATIVE_TTL", 6 * 3600))
+TMDB_TIMEOUT = 10
+TMDB_RATE_LIMIT = float(os.environ.get("TMDB_RATE_LIMIT", 20))  # প্রতি সেকেন্ডে সর্বোচ্চ রিকোয়েস্ট
+
+class TMDbClient:
+    """
+    TMDb API-র উপর ক্যাশ লেয়ার। সার্চের ফল (type, normalized title, year) → tmdb_id এবং
+    ডিটেইলস tmdb_id অনুযায়ী `tmdb_cache` কালেকশনে TTL সহ রাখা হয় ("কিছু পাওয়া যায়নি"
+    ফলাফলও কম TTL-এ)। একই কী-এর একসাথে আসা লুকআপ একটিমাত্র HTTP কল শেয়ার করে।
+    """
+    def __init__(self, api_url, api_key, cache_collection):
+        self.api_url = api_url.rstrip("/")
+        self.api_key = api_key
+        self.cache = cache_collection
+        self.hits = 0
+        self.misses = 0
+        self._session = None
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._limiter = RateLimiter(TMDB_RATE_LIMIT)
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=16))
+                    self._session = session
+        return self._session
+
+    def find(self, title, search_type, year=None):
+        """প্রথম সার্চ রেজাল্টের ডিটেইলস, অথবা None।"""
+        query = " ".join(title.lower().split())
+        tmdb_id = self._cached(f"search:{search_type}:{query}:{year or ''}", lambda: self._search(title, search_type, year))
+        if not tmdb_id: return None
+        details = self.details(search_type, tmdb_id)
+        return dict(details) if details else None  # কলার ডিক্ট বদলায়; শেয়ার করা ফল যেন না বদলায়
+
+    def details(self, search_type, tmdb_id):
+        return self._cached(f"details:{search_type}:{tmdb_id}", lambda: self._details(search_type, tmdb_id))
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "inflight": len(self._inflight)}
+
+    def _cached(self, key, fetch):
+        now = datetime.now(timezone.utc)
+        try:
+            doc = self.cache.find_one({"_id": key, "expires_at": {"$gt": now}}, {"value": 1})
+        except Exception as e:
+            print(f"WARNING: TMDb cache lookup failed for '{key}': {e}")
+            doc = None
+        if doc is not None:
+            self.hits += 1
+            return doc.get("value")
+        self.misses += 1
+
+        # Request coalescing: প্রথম থ্রেড কল করে, বাকিরা তার ফলের জন্য অপেক্ষা করে
+        with self._lock:
+            waiter = self._inflight.get(key)
+            if waiter is None:
+                waiter = self._inflight[key] = {"event": threading.Event(), "value": None}
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            waiter["event"].wait(TMDB_TIMEOUT * 2)
+            return waiter["value"]
+
+        try:
+            value = fetch()
+            waiter["value"] = value
+            ttl = TMDB_CACHE_TTL if value else TMDB_NEGATIVE_TTL
+            try:
+                self.cache.replace_one({"_id": key}, {"value": value, "expires_at": now + timedelta(seconds=ttl)}, upsert=True)
+            except Exception as e:
+                print(f"WARNING: Could not store TMDb cache entry '{key}': {e}")
+            return value
+        except requests.RequestException as e:
+            # নেটওয়ার্ক/সার্ভার ত্রুটি ক্যাশ করা হয় না
+            print(f"ERROR: TMDb API request failed for '{key}'. Reason: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            waiter["event"].set()
+
+    def _get(self, path, **params):
+        self._limiter.acquire()
+        endpoint = path if path.startswith("search/") else path.split("/")[0]  # tmdb_id লেবেলে রাখা হয় না
+        try:
+            with metrics.timer("tmdb_request_duration_seconds", endpoint=endpoint):
+                response = self.session.get(f"{self.api_url}/{path}", params={"api_key": self.api_key, "language": "en-US", **params}, timeout=TMDB_TIMEOUT)
+            response.raise_for_status()
+        except requests.HTTPError as e:
+            metrics.inc("tmdb_errors_total", endpoint=endpoint, reason=e.response.status_code)
+            raise
+        except requests.RequestException as e:
+            metrics.inc("tmdb_errors_total", endpoint=endpoint, reason=type(e).__name__)
+            raise
+        return response.json()
+
+    def _search(self, title, search_type, year):
+        print(f"INFO: Searching TMDb for: '{title}' (Type: {search_type}, Year: {year})")
+        params = {"query": title}
+        if year: params["year" if search_type == "movie" else "first_air_date_year"] = year
+        results = self._get(f"search/{search_type}", **params).get("results")
+        return results[0].get("id") if results else None
+
+    def _details(self, search_type, tmdb_id):
+        res_json = self._get(f"{search_type}/{tmdb_id}", append_to_response="videos")
+        trailer_key = next((v['key'] for v in res_json.get("videos", {}).get("results", []) if v.get('type') == 'Trailer' and v.get('site') == 'YouTube'), None)
+        return {
+            "tmdb_id": tmdb_id,
+            "tmdb_title": res_json.get("title") or res_json.get("name"),
+            "poster": f"https://image.tmdb.org/t/p/w500{res_json.get('poster_path')}" if res_json.get('poster_path') else None,
+            "overview": res_json.get("overview"),
+            "release_date": res_json.get("release_date") or res_json.get("first_air_date"),
+            "genres": [g['name'] for g in res_json.get("genres", [])],
+            "languages": [lang['english_name'] for lang in res_json.get('spoken_languages', [])],
+            "vote_average": res_json.get("vote_average"),
+            "trailer_key": trailer_key
+        }
+
+tmdb = TMDbClient(TMDB_API_URL, TMDB_API_KEY, tmdb_cache)
+
 # ======================================================================
 # --- Helper Functions ---
 # ======================================================================
@@ -766,176 +1554,1881 @@ def get_tmdb_details_from_api(title_for_search, content_type, year=None):
         return None
     
     search_type = "tv" if content_type in ["series", "series_pack"] else "movie"
-    
-    def search_tmdb(query_title, query_year):
-        print(f"INFO: Searching TMDb for: '{query_title}' (Type: {search_type}, Year: {query_year})")
-        try:
-            search_url = f"https://api.themoviedb.org/3/search/{search_type}?api_key={TMDB_API_KEY}&query={requests.utils.quote(query_title)}&language=en-US"
-            if query_year and search_type == "movie":
-                search_url += f"&year={query_year}"
-            elif query_year and search_type == "tv":
-                search_url += f"&first_air_date_year={query_year}"
-
-            search_res = requests.get(search_url, timeout=10)
-            search_res.raise_for_status()
-            results = search_res.json().get("results")
-            
-            if not results: return None
-            
-            tmdb_id = results[0].get("id")
-            detail_url = f"https://api.themoviedb.org/3/{search_type}/{tmdb_id}?api_key={TMDB_API_KEY}&language=en-US&append_to_response=videos"
-            detail_res = requests.get(detail_url, timeout=10)
-            detail_res.raise_for_status()
-            res_json = detail_res.json()
-            
-            trailer_key = next((v['key'] for v in res_json.get("videos", {}).get("results", []) if v.get('type') == 'Trailer' and v.get('site') == 'YouTube'), None)
-            
-            language_names = [lang['english_name'] for lang in res_json.get('spoken_languages', [])]
-
-            details = {
-                "tmdb_id": tmdb_id, 
-                "tmdb_title": res_json.get("title") or res_json.get("name"),
-                "poster": f"https://image.tmdb.org/t/p/w500{res_json.get('poster_path')}" if res_json.get('poster_path') else None, 
-                "overview": res_json.get("overview"), 
-                "release_date": res_json.get("release_date") or res_json.get("first_air_date"), 
-                "genres": [g['name'] for g in res_json.get("genres", [])], 
-                "languages": language_names,
-                "vote_average": res_json.get("vote_average"), 
-                "trailer_key": trailer_key
-            }
-            print(f"SUCCESS: Found TMDb details for '{query_title}' (ID: {tmdb_id}).")
-            return details
-        except requests.RequestException as e:
-            print(f"ERROR: TMDb API request failed for '{query_title}'. Reason: {e}")
-            return None
 
-    tmdb_data = search_tmdb(title_for_search, year)
+    tmdb_data = tmdb.find(title_for_search, search_type, year)
     if not tmdb_data and year:
         print(f"WARNING: TMDb search failed for '{title_for_search}' with year '{year}'. Retrying without year.")
-        tmdb_data = search_tmdb(title_for_search, None)
+        tmdb_data = tmdb.find(title_for_search, search_type, None)
         
     if not tmdb_data:
         print(f"FINAL WARNING: TMDb search found no results for '{title_for_search}' after all attempts.")
+    else:
+        print(f"SUCCESS: Found TMDb details for '{title_for_search}' (ID: {tmdb_data['tmdb_id']}).")
     return tmdb_data
 
-def process_movie_list(movie_list):
-    return [{**item, '_id': str(item['_id'])} for item in movie_list]
+class MovieCard:
+    """
+    গ্রিড/লিস্টে দেখানোর জন্য হালকা অবজেক্ট। প্রজেক্টেড কুয়েরি থেকে তৈরি হয়, তাই পুরো
+    ডকুমেন্ট (episodes, links) ডিকোড বা কপি করতে হয় না।
+    """
+    __slots__ = ("_id", "title", "poster", "poster_badge", "type", "vote_average", "release_date")
+    PROJECTION = dict.fromkeys(__slots__[1:], 1)
+
+    def __init__(self, doc):
+        self._id = str(doc["_id"])
+        self.title = doc.get("title")
+        self.poster = doc.get("poster")
+        self.poster_badge = doc.get("poster_badge")
+        self.type = doc.get("type")
+        self.vote_average = doc.get("vote_average")
+        self.release_date = doc.get("release_date")
+
+    @classmethod
+    def from_cursor(cls, cursor):
+        return [cls(doc) for doc in cursor]
+
+    def to_dict(self):
+        # সাবক্লাসের (HeroCard) নিজের __slots__-এ শুধু বাড়তি ফিল্ড থাকে, তাই পুরো MRO দেখা হয়
+        return {field: getattr(self, field) for cls in reversed(type(self).__mro__) for field in getattr(cls, "__slots__", ())}
+
+class HeroCard(MovieCard):
+    """হোমপেজের হিরো স্লাইডারের জন্য কয়েকটি বাড়তি ফিল্ডসহ কার্ড।"""
+    __slots__ = ("overview", "watch_links", "is_coming_soon")
+
+    def __init__(self, doc):
+        super().__init__(doc)
+        self.overview = doc.get("overview")
+        self.watch_links = doc.get("watch_links")
+        self.is_coming_soon = doc.get("is_coming_soon")
+
+LIST_PAGE_SIZE = 48
+LIST_MAX_PAGE_SIZE = 100
 
 # ======================================================================
-# --- Main Flask Routes ---
+# --- Homepage Data Layer (cached) ---
 # ======================================================================
+class TTLCache:
+    """Small thread-safe in-process cache whose entries expire after `ttl` seconds."""
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
 
-@app.route('/')
-def home():
-    query = request.args.get('q')
-    if query:
-        movies_list = list(movies.find({"title": {"$regex": query, "$options": "i"}}).sort('_id', -1))
-        return render_template_string(index_html, movies=process_movie_list(movies_list), query=f'Results for "{query}"', is_full_page_list=True)
-    all_badges = sorted([badge for badge in movies.distinct("poster_badge") if badge and badge.strip()])
-    limit = 12
-    context = {
-        "trending_movies": process_movie_list(list(movies.find({"is_trending": True, "is_coming_soon": {"$ne": True}}).sort('_id', -1).limit(limit))),
-        "latest_movies": process_movie_list(list(movies.find({"type": "movie", "is_coming_soon": {"$ne": True}}).sort('_id', -1).limit(limit))),
-        "latest_series": process_movie_list(list(movies.find({"type": "series", "is_coming_soon": {"$ne": True}}).sort('_id', -1).limit(limit))),
-        "coming_soon_movies": process_movie_list(list(movies.find({"is_coming_soon": True}).sort('_id', -1).limit(limit))),
-        "recently_added": process_movie_list(list(movies.find({"is_coming_soon": {"$ne": True}}).sort('_id', -1).limit(6))),
-        "recently_added_full": process_movie_list(list(movies.find({"is_coming_soon": {"$ne": True}}).sort('_id', -1).limit(limit))),
-        "is_full_page_list": False, "query": "", "all_badges": all_badges
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None: return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+HOMEPAGE_CACHE_TTL = int(os.environ.get("HOMEPAGE_CACHE_TTL", 300))
+HOME_SHELF_LIMIT = 12
+HOME_HERO_LIMIT = 6
+# হোমপেজের $facet শুধু এতগুলো নতুন টাইটেল দেখে; এর বাইরে যাওয়া শেলফ আলাদা কুয়েরিতে আসে
+HOME_SCAN_LIMIT = int(os.environ.get("HOME_SCAN_LIMIT", 500))
+# হোমপেজে যেসব ফিল্ড লাগে শুধু সেগুলোই আনা হবে (episodes/links বাদ)
+HOME_CARD_PROJECTION = {
+    **MovieCard.PROJECTION, "overview": 1, "is_coming_soon": 1, "is_trending": 1,
+    "watch_links": {"$slice": ["$watch_links", 1]},
+}
+homepage_cache = TTLCache(HOMEPAGE_CACHE_TTL)
+
+def home_shelf_query(match):
+    """একটি শেলফের আলাদা ইনডেক্সড কুয়েরি: match-এর সবচেয়ে নতুন HOME_SHELF_LIMIT টাইটেল।"""
+    return list(movies.aggregate([{"$match": match}, {"$sort": {"_id": -1}}, {"$limit": HOME_SHELF_LIMIT}, {"$project": HOME_CARD_PROJECTION}]))
+
+def build_homepage_data():
+    """
+    রিলিজ হওয়া শেলফগুলো সবচেয়ে নতুন HOME_SCAN_LIMIT টাইটেলের ওপর একটি `$facet` দিয়ে তৈরি হয়,
+    তাই cache miss-এ পুরো কালেকশন স্ক্যান হয় না। ওই অংশে কোনো শেলফ না ভরলে (যেমন পুরোনো
+    trending টাইটেল) সেটি নিজের ইনডেক্সড কুয়েরিতে আসে। Coming soon সবসময় আলাদা কুয়েরি,
+    ব্যাজ `distinct` (poster_badge ইনডেক্স)।
+    Returns the template context for the homepage (everything except the search bits).
+    """
+    released = {"is_coming_soon": {"$ne": True}}
+    shelves = {
+        "trending_movies": {"is_trending": True, **released},
+        "latest_movies": {"type": "movie", **released},
+        "latest_series": {"type": "series", **released},
+        "recently_added_full": released,
     }
-    return render_template_string(index_html, **context)
+    pipeline = [
+        {"$sort": {"_id": -1}},
+        {"$limit": HOME_SCAN_LIMIT},
+        {"$project": HOME_CARD_PROJECTION},
+        {"$facet": {"scanned": [{"$count": "n"}], **{name: [{"$match": match}, {"$limit": HOME_SHELF_LIMIT}] for name, match in shelves.items()}}},
+    ]
+    result = next(movies.aggregate(pipeline), {})
+    whole_catalog = (result.get("scanned") or [{"n": 0}])[0]["n"] < HOME_SCAN_LIMIT
+    for name, match in shelves.items():
+        if not whole_catalog and len(result.get(name, [])) < HOME_SHELF_LIMIT: result[name] = home_shelf_query(match)
+    result["coming_soon_movies"] = home_shelf_query({"is_coming_soon": True})
+    data = {name: MovieCard.from_cursor(result.get(name, [])) for name in ("trending_movies", "latest_movies", "latest_series", "coming_soon_movies", "recently_added_full")}
+    data["recently_added"] = HeroCard.from_cursor(result.get("recently_added_full", [])[:HOME_HERO_LIMIT])
+    data["all_badges"] = sorted(badge for badge in movies.distinct("poster_badge") if isinstance(badge, str) and badge.strip())
+    return data
 
-@app.route('/movie/<movie_id>')
-def movie_detail(movie_id):
+def current_catalog_version(counter=None):
+    """
+    শেয়ার করা ক্যাটালগ ভার্সন (অন্য ওয়ার্কারের লেখাও ধরে); `counter` দিলে সেটির (যেমন settings_version)।
+    Mongo না পেলে None, তখন ক্যাশ শুধু TTL মানে।
+    """
     try:
-        obj_id = ObjectId(movie_id)
-        movies.update_one({"_id": obj_id}, {"$inc": {"view_count": 1}})
-        movie = movies.find_one({"_id": obj_id})
-        if not movie: return "Content not found", 404
-        related_movies = []
-        if movie.get("genres"):
-            related_movies = list(movies.find({"genres": {"$in": movie["genres"]}, "_id": {"$ne": obj_id}}).limit(12))
-        return render_template_string(detail_html, movie=movie, trailer_key=movie.get("trailer_key"), related_movies=process_movie_list(related_movies))
+        return (counter or catalog_version).get()
     except Exception as e:
-        print(f"Error in movie_detail route: {e}")
-        return "Content not found or invalid ID", 404
+        print(f"WARNING: Catalog version lookup failed: {e}")
+        return None
 
-def render_full_list(content_list, title):
-    return render_template_string(index_html, movies=process_movie_list(content_list), query=title, is_full_page_list=True)
+def get_homepage_data():
+    # কী-তে ভার্সন থাকায় অন্য ওয়ার্কারে লেখা হলেও পুরোনো শেল্ফ আর মেলে না
+    key = ("home", current_catalog_version())
+    data = homepage_cache.get(key)
+    if data is None:
+        data = build_homepage_data()
+        homepage_cache.set(key, data)
+    return data
 
-@app.route('/badge/<badge_name>')
-def movies_by_badge(badge_name): return render_full_list(list(movies.find({"poster_badge": badge_name}).sort('_id', -1)), f'Tag: {badge_name}')
+# ======================================================================
+# --- Rendered Page Cache (tag-invalidated, ETag / 304 support) ---
+# ======================================================================
+PAGE_CACHE_TTL = int(os.environ.get("PAGE_CACHE_TTL", 3600))
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get("PAGE_CACHE_MAX_ENTRIES", 2000))
+# ক্যাশ ইনভ্যালিডেশনের জন্য ডকুমেন্টের যেসব ফিল্ড দরকার
+CACHE_TAG_PROJECTION = {"genres": 1, "poster_badge": 1}
 
-@app.route('/genres')
-def genres_page(): return render_template_string(genres_html, genres=sorted([g for g in movies.distinct("genres") if g]), title="Browse by Genre")
+class PageCache:
+    """
+    রেন্ডার করা পেজ মেমোরিতে রাখে। প্রতিটি এন্ট্রি কিছু ট্যাগের সাথে যুক্ত থাকে
+    (movie:<id>, genre:<name>, badge:<name>, shelves, genres, settings), ট্যাগ ইনভ্যালিডেট
+    করলে সংশ্লিষ্ট সব পেজ মুছে যায়। LRU + TTL দিয়ে সাইজ সীমিত রাখা হয়। ট্যাগ শুধু এই প্রসেসে
+    কাজ করে; অন্য ওয়ার্কারের লেখা ধরতে এন্ট্রিতে ক্যাটালগ ভার্সন রাখা হয়, না মিললে miss।
+    """
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
 
-@app.route('/genre/<genre_name>')
-def movies_by_genre(genre_name): return render_full_list(list(movies.find({"genres": genre_name}).sort('_id', -1)), f'Genre: {genre_name}')
+    def get(self, key, version=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None: return None
+            if entry["expires_at"] < time.monotonic() or (version is not None and entry["version"] != version):
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
 
-@app.route('/trending_movies')
-def trending_movies(): return render_full_list(list(movies.find({"is_trending": True, "is_coming_soon": {"$ne": True}}).sort('_id', -1)), "Trending Now")
+    def set(self, key, body, mimetype, tags, version=None):
+        entry = {
+            "body": body, "mimetype": mimetype, "tags": frozenset(tags), "version": version,
+            "etag": hashlib.sha1(body).hexdigest(),
+            "last_modified": datetime.now(timezone.utc).replace(microsecond=0),
+            "expires_at": time.monotonic() + self.ttl,
+        }
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            for tag in entry["tags"]:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        return entry
 
-@app.route('/movies_only')
-def movies_only(): return render_full_list(list(movies.find({"type": "movie", "is_coming_soon": {"$ne": True}}).sort('_id', -1)), "All Movies")
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
 
-@app.route('/webseries')
-def webseries(): return render_full_list(list(movies.find({"type": "series", "is_coming_soon": {"$ne": True}}).sort('_id', -1)), "All Web Series")
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
 
-@app.route('/coming_soon')
-def coming_soon(): return render_full_list(list(movies.find({"is_coming_soon": True}).sort('_id', -1)), "Coming Soon")
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "tags": len(self._tags), "max_entries": self.max_entries, "ttl": self.ttl}
 
-@app.route('/recently_added')
-def recently_added_all(): return render_full_list(list(movies.find({"is_coming_soon": {"$ne": True}}).sort('_id', -1)), "Recently Added")
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None: return
+        for tag in entry["tags"]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys: del self._tags[tag]
+
+page_cache = PageCache(PAGE_CACHE_TTL, PAGE_CACHE_MAX_ENTRIES)
+
+def add_cache_tags(*tags):
+    """ভিউ ফাংশন রেন্ডারের সময় ডাইনামিক ট্যাগ (যেমন movie:<id>) যোগ করতে পারে।"""
+    if "page_cache_tags" in g:
+        g.page_cache_tags.update(tags)
+
+def cached_page(*static_tags):
+    """
+    পুরো রেসপন্স ক্যাশ করে (route + query string অনুযায়ী) এবং ETag/Last-Modified দিয়ে
+    `304 Not Modified` সাপোর্ট করে। শুধু 200 রেসপন্স ক্যাশ হয়।
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.environ.get(STATIC_BUILD_ENVIRON):
+                # স্ট্যাটিক বিল্ড: সবসময় নতুন রেন্ডার; পেজের ট্যাগ g-তে থাকে, বিল্ডার ম্যানিফেস্টে রাখে
+                g.page_cache_tags = {"settings", *static_tags}
+                return f(*args, **kwargs)
+            key = f"{request.endpoint}:{request.full_path}"
+            # পেজে বিজ্ঞাপন কোডও থাকে, তাই অন্য ওয়ার্কারে save_ads হলেও পুরোনো HTML আর মেলে না
+            version = (current_catalog_version(), current_catalog_version(settings_version))
+            entry = page_cache.get(key, version)
+            if entry is None:
+                g.page_cache_tags = {"settings", *static_tags}
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200: return response
+                entry = page_cache.set(key, response.get_data(), response.mimetype, g.page_cache_tags, version)
+            response = Response(entry["body"], mimetype=entry["mimetype"])
+            response.set_etag(entry["etag"])
+            response.last_modified = entry["last_modified"]
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        return decorated
+    return decorator
+
+def catalog_tags(doc):
+    tags = {f"movie:{doc['_id']}"} if doc.get("_id") else set()
+    tags.update(f"genre:{genre}" for genre in doc.get("genres") or [])
+    if doc.get("poster_badge"): tags.add(f"badge:{doc['poster_badge']}")
+    return tags
+
+def invalidate_catalog_cache(*docs):
+    """
+    `movies` কালেকশনে কিছু লেখা হলেই এটি কল করতে হবে। পরিবর্তিত ডকুমেন্টগুলো (আগের ও পরের
+    ভার্সন) দিলে শুধু সংশ্লিষ্ট পেজ মুছবে; কিছু না দিলে পুরো পেজ ক্যাশ খালি হবে।
+    """
+    homepage_cache.clear()
+    try:
+        catalog_version.bump()
+    except Exception as e:
+        print(f"ERROR: Catalog version bump failed: {e}")
+    docs = [doc for doc in docs if doc]
+    if not docs:
+        page_cache.clear()
+        search_index.mark_stale()
+        related_index.mark_stale()
+        # ইমপোর্ট/রিস্টোরের নতুন ডকুমেন্টেরও related তালিকা লাগে
+        related_index.schedule()
+        try:
+            deeplink_index.clear()
+        except Exception as e:
+            print(f"ERROR: Deep-link index reset failed: {e}")
+        if STATIC_REGENERATE_ON_WRITE: static_site.schedule()
+        return
+    tags = {"shelves", "genres"}
+    for doc in docs: tags |= catalog_tags(doc)
+    page_cache.invalidate(*tags)
+    ids = {doc["_id"] for doc in docs if doc.get("_id")}
+    try:
+        search_index.refresh_ids(ids)
+    except Exception as e:
+        print(f"ERROR: Search index refresh failed: {e}")
+        search_index.mark_stale()
+    related_index.schedule(ids)
+    try:
+        deeplink_index.sync(ids)
+    except Exception as e:
+        print(f"ERROR: Deep-link index sync failed: {e}")
+    if STATIC_REGENERATE_ON_WRITE: static_site.schedule(tags, ids)
 
 # ======================================================================
-# --- Admin and Other Routes ---
+# --- Search Engine (in-process inverted index) ---
 # ======================================================================
-@app.route('/admin', methods=["GET", "POST"])
-@requires_auth
-def admin():
-    if request.method == "POST":
-        user_title = request.form.get("title")
-        content_type = request.form.get("content_type", "movie")
-        tmdb_data = get_tmdb_details_from_api(user_title, content_type) or {}
-        
-        doc_data = {
-            "title": user_title, 
-            "type": content_type,
-            "is_trending": False, 
-            "is_coming_soon": False, 
-            "watch_links": [], "download_links": [], "files": [], "episodes": [], "season_packs": [],
-            "created_at": datetime.now(timezone.utc)
-        }
-        tmdb_data.pop('tmdb_title', None)
-        doc_data.update(tmdb_data)
+SEARCH_FIELD_WEIGHTS = {"title": 3.0, "tmdb_title": 2.5, "genres": 1.5, "overview": 1.0}
+SEARCH_PROJECTION = {**MovieCard.PROJECTION, **dict.fromkeys(SEARCH_FIELD_WEIGHTS, 1)}
+SEARCH_INDEX_REFRESH_SECONDS = int(os.environ.get("SEARCH_INDEX_REFRESH_SECONDS", 900))
+SEARCH_RESULT_LIMIT = 60
+SEARCH_MAX_PREFIX_EXPANSIONS = 64
+SEARCH_PUNCTUATION_RE = re.compile(r"[!-/:-@\[-`{-~।’‘“”]+")
 
-        if content_type == "movie":
-            doc_data['watch_links'] = parse_links_from_string(request.form.get('watch_links_str'))
-            doc_data['download_links'] = parse_links_from_string(request.form.get('download_links_str'))
-            doc_data['files'] = [{"quality": q, "message_id": int(mid)} for q, mid in zip(request.form.getlist('telegram_quality[]'), request.form.getlist('telegram_message_id[]')) if q and mid]
-        else: # Series
-            doc_data["episodes"] = [{"season": int(s), "episode_number": int(e), "title": t, "watch_links": parse_links_from_string(wl), "download_links": parse_links_from_string(dl), "message_id": int(m) if m else None} for s, e, t, wl, dl, m in zip(request.form.getlist('episode_season[]'), request.form.getlist('episode_number[]'), request.form.getlist('episode_title[]'), request.form.getlist('episode_watch_links_str[]'), request.form.getlist('episode_download_links_str[]'), request.form.getlist('episode_message_id[]'))]
-        
-        result = movies.insert_one(doc_data)
-        if result.inserted_id:
-            post_to_public_channel(result.inserted_id, post_type='content')
+def tokenize(text):
+    """ছোট হাতের অক্ষর করে ASCII/বাংলা যতিচিহ্ন বাদ দিয়ে শব্দে ভাগ করে (বাংলা লিপিও ঠিক থাকে)।"""
+    if not text: return []
+    return SEARCH_PUNCTUATION_RE.sub(" ", str(text).lower()).split()
 
-        return redirect(url_for('admin'))
+# ======================================================================
+# --- Fuzzy / Transliteration-aware Title Matching ---
+# ======================================================================
+# বাংলা লিপি → ল্যাটিন (Banglish) ট্রান্সলিটারেশন; অন্তর্নিহিত 'অ' ধ্বনি বাদ দেওয়া হয়
+BANGLA_TO_LATIN = {
+    "ক": "k", "খ": "kh", "গ": "g", "ঘ": "gh", "ঙ": "ng", "চ": "ch", "ছ": "chh", "জ": "j", "ঝ": "jh", "ঞ": "n",
+    "ট": "t", "ঠ": "th", "ড": "d", "ঢ": "dh", "ণ": "n", "ত": "t", "থ": "th", "দ": "d", "ধ": "dh", "ন": "n",
+    "প": "p", "ফ": "ph", "ব": "b", "ভ": "bh", "ম": "m", "য": "j", "র": "r", "ল": "l", "শ": "sh", "ষ": "sh",
+    "স": "s", "হ": "h", "ড়": "r", "ঢ়": "rh", "য়": "y", "ৎ": "t", "ং": "ng", "ঃ": "h", "ঁ": "",
+    "অ": "o", "আ": "a", "ই": "i", "ঈ": "i", "উ": "u", "ঊ": "u", "ঋ": "ri", "এ": "e", "ঐ": "oi", "ও": "o", "ঔ": "ou",
+    "া": "a", "ি": "i", "ী": "i", "ু": "u", "ূ": "u", "ৃ": "ri", "ে": "e", "ৈ": "oi", "ো": "o", "ৌ": "ou",
+    "্": "", "়": "", "০": "0", "১": "1", "২": "2", "৩": "3", "৪": "4", "৫": "5", "৬": "6", "৭": "7", "৮": "8", "৯": "9",
+}
+TITLE_SEASON_RE = re.compile(r"\b(?:complete\s+)?(?:seasons?|sijn|s)\s*\d{1,2}(?:\s*e\d{1,3})?\b|\b(?:ep|episode)\s*\d{1,3}\b")
+TITLE_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+PHONETIC_FOLDS = [("chh", "c"), ("ch", "c"), ("ph", "f"), ("bh", "b"), ("kh", "k"), ("gh", "g"), ("jh", "j"),
+                  ("th", "t"), ("dh", "d"), ("sh", "s"), ("ck", "k"), ("q", "k"), ("z", "j"), ("x", "ks"), ("v", "b")]
+FUZZY_MIN_SIMILARITY = 0.75
+# /addep, /addpack-এ নতুন সিরিজ না বানিয়ে পুরোনোটা ধরার জন্য আরও কড়া সীমা
+SERIES_MATCH_MIN_SIMILARITY = 0.85
+FUZZY_MIN_SCORE = 0.6
+FUZZY_CANDIDATES = 12
 
-    search_query = request.args.get('search', '').strip()
-    query_filter = {}
-    if search_query: query_filter = {"title": {"$regex": search_query, "$options": "i"}}
-    ad_settings = settings.find_one() or {}
-    content_list = process_movie_list(list(movies.find(query_filter).sort('_id', -1)))
-    feedback_list = process_movie_list(list(feedback.find().sort('timestamp', -1)))
-    return render_template_string(admin_html, content_list=content_list, feedback_list=feedback_list, search_query=search_query)
+def transliterate_bangla(text):
+    out = []
+    for index, char in enumerate(text):
+        # য-ফলা (্য) উচ্চারণে স্বরের মতো
+        if char == "্" and text[index + 1:index + 2] == "য":
+            out.append("y")
+        elif char == "য" and index and text[index - 1] == "্":
+            continue
+        else:
+            out.append(BANGLA_TO_LATIN.get(char, char))
+    return "".join(out)
 
+def normalize_title(text):
+    """ছোট হাতের ল্যাটিন, যতিচিহ্ন/সাল/"Season X" বাদ দেওয়া টাইটেল।"""
+    if not text: return ""
+    text = transliterate_bangla(str(text).lower()).replace("'", "").replace("’", "")
+    text = TITLE_SEASON_RE.sub(" ", SEARCH_PUNCTUATION_RE.sub(" ", text))
+    return " ".join(TITLE_YEAR_RE.sub(" ", text).split())
 
-@app.route('/admin/save_ads', methods=['POST'])
-@requires_auth
-def save_ads():
-    ad_codes = { "popunder_code": request.form.get("popunder_code", ""), "social_bar_code": request.form.get("social_bar_code", ""), "banner_ad_code": request.form.get("banner_ad_code", ""), "native_banner_code": request.form.get("native_banner_code", "") }
-    settings.update_one({}, {"$set": ad_codes}, upsert=True)
-    return redirect(url_for('admin'))
+def phonetic_key(normalized):
+    """
+    বানান-ভেদ ধরার জন্য ব্যঞ্জনবর্ণের কঙ্কাল: ডাইগ্রাফ এক করা, শব্দের শুরুর পরের স্বরবর্ণ বাদ,
+    পরপর একই অক্ষর একটিতে নামানো। যেমন "monpura" ও "মনপুরা" দুটোই "mnpr"।
+    """
+    words = []
+    for word in normalized.split():
+        for source, target in PHONETIC_FOLDS: word = word.replace(source, target)
+        key = "a" if word[0] in "aeiouyw" else word[0]
+        for char in word[1:]:
+            if char in "aeiouywh" or char == key[-1]: continue
+            key += char
+        words.append(key)
+    return " ".join(words)
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a, b, max_distance):
+    """Levenshtein distance, বা max_distance ছাড়িয়ে গেলে max_distance + 1।"""
+    if abs(len(a) - len(b)) > max_distance: return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance: return max_distance + 1
+        previous = current
+    return previous[-1]
+
+def similarity(a, b):
+    longest = max(len(a), len(b))
+    if not longest: return 0.0
+    return 1.0 - edit_distance(a, b, longest) / longest
+
+class FuzzyTitleIndex:
+    """
+    ফোনেটিক কী-এর trigram ইনডেক্স। trigram ওভারল্যাপ দিয়ে অল্প কয়েকটি ক্যান্ডিডেট বাছাই করে
+    শুধু সেগুলোর edit distance হিসাব করে, তাই বড় ক্যাটালগেও খুব দ্রুত উত্তর দেয়।
+    SearchIndex-এর লক ব্যবহার করে; আলাদাভাবে থ্রেড-সেফ নয়।
+    """
+    def __init__(self):
+        self._entries = {}
+        self._doc_entries = {}
+        self._postings = {}
+        self._exact = {}
+        self._next_entry = 0
+
+    def add(self, doc):
+        doc_id = str(doc["_id"])
+        variants = {normalize_title(doc.get(field)) for field in ("title", "tmdb_title")} - {""}
+        for normalized in variants:
+            key = phonetic_key(normalized)
+            entry_id = self._next_entry
+            self._next_entry += 1
+            self._entries[entry_id] = (doc_id, normalized, key, doc.get("type"))
+            self._doc_entries.setdefault(doc_id, []).append(entry_id)
+            self._exact.setdefault(normalized, set()).add(doc_id)
+            for gram in trigrams(key):
+                self._postings.setdefault(gram, set()).add(entry_id)
+
+    def remove(self, doc_id):
+        for entry_id in self._doc_entries.pop(doc_id, ()):
+            _, normalized, key, _ = self._entries.pop(entry_id)
+            exact = self._exact.get(normalized)
+            if exact is not None:
+                exact.discard(doc_id)
+                if not exact: del self._exact[normalized]
+            for gram in trigrams(key):
+                entries = self._postings.get(gram)
+                if entries is None: continue
+                entries.discard(entry_id)
+                if not entries: del self._postings[gram]
+
+    def match(self, text, limit=10, content_type=None, min_similarity=FUZZY_MIN_SIMILARITY, min_score=FUZZY_MIN_SCORE):
+        """
+        Returns [(doc_id, similarity)] sorted best-first. `min_similarity` ফোনেটিক কী-এর সীমা,
+        `min_score` চূড়ান্ত (কী + টাইটেল মেশানো) স্কোরের সীমা।
+        """
+        normalized = normalize_title(text)
+        if not normalized: return []
+        best = {}
+        for doc_id in self._exact.get(normalized, ()):
+            if content_type is None or self._doc_type(doc_id) == content_type: best[doc_id] = 1.0
+        key = phonetic_key(normalized)
+        # prefix filtering: অর্ধেক trigram মিলতে হলে সবচেয়ে বিরল (len - needed + 1)টির
+        # অন্তত একটি মিলতেই হবে, তাই শুধু সেগুলোর posting list থেকে ক্যান্ডিডেট নেওয়া হয়
+        postings = sorted((self._postings.get(gram, frozenset()) for gram in trigrams(key)), key=len)
+        needed = (len(postings) + 1) // 2
+        candidates = set().union(*postings[:len(postings) - needed + 1])
+        overlap = [(entry_id, sum(entry_id in entries for entries in postings)) for entry_id in candidates]
+        for entry_id, shared in heapq.nlargest(FUZZY_CANDIDATES, overlap, key=lambda item: item[1]):
+            if shared < needed: break
+            doc_id, entry_normalized, entry_key, entry_type = self._entries[entry_id]
+            if content_type is not None and entry_type != content_type: continue
+            key_score = similarity(key, entry_key)
+            if key_score < min_similarity: continue
+            score = 0.6 * key_score + 0.4 * similarity(normalized, entry_normalized)
+            if score >= min_score and score > best.get(doc_id, 0.0): best[doc_id] = score
+        return heapq.nlargest(limit, best.items(), key=lambda item: item[1])
+
+    def _doc_type(self, doc_id):
+        entry_ids = self._doc_entries.get(doc_id)
+        return self._entries[entry_ids[0]][3] if entry_ids else None
+
+class SearchIndex:
+    """
+    title, tmdb_title, overview ও genres-এর উপর ইনভার্টেড ইনডেক্স। ফিল্ড-ওয়েটেড TF × IDF দিয়ে
+    র‍্যাঙ্কিং করে, শেষ শব্দটি prefix হিসেবে মেলায় (type-ahead)। প্রথম সার্চে বিল্ড হয়, লেখার
+    পর `refresh_ids()` দিয়ে ইনক্রিমেন্টালি আপডেট হয় এবং অন্য ওয়ার্কারের লেখা ধরতে নির্দিষ্ট
+    সময় পরপর পুরোটা রিবিল্ড হয়। কোনো শব্দ না মিললে FuzzyTitleIndex দিয়ে বানান-ভুল/বাংলা-ইংরেজি
+    মিশ্র কুয়েরি মেলানো হয়।
+    """
+    def __init__(self, refresh_seconds):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._doc_terms = {}
+        self._cards = {}
+        self._titles = {}
+        self._sorted_terms = []
+        self._fuzzy = FuzzyTitleIndex()
+        self._built_at = None
+
+    def build(self):
+        postings, doc_terms, cards, titles, fuzzy = {}, {}, {}, {}, FuzzyTitleIndex()
+        for doc in movies.find({}, SEARCH_PROJECTION):
+            self._add(doc, postings, doc_terms, cards, titles)
+            fuzzy.add(doc)
+        with self._lock:
+            self._postings, self._doc_terms, self._cards, self._titles, self._fuzzy = postings, doc_terms, cards, titles, fuzzy
+            self._sorted_terms = sorted(postings)
+            self._built_at = time.monotonic()
+        print(f"INFO: Search index built with {len(cards)} titles and {len(postings)} terms.")
+
+    def ensure_fresh(self):
+        if self._built_at is None or time.monotonic() - self._built_at > self.refresh_seconds:
+            self.build()
+
+    def mark_stale(self):
+        self._built_at = None
+
+    def refresh_ids(self, ids):
+        """নির্দিষ্ট ডকুমেন্টগুলো আবার পড়ে ইনডেক্স আপডেট করে (মুছে ফেলা হলে ইনডেক্স থেকেও বাদ)।"""
+        if self._built_at is None: return
+        ids = list(ids)
+        found = {doc["_id"]: doc for doc in movies.find({"_id": {"$in": ids}}, SEARCH_PROJECTION)}
+        with self._lock:
+            for doc_id in ids:
+                self._remove(str(doc_id))
+                self._fuzzy.remove(str(doc_id))
+                if doc_id in found:
+                    self._fuzzy.add(found[doc_id])
+                    for term in self._add(found[doc_id], self._postings, self._doc_terms, self._cards, self._titles):
+                        if len(self._postings[term]) == 1: bisect.insort(self._sorted_terms, term)
+
+    def _add(self, doc, postings, doc_terms, cards, titles):
+        doc_id = str(doc["_id"])
+        weights = {}
+        for field, field_weight in SEARCH_FIELD_WEIGHTS.items():
+            value = doc.get(field)
+            tokens = tokenize(" ".join(value) if isinstance(value, list) else value)
+            counts = {}
+            for token in tokens: counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                weights[token] = weights.get(token, 0.0) + field_weight * (1.0 + math.log(count))
+        for term, weight in weights.items():
+            postings.setdefault(term, {})[doc_id] = weight
+        doc_terms[doc_id] = set(weights)
+        cards[doc_id] = MovieCard(doc)
+        titles[doc_id] = " ".join(tokenize(doc.get("title")))
+        return weights
+
+    def _remove(self, doc_id):
+        for term in self._doc_terms.pop(doc_id, ()):
+            docs = self._postings.get(term)
+            if docs is None: continue
+            docs.pop(doc_id, None)
+            if not docs:
+                del self._postings[term]
+                index = bisect.bisect_left(self._sorted_terms, term)
+                if index < len(self._sorted_terms) and self._sorted_terms[index] == term: del self._sorted_terms[index]
+        self._cards.pop(doc_id, None)
+        self._titles.pop(doc_id, None)
+
+    def _expand_prefix(self, prefix):
+        start = bisect.bisect_left(self._sorted_terms, prefix)
+        terms = []
+        for term in self._sorted_terms[start:start + SEARCH_MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix): break
+            terms.append(term)
+        return terms
+
+    def search(self, query, limit=SEARCH_RESULT_LIMIT, prefix=True):
+        """Returns a ranked list of (MovieCard, score)."""
+        self.ensure_fresh()
+        tokens = tokenize(query)
+        if not tokens: return []
+        with self._lock:
+            scores = self._ranked_scores(tokens, prefix)
+            if not scores:
+                return [(self._cards[doc_id], score) for doc_id, score in self._fuzzy.match(query, limit)]
+            normalized_query = " ".join(tokens)
+            for doc_id in scores:
+                if self._titles[doc_id].startswith(normalized_query): scores[doc_id] *= 1.5
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(self._cards[doc_id], score) for doc_id, score in ranked]
+
+    def match_title(self, title, content_type=None, min_similarity=FUZZY_MIN_SIMILARITY, min_score=FUZZY_MIN_SCORE):
+        """সবচেয়ে কাছের টাইটেলের (doc_id, similarity), না পেলে None।"""
+        self.ensure_fresh()
+        with self._lock:
+            matches = self._fuzzy.match(title, 1, content_type, min_similarity, min_score)
+        return matches[0] if matches else None
+
+    def _ranked_scores(self, tokens, prefix):
+        """সব শব্দ মিলেছে এমন ডকুমেন্টের {doc_id: score} (AND সেমান্টিক্স)।"""
+        total = len(self._cards) or 1
+        scores = {}
+        for position, token in enumerate(tokens):
+            is_last = position == len(tokens) - 1
+            terms = self._expand_prefix(token) if prefix and is_last else ([token] if token in self._postings else [])
+            token_scores = {}
+            for term in terms:
+                docs = self._postings[term]
+                idf = math.log(1 + total / len(docs))
+                # পুরো শব্দ মিললে prefix-match-এর চেয়ে বেশি স্কোর
+                boost = 1.0 if term == token else 0.6
+                for doc_id, weight in docs.items():
+                    token_scores[doc_id] = max(token_scores.get(doc_id, 0.0), weight * idf * boost)
+            if position == 0:
+                scores = token_scores
+            else:
+                scores = {doc_id: score + token_scores[doc_id] for doc_id, score in scores.items() if doc_id in token_scores}
+            if not scores: return {}
+        return scores
+
+search_index = SearchIndex(SEARCH_INDEX_REFRESH_SECONDS)
+
+# ======================================================================
+# --- Buffered View Counter ---
+# ======================================================================
+VIEW_FLUSH_INTERVAL = int(os.environ.get("VIEW_FLUSH_INTERVAL", 30))
+# Serverless-এ শিডিউলার/atexit নির্ভরযোগ্য নয়, তাই প্রতিটি ভিউ রিকোয়েস্টের ভেতরেই লেখা হয় (আগের মতো সরাসরি $inc)
+VIEW_FLUSH_MAX_PENDING = int(os.environ.get("VIEW_FLUSH_MAX_PENDING", 1 if SERVERLESS else 5000))
+VIEW_COUNTER_SHARDS = 16
+
+class ViewCounter:
+    """
+    প্রতিটি ভিউতে ডাটাবেজে লেখার বদলে মেমোরিতে গুনে রাখে এবং নির্দিষ্ট সময় পরপর একটি
+    `bulk_write`-এ সব `$inc` পাঠায়। লক কনটেনশন কমাতে কাউন্টার কয়েকটি শার্ডে ভাগ করা।
+    ক্র্যাশ হলে সর্বোচ্চ VIEW_FLUSH_INTERVAL সেকেন্ড বা VIEW_FLUSH_MAX_PENDING-টি ভিউ হারাতে পারে;
+    স্বাভাবিক শাটডাউনে বাকি ভিউ flush হয়ে যায়।
+    """
+    def __init__(self, shards, flush_interval, max_pending):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._shards = [[{}, threading.Lock()] for _ in range(shards)]
+        self._pending = 0
+        self._flush_lock = threading.Lock()
+        self._version_stale = False
+        self._bumped_at = 0.0
+        self._scheduler = None
+        self._scheduler_lock = threading.Lock()
+
+    def record(self, movie_id, count=1):
+        shard = self._shards[hash(movie_id) % len(self._shards)]
+        with shard[1]:
+            shard[0][movie_id] = shard[0].get(movie_id, 0) + count
+        self._pending += count
+        if self._scheduler is None and self.max_pending > 1: self._start_scheduler()
+        if self._pending >= self.max_pending: self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            batch = {}
+            for shard in self._shards:
+                with shard[1]:
+                    counts, shard[0] = shard[0], {}
+                for movie_id, count in counts.items():
+                    batch[movie_id] = batch.get(movie_id, 0) + count
+            self._pending = 0
+            if batch:
+                try:
+                    movies.bulk_write([UpdateOne({"_id": movie_id}, {"$inc": {"view_count": count}}) for movie_id, count in batch.items()], ordered=False)
+                except Exception as e:
+                    print(f"ERROR: Failed to flush {len(batch)} view counts, will retry: {e}")
+                    for movie_id, count in batch.items():
+                        shard = self._shards[hash(movie_id) % len(self._shards)]
+                        with shard[1]:
+                            shard[0][movie_id] = shard[0].get(movie_id, 0) + count
+                    return
+                self._version_stale = True
+            # serverless-এ প্রতিটি ভিউই flush, তাই ETag-এর ভার্সন CATALOG_VERSION_TTL-এ সর্বোচ্চ একবার
+            # বাড়ে (অন্যরা ভার্সন এর চেয়ে ঘন ঘন পড়েও না); বাদ পড়া bump পরের flush-এ হয়
+            if not self._version_stale or time.monotonic() - self._bumped_at < CATALOG_VERSION_TTL: return
+            self._version_stale, self._bumped_at = False, time.monotonic()
+        try:
+            views_version.bump()
+        except Exception as e:
+            print(f"ERROR: Views version bump failed: {e}")
+            self._version_stale = True
+
+    def shutdown(self):
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+        self.flush()
+
+    def _start_scheduler(self):
+        # প্রথম ভিউতে চালু হয়, তাই gunicorn fork-এর পর প্রতিটি ওয়ার্কারে আলাদা শিডিউলার থাকে
+        with self._scheduler_lock:
+            if self._scheduler is not None: return
+            from apscheduler.schedulers.background import BackgroundScheduler
+            scheduler = BackgroundScheduler(daemon=True)
+            scheduler.add_job(self.flush, "interval", seconds=self.flush_interval, max_instances=1, coalesce=True)
+            scheduler.start()
+            atexit.register(self.shutdown)
+            self._scheduler = scheduler
+
+view_counter = ViewCounter(VIEW_COUNTER_SHARDS, VIEW_FLUSH_INTERVAL, VIEW_FLUSH_MAX_PENDING)
+
+# ======================================================================
+# --- Precomputed Related Titles (NumPy) ---
+# ======================================================================
+RELATED_LIMIT = 12
+RELATED_BLOCK_ROWS = 256
+RELATED_MATRIX_TTL = int(os.environ.get("RELATED_MATRIX_TTL", 3600))
+RELATED_PROJECTION = {"genres": 1, "vote_average": 1, "release_date": 1, "related_signature": 1}
+
+class RelatedTitlesIndex:
+    """
+    প্রতিটি টাইটেলের জন্য "You Might Also Like" তালিকা আগে থেকে হিসাব করে ডকুমেন্টের
+    `related` ফিল্ডে রাখে: [{"_id": ..., "score": ...}], স্কোর অনুযায়ী সাজানো।
+
+    score(i, j) = Jaccard(genres_i, genres_j) × weight_j, যেখানে weight রেটিং ও রিলিজের সাল
+    থেকে আসে। টাইটেল × জনরা ম্যাট্রিক্সের উপর NumPy দিয়ে ব্লক আকারে হিসাব হয়। NumPy না
+    থাকলে এটি নিষ্ক্রিয় থাকে এবং ডিটেইল পেজ আগের মতো জনরা কুয়েরিতে ফিরে যায়।
+    NumPy requirements.txt-এ নেই (Vercel-এর ১৫mb lambda সীমা); দীর্ঘমেয়াদী সার্ভারে আলাদা করে ইনস্টল করুন।
+    """
+    def __init__(self, matrix_ttl):
+        self.matrix_ttl = matrix_ttl
+        self._lock = threading.Lock()
+        self._np = None
+        self._ids, self._rows, self._genres = [], {}, {}
+        self._matrix = self._sizes = self._weights = None
+        self._built_at = None
+        self._pending_ids = set()
+        self._pending_rebuild = False
+        self._pending_lock = threading.Lock()
+        self._queue = KeyedWorkerPool("related-refresh", 1)
+
+    def available(self):
+        if self._np is None:
+            try:
+                import numpy
+                self._np = numpy
+            except ImportError:
+                print("WARNING: numpy is not installed; related titles fall back to a genre query.")
+                self._np = False
+        return bool(self._np)
+
+    def mark_stale(self):
+        self._built_at = None
+
+    @staticmethod
+    def title_weight(doc):
+        try:
+            rating = min(max(float(doc.get("vote_average") or 0), 0.0), 10.0)
+        except (TypeError, ValueError):
+            rating = 0.0
+        release_date = doc.get("release_date") or ""
+        year = int(release_date[:4]) if release_date[:4].isdigit() else doc["_id"].generation_time.year
+        age = max(datetime.now(timezone.utc).year - year, 0)
+        return (0.5 + rating / 20) * (0.5 + 0.5 * math.exp(-age / 5))
+
+    @classmethod
+    def signature(cls, doc):
+        """জনরা ও ওজন না বদলালে (যেমন শুধু নতুন এপিসোড) আবার হিসাব করার দরকার নেই।"""
+        return "|".join(sorted(doc.get("genres") or [])) + f"#{cls.title_weight(doc):.4f}"
+
+    def _load(self):
+        np = self._np
+        docs = list(movies.find({}, RELATED_PROJECTION))
+        genres = {}
+        for doc in docs:
+            for genre in doc.get("genres") or []: genres.setdefault(genre, len(genres))
+        matrix = np.zeros((len(docs), max(len(genres), 1)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for genre in doc.get("genres") or []: matrix[row, genres[genre]] = 1.0
+        self._ids = [doc["_id"] for doc in docs]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._genres = genres
+        self._matrix = matrix
+        self._sizes = matrix.sum(axis=1)
+        self._weights = np.array([self.title_weight(doc) for doc in docs], dtype=np.float32)
+        self._built_at = time.monotonic()
+        return [self.signature(doc) for doc in docs]
+
+    def _set_row(self, doc):
+        np = self._np
+        new_genres = [genre for genre in doc.get("genres") or []]
+        for genre in new_genres:
+            if genre not in self._genres:
+                self._genres[genre] = len(self._genres)
+                if self._genres[genre] >= self._matrix.shape[1]:
+                    self._matrix = np.hstack([self._matrix, np.zeros((self._matrix.shape[0], 1), dtype=np.float32)])
+        vector = np.zeros(self._matrix.shape[1], dtype=np.float32)
+        for genre in new_genres: vector[self._genres[genre]] = 1.0
+        weight = self.title_weight(doc)
+        row = self._rows.get(doc["_id"])
+        if row is None:
+            row = len(self._ids)
+            self._ids.append(doc["_id"])
+            self._rows[doc["_id"]] = row
+            self._matrix = np.vstack([self._matrix, vector[None, :]])
+            self._sizes = np.append(self._sizes, vector.sum())
+            self._weights = np.append(self._weights, np.float32(weight))
+            return
+        self._matrix[row] = vector
+        self._sizes[row] = vector.sum()
+        self._weights[row] = weight
+
+    def _clear_row(self, doc_id):
+        row = self._rows.pop(doc_id, None)
+        if row is None: return
+        # সারি শূন্য করলে Jaccard 0 হয়, তাই আর কারও তালিকায় আসবে না
+        self._matrix[row] = 0.0
+        self._sizes[row] = 0.0
+        self._weights[row] = 0.0
+
+    def _jaccard(self, rows):
+        np = self._np
+        intersection = self._matrix[rows] @ self._matrix.T
+        union = self._sizes[rows][:, None] + self._sizes[None, :] - intersection
+        with np.errstate(divide="ignore", invalid="ignore"):
+            jaccard = np.where(union > 0, intersection / union, 0.0)
+        jaccard[np.arange(len(rows)), rows] = 0.0
+        return jaccard
+
+    def _top_related(self, scores):
+        np = self._np
+        k = min(RELATED_LIMIT, len(scores))
+        if not k: return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [{"_id": self._ids[j], "score": round(float(scores[j]), 5)} for j in top if scores[j] > 0]
+
+    def rebuild(self):
+        """সব টাইটেলের তালিকা নতুন করে হিসাব করে লেখে (CLI: `flask rebuild-related`)।"""
+        if not self.available(): return 0
+        np = self._np
+        with self._lock:
+            signatures = self._load()
+            ops = []
+            for start in range(0, len(self._ids), RELATED_BLOCK_ROWS):
+                rows = np.arange(start, min(start + RELATED_BLOCK_ROWS, len(self._ids)))
+                scores = self._jaccard(rows) * self._weights[None, :]
+                for offset, row in enumerate(rows):
+                    ops.append(UpdateOne({"_id": self._ids[row]}, {"$set": {"related": self._top_related(scores[offset]), "related_signature": signatures[row]}}))
+                if len(ops) >= 1000:
+                    movies.bulk_write(ops, ordered=False)
+                    ops = []
+            if ops: movies.bulk_write(ops, ordered=False)
+        print(f"SUCCESS: Rebuilt related titles for {len(self._ids)} titles.")
+        return len(self._ids)
+
+    def schedule(self, ids=None):
+        """
+        অ্যাডমিনের লেখা আটকে না রেখে একটি ব্যাকগ্রাউন্ড থ্রেডে হিসাব করে; এর মধ্যে জমা হওয়া আইডি
+        একসাথে এক ব্যাচে যায়। ids=None মানে পুরো তালিকা নতুন করে (ইমপোর্ট/রিস্টোর)।
+        Serverless-এ থ্রেড ফ্রিজ হয়ে যায়, তাই সেখানে রিকোয়েস্টের ভেতরেই চলে।
+        """
+        if not self.available(): return
+        with self._pending_lock:
+            if ids is None: self._pending_rebuild = True
+            else: self._pending_ids.update(ids)
+        if SERVERLESS: self._run_pending()
+        else: self._queue.submit("related", self._run_pending)
+
+    def _run_pending(self):
+        with self._pending_lock:
+            rebuild, ids = self._pending_rebuild, self._pending_ids
+            self._pending_rebuild, self._pending_ids = False, set()
+        try:
+            if rebuild: self.rebuild()
+            elif ids: self.refresh_ids(ids)
+        except Exception as e:
+            print(f"ERROR: Related titles refresh failed: {e}")
+            self.mark_stale()
+
+    def refresh_ids(self, ids):
+        """যোগ/এডিট/ডিলিট হওয়া টাইটেলের নিজের তালিকা এবং অন্যদের তালিকায় এর অবস্থান আপডেট করে।"""
+        if not ids or not self.available(): return
+        np = self._np
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at > self.matrix_ttl: self._load()
+            found = {doc["_id"]: doc for doc in movies.find({"_id": {"$in": list(ids)}}, RELATED_PROJECTION)}
+            changed = []
+            for doc_id in ids:
+                if doc_id not in found:
+                    self._clear_row(doc_id)
+                    changed.append(doc_id)
+                    continue
+                doc = found[doc_id]
+                if doc.get("related_signature") == self.signature(doc): continue
+                self._set_row(doc)
+                changed.append(doc_id)
+            if not changed: return
+            # পরিবর্তিত সব টাইটেল একটি (ইনডেক্সড) কুয়েরিতে অন্যদের তালিকা থেকে সরানো হয়
+            movies.update_many({"related._id": {"$in": changed}}, {"$pull": {"related": {"_id": {"$in": changed}}}})
+            changed_rows = {self._rows[doc_id] for doc_id in changed if doc_id in self._rows}
+            ops = []
+            for row in changed_rows:
+                doc_id = self._ids[row]
+                jaccard = self._jaccard(np.array([row]))[0]
+                ops.append(UpdateOne({"_id": doc_id}, {"$set": {"related": self._top_related(jaccard * self._weights), "related_signature": self.signature(found[doc_id])}}))
+                # অন্য টাইটেলের দিক থেকে স্কোর: Jaccard প্রতিসম, ওজন এই টাইটেলের। তালিকা ভরা থাকলে
+                # শুধু তখনই লেখা হয় যখন নতুন স্কোর শেষ এন্ট্রির চেয়ে বেশি
+                reverse = jaccard * self._weights[row]
+                for other in np.nonzero(reverse > 0)[0]:
+                    if other in changed_rows: continue
+                    score = round(float(reverse[other]), 5)
+                    last = f"related.{RELATED_LIMIT - 1}"
+                    ops.append(UpdateOne({"_id": self._ids[other], "$or": [{last: {"$exists": False}}, {f"{last}.score": {"$lt": score}}]},
+                                         {"$push": {"related": {"$each": [{"_id": doc_id, "score": score}], "$sort": {"score": -1}, "$slice": RELATED_LIMIT}}}))
+            for start in range(0, len(ops), 1000):
+                movies.bulk_write(ops[start:start + 1000], ordered=False)
+
+related_index = RelatedTitlesIndex(RELATED_MATRIX_TTL)
+
+@app.cli.command("rebuild-related")
+def rebuild_related_command():
+    """Recompute the precomputed related-titles list of every title."""
+    related_index.rebuild()
+
+# ======================================================================
+# --- Index Management & Query-Plan Verification ---
+# ======================================================================
+# রাউটগুলোর filter + sort('_id', -1) শেপ অনুযায়ী কম্পাউন্ড ইনডেক্স
+MOVIE_INDEXES = [
+    IndexModel([("is_coming_soon", 1), ("_id", -1)], name="coming_soon_recent"),
+    IndexModel([("type", 1), ("is_coming_soon", 1), ("_id", -1)], name="type_coming_soon_recent"),
+    IndexModel([("is_trending", 1), ("is_coming_soon", 1), ("_id", -1)], name="trending_coming_soon_recent"),
+    IndexModel([("genres", 1), ("_id", -1)], name="genres_recent"),
+    IndexModel([("poster_badge", 1), ("_id", -1)], name="poster_badge_recent"),
+    IndexModel([("tmdb_id", 1), ("type", 1)], name="tmdb_id_type"),
+    IndexModel([("created_at", -1), ("_id", -1)], name="created_at_recent"),
+    IndexModel([("view_count", -1), ("_id", -1)], name="view_count_recent"),
+    # related-titles রিফ্রেশে পরিবর্তিত টাইটেল অন্যদের তালিকা থেকে সরাতে
+    IndexModel([("related._id", 1)], name="related_id"),
+]
+FEEDBACK_INDEXES = [IndexModel([("timestamp", -1), ("_id", -1)], name="timestamp_recent")]
+DEEPLINK_INDEXES = [IndexModel([("movie_id", 1)], name="movie_id")]
+EPISODE_INDEXES = [IndexModel([("series_id", 1), ("kind", 1), ("season", 1), ("episode_number", 1)], name="series_kind_season_episode", unique=True)]
+TMDB_CACHE_INDEXES = [IndexModel([("expires_at", 1)], name="expires_at_ttl", expireAfterSeconds=0)]
+WEBHOOK_INDEXES = [IndexModel([("received_at", 1)], name="received_at_ttl", expireAfterSeconds=WEBHOOK_DEDUP_TTL)]
+IMPORT_JOB_INDEXES = [IndexModel([("started_at", 1)], name="started_at_ttl", expireAfterSeconds=7 * 86400)]
+
+def ensure_indexes():
+    created = movies.create_indexes(MOVIE_INDEXES) + feedback.create_indexes(FEEDBACK_INDEXES) + webhook_updates.create_indexes(WEBHOOK_INDEXES)
+    created += tmdb_cache.create_indexes(TMDB_CACHE_INDEXES) + episodes_collection.create_indexes(EPISODE_INDEXES)
+    created += deeplinks.create_indexes(DEEPLINK_INDEXES) + import_jobs.create_indexes(IMPORT_JOB_INDEXES)
+    print(f"SUCCESS: Ensured indexes: {', '.join(created)}")
+    return created
+
+def route_query_shapes():
+    """প্রতিটি রাউট/কমান্ড যে কুয়েরি চালায় তার তালিকা: (label, collection, filter, sort)।"""
+    sample = movies.find_one({"genres.0": {"$exists": True}, "poster_badge": {"$nin": [None, ""]}}, {"genres": 1, "poster_badge": 1}) or {}
+    genre = (sample.get("genres") or ["Drama"])[0]
+    badge = sample.get("poster_badge") or "Hindi"
+    released = {"is_coming_soon": {"$ne": True}}
+    recent = [("_id", -1)]
+    return [
+        ("/trending_movies", movies, {"is_trending": True, **released}, recent),
+        ("/movies_only", movies, {"type": "movie", **released}, recent),
+        ("/webseries", movies, {"type": "series", **released}, recent),
+        ("/coming_soon", movies, {"is_coming_soon": True}, recent),
+        ("/recently_added", movies, released, recent),
+        ("/genre/<name>", movies, {"genres": genre}, recent),
+        ("/badge/<name>", movies, {"poster_badge": badge}, recent),
+        ("/movie/<id> related", movies, {"genres": {"$in": [genre]}, "_id": {"$ne": ObjectId()}}, None),
+        ("/admin/api/content", movies, {}, recent),
+        ("/admin/api/content?sort=created_at", movies, {}, [("created_at", -1), ("_id", -1)]),
+        ("/admin/api/content?sort=view_count", movies, {}, [("view_count", -1), ("_id", -1)]),
+        ("related refresh $pull", movies, {"related._id": {"$in": [ObjectId()]}}, None),
+        ("webhook /add upsert", movies, {"tmdb_id": 0}, None),
+        ("webhook series upsert", movies, {"tmdb_id": 0, "type": "series"}, None),
+        ("/admin/api/feedback", feedback, {}, [("timestamp", -1), ("_id", -1)]),
+    ]
+
+def find_plan_problems(plan):
+    """winningPlan ট্রি ঘুরে COLLSCAN ও in-memory SORT স্টেজ খুঁজে বের করে।"""
+    problems = []
+    stage = plan.get("stage")
+    if stage == "COLLSCAN": problems.append("collection scan")
+    elif stage == "SORT": problems.append("in-memory sort")
+    children = plan.get("inputStages") or [plan[key] for key in ("inputStage", "queryPlan") if key in plan]
+    for child in children:
+        problems.extend(find_plan_problems(child))
+    return problems
+
+def explain_route_queries():
+    """প্রতিটি কুয়েরির explain() চালিয়ে রিপোর্ট প্রিন্ট করে। Returns the number of problem queries."""
+    failures = 0
+    for label, collection, query_filter, sort in route_query_shapes():
+        cursor = collection.find(query_filter, {"_id": 1}).limit(LIST_PAGE_SIZE + 1)
+        if sort: cursor = cursor.sort(sort)
+        plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        problems = find_plan_problems(plan)
+        if problems:
+            failures += 1
+            print(f"WARNING: {label}: {', '.join(sorted(set(problems)))}")
+        else:
+            print(f"OK: {label}")
+    return failures
+
+@app.cli.command("ensure-indexes")
+def ensure_indexes_command():
+    """Create the indexes the public routes and webhook need."""
+    ensure_indexes()
+
+@app.cli.command("check-indexes")
+def check_indexes_command():
+    """Explain every route query and fail on collection scans or in-memory sorts."""
+    if explain_route_queries(): sys.exit(1)
+
+if env_flag("ENSURE_INDEXES_ON_STARTUP"):
+    try:
+        ensure_indexes()
+        if env_flag("EXPLAIN_QUERIES_ON_STARTUP"): explain_route_queries()
+    except Exception as e:
+        print(f"ERROR: Index bootstrap failed: {e}")
+
+# ======================================================================
+# --- Bulk Catalog Import ---
+# ======================================================================
+IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", 8))
+IMPORT_BATCH_SIZE = 200
+IMPORT_DIGEST_SIZE = 15   # একটি ঘোষণা মেসেজে সর্বোচ্চ কয়টি টাইটেল
+IMPORT_MAX_FAILURES_REPORTED = 100
+
+def iter_import_records(stream, fmt):
+    """CSV (হেডারসহ) বা JSONL বাইনারি স্ট্রিম থেকে এক এক করে (line_no, record) দেয়।"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for line_no, row in enumerate(csv.DictReader(text), start=2):
+            yield line_no, row
+        return
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip(): continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            record = {"_error": f"invalid JSON: {e}"}
+        yield line_no, record if isinstance(record, dict) else {"_error": "expected a JSON object"}
+
+def import_links(value):
+    """লিংক কলামে "Hindi: url, English: url" স্ট্রিং বা [{lang, url}] লিস্ট দুটোই চলে।"""
+    if isinstance(value, list): return [{"lang": str(l.get("lang", "Link")).title(), "url": l["url"]} for l in value if l.get("url")]
+    return parse_links_from_string(value or "")
+
+def build_import_doc(record):
+    """একটি রেকর্ড TMDb দিয়ে এনরিচ করে `movies`-এর ডকুমেন্ট বানায়। ব্যর্থ হলে ValueError।"""
+    if record.get("_error"): raise ValueError(record["_error"])
+    title = (record.get("title") or "").strip()
+    if not title: raise ValueError("missing title")
+    content_type = "series" if (record.get("type") or "movie").strip().lower() in ("series", "tv") else "movie"
+    year = str(record.get("year") or "").strip() or None
+    badge = (record.get("badge") or record.get("language") or "").strip() or None
+
+    tmdb_data = get_tmdb_details_from_api(title, content_type, year)
+    if not tmdb_data: raise ValueError("no TMDb match")
+    tmdb_data.pop("tmdb_title", None)
+    doc = {**tmdb_data, "title": title, "type": content_type, "poster_badge": badge,
+           "languages": [badge.title()] if badge else tmdb_data.get("languages", [])}
+    if content_type == "movie":
+        doc["watch_links"] = import_links(record.get("watch_links"))
+        doc["download_links"] = import_links(record.get("download_links"))
+    return doc
+
+def write_import_batch(docs):
+    """tmdb_id অনুযায়ী upsert; নতুন তৈরি হওয়া ডকুমেন্টের _id লিস্ট ফেরত দেয়।"""
+    now = datetime.now(timezone.utc)
+    operations = []
+    for doc in docs:
+        on_insert = {"created_at": now, "is_trending": False, "is_coming_soon": False, "files": []}
+        if not EPISODES_IN_COLLECTION: on_insert.update(dict.fromkeys(SERIES_MEDIA_FIELDS, []))
+        on_insert.update({"watch_links": [], "download_links": []} if doc["type"] == "series" else {})
+        operations.append(UpdateOne({"tmdb_id": doc["tmdb_id"], "type": doc["type"]},
+                                    {"$set": doc, "$setOnInsert": {k: v for k, v in on_insert.items() if k not in doc}}, upsert=True))
+    result = movies.bulk_write(operations, ordered=False)
+    return [result.upserted_ids[index] for index in sorted(result.upserted_ids)]
+
+def announce_import_digest(content_ids):
+    """নতুন টাইটেলগুলো প্রতিটির আলাদা পোস্টের বদলে কয়েকটি ডাইজেস্ট মেসেজে পাবলিক চ্যানেলে পাঠায়।"""
+    if not PUBLIC_CHANNEL_ID or not WEBSITE_URL or not content_ids: return
+    for start in range(0, len(content_ids), IMPORT_DIGEST_SIZE):
+        chunk = content_ids[start:start + IMPORT_DIGEST_SIZE]
+        lines = [f"🆕 *{len(chunk)} New Titles Added*"]
+        with app.test_request_context():
+            for doc in movies.find({"_id": {"$in": chunk}}, {"title": 1, "release_date": 1}):
+                year = f" \\({escape_markdown(doc['release_date'][:4])}\\)" if doc.get("release_date") else ""
+                link = f"{WEBSITE_URL.rstrip('/')}{url_for('movie_detail', movie_id=str(doc['_id']))}"
+                lines.append(f"🎬 [{escape_markdown(doc.get('title', 'No Title'))}]({link}){year}")
+        telegram.send("sendMessage", chat_id=PUBLIC_CHANNEL_ID, text="\n".join(lines), parse_mode="MarkdownV2", disable_web_page_preview=True)
+
+def import_catalog(records, workers=IMPORT_WORKERS, batch_size=IMPORT_BATCH_SIZE, announce=False, progress=None):
+    """
+    রেকর্ডগুলো বাউন্ডেড থ্রেড পুলে TMDb দিয়ে এনরিচ করে ব্যাচে `bulk_write` করে। TMDb-র রেট লিমিট
+    `tmdb` ক্লায়েন্টই মেনে চলে। একসাথে সর্বোচ্চ workers*4টি রেকর্ড মেমোরিতে থাকে, তাই বড় ফাইলও চলে।
+    """
+    report = {"processed": 0, "imported": 0, "created": 0, "failed": 0, "failures": [], "seconds": 0.0, "rate": 0.0}
+    started = time.monotonic()
+    batch, created_ids = {}, []
+
+    def flush():
+        if not batch: return
+        try:
+            new_ids = write_import_batch(list(batch.values()))
+            created_ids.extend(new_ids)
+            report["imported"] += len(batch)
+            report["created"] += len(new_ids)
+        except Exception as e:
+            print(f"ERROR: Import batch write failed: {e}")
+            report["failed"] += len(batch)
+            report["failures"].append({"line": None, "title": f"{len(batch)} titles", "error": f"write failed: {e}"})
+        batch.clear()
+
+    def collect(future, line_no, title):
+        report["processed"] += 1
+        try:
+            doc = future.result()
+            batch[(doc["tmdb_id"], doc["type"])] = doc  # একই ফাইলে ডুপ্লিকেট থাকলে শেষেরটা থাকে
+        except Exception as e:
+            report["failed"] += 1
+            if len(report["failures"]) < IMPORT_MAX_FAILURES_REPORTED:
+                report["failures"].append({"line": line_no, "title": title, "error": str(e)})
+        if len(batch) >= batch_size: flush()
+        if progress and report["processed"] % 100 == 0: progress(report)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="catalog-import") as executor:
+        pending = deque()
+        for line_no, record in records:
+            pending.append((executor.submit(build_import_doc, record), line_no, record.get("title")))
+            while len(pending) >= workers * 4:
+                collect(*pending.popleft())
+        while pending:
+            collect(*pending.popleft())
+    flush()
+
+    invalidate_catalog_cache()
+    if announce: announce_import_digest(created_ids)
+    report["seconds"] = round(time.monotonic() - started, 2)
+    report["rate"] = round(report["processed"] / report["seconds"], 2) if report["seconds"] else 0.0
+    print(f"SUCCESS: Imported {report['imported']} titles ({report['created']} new, {report['failed']} failed) "
+          f"in {report['seconds']}s ({report['rate']} titles/s).")
+    return report
+
+def detect_import_format(filename, fmt=None):
+    if fmt: return fmt
+    return "csv" if filename.lower().endswith(".csv") else "jsonl"
+
+@app.cli.command("import-catalog")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="Defaults to the file extension.")
+@click.option("--workers", default=IMPORT_WORKERS, show_default=True)
+@click.option("--batch-size", default=IMPORT_BATCH_SIZE, show_default=True)
+@click.option("--announce", is_flag=True, help="Post digest messages for new titles to the public channel.")
+def import_catalog_command(path, fmt, workers, batch_size, announce):
+    """Import titles and links from a CSV/JSONL file, enriched from TMDb."""
+    def progress(report):
+        print(f"INFO: {report['processed']} processed, {report['failed']} failed, {report['processed'] / (time.monotonic() - started):.1f} titles/s")
+    started = time.monotonic()
+    with open(path, "rb") as stream:
+        report = import_catalog(iter_import_records(stream, detect_import_format(path, fmt)), workers, batch_size, announce, progress)
+    for failure in report["failures"]:
+        print(f"  line {failure['line']}: {failure['title']!r}: {failure['error']}")
+    telegram.drain(60)
+
+# ======================================================================
+# --- Catalog Export / Restore (gzip JSONL, streaming) ---
+# ======================================================================
+BACKUP_COLLECTIONS = ("movies", "episodes", "settings", "feedback")
+BACKUP_CURSOR_BATCH = 1000
+BACKUP_CHUNK_BYTES = 256 * 1024
+RESTORE_BATCH_SIZE = 1000
+
+def backup_collection(name):
+    return db[name] if name in BACKUP_COLLECTIONS else None
+
+def export_catalog_chunks(names=BACKUP_COLLECTIONS):
+    """
+    কালেকশনগুলো gzip JSONL হিসেবে ছোট ছোট চাংকে দেয়। প্রতিটি কালেকশনের আগে একটি
+    {"_collection": name} লাইন থাকে; ডকুমেন্ট Extended JSON (ObjectId, তারিখ অক্ষত থাকে)।
+    কার্সর থেকে স্ট্রিম হয়, তাই মেমোরি ক্যাটালগের আকারের উপর নির্ভর করে না।
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 → gzip হেডার
+    buffer, size = [], 0
+    for name in names:
+        lines = [json.dumps({"_collection": name})]
+        for doc in backup_collection(name).find({}).batch_size(BACKUP_CURSOR_BATCH):
+            lines.append(json_util.dumps(doc))
+            if len(lines) >= BACKUP_CURSOR_BATCH:
+                buffer.append(compressor.compress(("\n".join(lines) + "\n").encode("utf-8")))
+                size += len(buffer[-1])
+                lines = []
+                if size >= BACKUP_CHUNK_BYTES:
+                    yield b"".join(buffer)
+                    buffer, size = [], 0
+        buffer.append(compressor.compress(("\n".join(lines) + "\n").encode("utf-8")))
+    buffer.append(compressor.flush())
+    yield b"".join(buffer)
+
+def restore_catalog(stream, drop=False):
+    """
+    export_catalog_chunks-এর ফাইল থেকে রিস্টোর করে। ডকুমেন্টগুলো _id অনুযায়ী ব্যাচে upsert হয়
+    (ReplaceOne), তাই একই ব্যাকআপ দুবার চালালেও ডুপ্লিকেট হয় না। `drop` দিলে ডকুমেন্ট প্রথমে
+    `<name>__restore` স্টেজিং কালেকশনে যায়; পুরো ফাইল ঠিকঠাক পড়া শেষ হলে তবেই সেগুলো আসল
+    কালেকশনের জায়গায় rename হয়। ফাইল ভাঙা/অসম্পূর্ণ হলে স্টেজিং মুছে যায়, আসল ডেটা অক্ষত থাকে।
+    """
+    counts, staged, target, batch = {}, {}, None, []
+    started = time.monotonic()
+
+    def flush():
+        if batch:
+            target.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in batch], ordered=False)
+            counts[name] += len(batch)
+            batch.clear()
+
+    try:
+        for line in gzip.GzipFile(fileobj=stream):
+            if not line.strip(): continue
+            doc = json_util.loads(line)
+            if len(doc) == 1 and "_collection" in doc:
+                if target is not None: flush()
+                name = doc["_collection"]
+                if backup_collection(name) is None: raise ValueError(f"Unknown collection in backup: {name}")
+                counts.setdefault(name, 0)
+                if drop:
+                    if name not in staged:
+                        staged[name] = db[f"{name}__restore"]
+                        staged[name].drop()
+                    target = staged[name]
+                else:
+                    target = backup_collection(name)
+                continue
+            if target is None: raise ValueError("Backup file does not start with a collection marker.")
+            batch.append(doc)
+            if len(batch) >= RESTORE_BATCH_SIZE: flush()
+        if target is not None: flush()
+    except Exception:
+        for staging in staged.values(): staging.drop()
+        raise
+
+    for name, staging in staged.items():
+        # ব্যাকআপে খালি কালেকশন: স্টেজিং তৈরিই হয়নি, তাই আসলটা শুধু খালি করা হয়
+        if counts[name]: staging.rename(name, dropTarget=True)
+        else: backup_collection(name).delete_many({})
+    if staged:
+        # rename-এর পর আসল কালেকশনের ইনডেক্স থাকে না
+        try:
+            ensure_indexes()
+        except Exception as e:
+            print(f"ERROR: Index rebuild after restore failed, run `flask ensure-indexes`: {e}")
+
+    invalidate_settings_cache()
+    invalidate_catalog_cache()
+    seconds = round(time.monotonic() - started, 2)
+    print(f"SUCCESS: Restored {', '.join(f'{n} {name}' for name, n in counts.items())} in {seconds}s.")
+    return {"restored": counts, "seconds": seconds}
+
+def backup_filename():
+    return f"moviezone-backup-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.jsonl.gz"
+
+@app.cli.command("export-catalog")
+@click.argument("path", required=False)
+def export_catalog_command(path):
+    """Write movies, settings and feedback to a gzip JSONL backup file."""
+    path = path or backup_filename()
+    started = time.monotonic()
+    with open(path, "wb") as out:
+        for chunk in export_catalog_chunks():
+            out.write(chunk)
+    print(f"SUCCESS: Exported catalog to {path} ({os.path.getsize(path) / 1e6:.1f} MB) in {time.monotonic() - started:.2f}s.")
+
+@app.cli.command("restore-catalog")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--drop", is_flag=True, help="Replace each collection with the backup's contents (applied only after the whole file is read).")
+def restore_catalog_command(path, drop):
+    """Restore a backup written by export-catalog."""
+    with open(path, "rb") as stream:
+        restore_catalog(stream, drop)
+
+# ======================================================================
+# --- Static Site Pre-render (CDN hosting) ---
+# ======================================================================
+# পাবলিক পেজগুলো (হোম, লিস্ট, জনরা, ব্যাজ, প্রতিটি টাইটেল) স্ট্যাটিক HTML হিসেবে লেখা হয়।
+# CDN এগুলো সার্ভ করবে; query string-যুক্ত URL (সার্চ, পেজিনেশন, ?season=) এবং /admin, /contact,
+# /webhook, /api Flask-এ পাঠাতে হবে। STATIC_REGENERATE_ON_WRITE চালু থাকলে প্রতিটি লেখার পর শুধু
+# প্রভাবিত পেজগুলো আবার তৈরি হয় (পেজ ক্যাশের একই ট্যাগ দিয়ে)।
+STATIC_SITE_DIR = os.environ.get("STATIC_SITE_DIR", "static_site")
+STATIC_REGENERATE_ON_WRITE = env_flag("STATIC_REGENERATE_ON_WRITE")
+STATIC_BUILD_WORKERS = int(os.environ.get("STATIC_BUILD_WORKERS", 4))
+STATIC_BUILD_ENVIRON = "moviezone.static_build"
+STATIC_LIST_ENDPOINTS = ("home", "genres_page", "trending_movies", "movies_only", "webseries", "coming_soon", "recently_added_all")
+
+class StaticSiteBuilder:
+    def __init__(self, out_dir, workers):
+        self.out_dir = out_dir
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._queue = KeyedWorkerPool("static-build", 1)
+
+    @contextmanager
+    def _build_lock(self):
+        """
+        একই out_dir-এ একসাথে একটিই বিল্ড চলে: থ্রেডের জন্য লক, অন্য gunicorn ওয়ার্কার বা
+        `flask build-static`-এর জন্য ফাইল লক। তাই manifest-এর load → render → save-এ কারও এন্ট্রি হারায় না।
+        """
+        os.makedirs(self.out_dir, exist_ok=True)
+        with self._lock, open(os.path.join(self.out_dir, ".build.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.out_dir, "manifest.json")
+
+    def all_paths(self):
+        with app.test_request_context():
+            paths = [url_for(endpoint) for endpoint in STATIC_LIST_ENDPOINTS]
+            paths += [url_for('movies_by_genre', genre_name=genre) for genre in all_genres()]
+            paths += [url_for('movies_by_badge', badge_name=badge) for badge in movies.distinct("poster_badge") if isinstance(badge, str) and badge.strip()]
+            paths += [url_for('movie_detail', movie_id=str(doc["_id"])) for doc in movies.find({}, {"_id": 1})]
+        return paths
+
+    def build_all(self):
+        """পুরো সাইট নতুন করে তৈরি করে; আর না থাকা পেজের ফাইল মুছে ফেলে।"""
+        with self._build_lock():
+            started = time.monotonic()
+            old = self._load_manifest()
+            manifest = self._render_many(self.all_paths(), {})
+            for path in set(old) - set(manifest): self._remove(path)
+            self._save(manifest)
+        print(f"SUCCESS: Pre-rendered {len(manifest)} pages to {self.out_dir} in {time.monotonic() - started:.1f}s.")
+        return manifest
+
+    def regenerate(self, tags=None, movie_ids=()):
+        """
+        যেসব পেজের ট্যাগ `tags`-এর সাথে মেলে সেগুলো এবং `movie_ids`-এর ডিটেইল পেজ আবার রেন্ডার করে।
+        নতুন জনরা/ব্যাজ পেজ যোগ হয়, 404 হওয়া পেজ (ডিলিট করা টাইটেল) মুছে যায়। tags=None মানে পুরো সাইট।
+        """
+        if tags is None or not os.path.exists(self.manifest_path): return self.build_all()
+        with self._build_lock():
+            manifest = self._load_manifest()
+            paths = {path for path, entry in manifest.items() if tags & set(entry["tags"])}
+            with app.test_request_context():
+                paths.update(url_for('movie_detail', movie_id=str(movie_id)) for movie_id in movie_ids)
+                for tag in tags:
+                    kind, _, value = tag.partition(":")
+                    if kind == "genre": paths.add(url_for('movies_by_genre', genre_name=value))
+                    elif kind == "badge": paths.add(url_for('movies_by_badge', badge_name=value))
+            manifest = self._render_many(sorted(paths), manifest)
+            self._save(manifest)
+        print(f"INFO: Regenerated {len(paths)} static pages.")
+        return paths
+
+    def schedule(self, tags=None, movie_ids=()):
+        """লেখার রিকোয়েস্ট আটকে না রেখে ব্যাকগ্রাউন্ডে (একটি থ্রেডে, ক্রমানুসারে) রিজেনারেট করে।"""
+        self._queue.submit("static", self._run, tags, movie_ids)
+
+    def _run(self, tags, movie_ids):
+        with app.app_context():
+            self.regenerate(tags, movie_ids)
+
+    def _render_many(self, paths, manifest):
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="static-render") as executor:
+            for path, (status, body, tags) in zip(paths, executor.map(self._render, paths)):
+                if status == 200:
+                    self._write(path, body)
+                    manifest[path] = {"tags": sorted(tags), "updated": datetime.now(timezone.utc).strftime("%Y-%m-%d")}
+                elif status == 404:
+                    self._remove(path)
+                    manifest.pop(path, None)
+                else:
+                    print(f"ERROR: Static render of {path} returned {status}; keeping the previous file.")
+        return manifest
+
+    def _render(self, path):
+        with app.test_request_context(path, base_url=WEBSITE_URL, environ_overrides={STATIC_BUILD_ENVIRON: True}):
+            try:
+                response = app.full_dispatch_request()
+            except Exception as e:
+                print(f"ERROR: Static render of {path} failed: {e}")
+                return 500, None, set()
+            return response.status_code, response.get_data(), set(g.get("page_cache_tags", ()))
+
+    def _file_for(self, path):
+        parts = [part for part in unquote(path).split("/") if part]
+        if any(part in (".", "..") for part in parts): raise ValueError(f"Unsafe static path: {path}")
+        return os.path.join(self.out_dir, *parts, "index.html")
+
+    def _write(self, path, body):
+        target = self._file_for(path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target + ".tmp", "wb") as f:
+            f.write(body)
+        os.replace(target + ".tmp", target)
+
+    def _remove(self, path):
+        try:
+            os.remove(self._file_for(path))
+        except FileNotFoundError:
+            pass
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self, manifest):
+        os.makedirs(self.out_dir, exist_ok=True)
+        with open(self.manifest_path + ".tmp", "w") as f:
+            json.dump(manifest, f, separators=(",", ":"))
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+        self._write_sitemap(manifest)
+
+    def _write_sitemap(self, manifest):
+        site = WEBSITE_URL.rstrip("/")
+        entries = "".join(f"<url><loc>{xml_escape(site + path)}</loc><lastmod>{entry['updated']}</lastmod></url>" for path, entry in sorted(manifest.items()))
+        with open(os.path.join(self.out_dir, "sitemap.xml.tmp"), "w", encoding="utf-8") as f:
+            f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>\n')
+        os.replace(os.path.join(self.out_dir, "sitemap.xml.tmp"), os.path.join(self.out_dir, "sitemap.xml"))
+
+static_site = StaticSiteBuilder(STATIC_SITE_DIR, STATIC_BUILD_WORKERS)
+
+@app.cli.command("build-static")
+@click.option("--out", "out_dir", default=STATIC_SITE_DIR, show_default=True)
+@click.option("--movie", "movie_ids", multiple=True, help="Only regenerate pages affected by these titles.")
+def build_static_command(out_dir, movie_ids):
+    """Pre-render the public site to static HTML plus sitemap.xml."""
+    invalid = [movie_id for movie_id in movie_ids if not ObjectId.is_valid(movie_id)]
+    if invalid: raise click.BadParameter(f"not a valid id: {', '.join(invalid)}", param_hint="--movie")
+    builder = StaticSiteBuilder(out_dir, STATIC_BUILD_WORKERS)
+    if not movie_ids: return builder.build_all()
+    docs = list(movies.find({"_id": {"$in": [ObjectId(movie_id) for movie_id in movie_ids]}}, CACHE_TAG_PROJECTION))
+    tags = {"shelves", "genres"}.union(*(catalog_tags(doc) for doc in docs))
+    builder.regenerate(tags, [ObjectId(movie_id) for movie_id in movie_ids])
+
+# ======================================================================
+# --- Main Flask Routes ---
+# ======================================================================
+
+@app.route('/')
+@cached_page("shelves")
+def home():
+    query = request.args.get('q')
+    if query:
+        results = [card for card, _ in search_index.search(query)]
+        return render_page("index.html", movies=results, query=f'Results for "{query}"', is_full_page_list=True)
+    context = {**get_homepage_data(), "is_full_page_list": False, "query": ""}
+    return render_page("index.html", **context)
+
+@app.route('/movie/<movie_id>')
+def movie_detail(movie_id):
+    try:
+        obj_id = ObjectId(movie_id)
+    except Exception as e:
+        print(f"Error in movie_detail route: {e}")
+        return "Content not found or invalid ID", 404
+    if not request.environ.get(STATIC_BUILD_ENVIRON): view_counter.record(obj_id)
+    return render_movie_detail(obj_id)
+
+def load_movie_detail(obj_id, season=None):
+    """ডিটেইল পেজ ও API-র ডেটা: (movie, related_movies, seasons, current_season), না পেলে None।"""
+    movie = movies.find_one({"_id": obj_id}, {"related_signature": 0, **(WITHOUT_MEDIA_PROJECTION if EPISODES_IN_COLLECTION else {})})
+    if not movie: return None
+    seasons, current_season = [], None
+    if EPISODES_IN_COLLECTION and movie.get("type") == "series":
+        # এপিসোড শুধু নির্বাচিত সিজনের (ডিফল্ট: সর্বশেষ সিজন) আনা হয়
+        seasons = series_seasons(obj_id)
+        current_season = season if season in seasons else (seasons[-1] if seasons else None)
+        movie["episodes"], movie["season_packs"] = load_series_media(obj_id, current_season)
+    related_ids = [item["_id"] for item in movie.get("related") or []]
+    if related_ids:
+        cards = {card._id: card for card in MovieCard.from_cursor(movies.find({"_id": {"$in": related_ids}}, MovieCard.PROJECTION))}
+        related_movies = [cards[str(related_id)] for related_id in related_ids if str(related_id) in cards]
+    elif movie.get("genres"):
+        related_movies = MovieCard.from_cursor(movies.find({"genres": {"$in": movie["genres"]}, "_id": {"$ne": obj_id}}, MovieCard.PROJECTION).limit(RELATED_LIMIT))
+    else:
+        related_movies = []
+    return movie, related_movies, seasons, current_season
+
+@cached_page()
+def render_movie_detail(obj_id):
+    try:
+        detail = load_movie_detail(obj_id, request.args.get("season", type=int))
+        if not detail: return "Content not found", 404
+        movie, related_movies, seasons, current_season = detail
+        add_cache_tags(*catalog_tags(movie))
+        return render_page("detail.html", movie=movie, trailer_key=movie.get("trailer_key"), related_movies=related_movies, seasons=seasons, current_season=current_season)
+    except Exception as e:
+        print(f"Error in movie_detail route: {e}")
+        return "Content not found or invalid ID", 404
+
+def get_page_args():
+    """`?after=<id>&limit=` থেকে কার্সর ও পেজ সাইজ বের করে।"""
+    after = request.args.get('after', '')
+    try:
+        limit = min(max(int(request.args.get('limit', LIST_PAGE_SIZE)), 1), LIST_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = LIST_PAGE_SIZE
+    return (ObjectId(after) if ObjectId.is_valid(after) else None), limit
+
+def fetch_card_page(query_filter, after_id, limit):
+    """`_id` অনুযায়ী keyset pagination। Returns (cards, next_cursor)."""
+    if after_id:
+        query_filter = {**query_filter, "_id": {"$lt": after_id}}
+    items = MovieCard.from_cursor(movies.find(query_filter, MovieCard.PROJECTION).sort('_id', -1).limit(limit + 1))
+    next_cursor = items[limit - 1]._id if len(items) > limit else None
+    return items[:limit], next_cursor
+
+def render_full_list(query_filter, title):
+    after_id, limit = get_page_args()
+    items, next_cursor = fetch_card_page(query_filter, after_id, limit)
+    next_url = None
+    if next_cursor:
+        page_args = {**request.args.to_dict(), "after": next_cursor, "limit": limit}
+        page_args.pop("format", None)
+        next_url = url_for(request.endpoint, **request.view_args, **page_args)
+    if request.args.get('format') == 'json':
+        return jsonify(items=[{**card.to_dict(), "url": url_for('movie_detail', movie_id=card._id)} for card in items], next=next_cursor, next_url=next_url)
+    return render_page("index.html", movies=items, query=title, is_full_page_list=True, next_url=next_url)
+
+@app.route('/badge/<badge_name>')
+@cached_page()
+def movies_by_badge(badge_name):
+    add_cache_tags(f"badge:{badge_name}")
+    return render_full_list({"poster_badge": badge_name}, f'Tag: {badge_name}')
+
+def all_genres(): return sorted([g for g in movies.distinct("genres") if g])
+
+@app.route('/genres')
+@cached_page("genres")
+def genres_page(): return render_page("genres.html", genres=all_genres(), title="Browse by Genre")
+
+@app.route('/genre/<genre_name>')
+@cached_page()
+def movies_by_genre(genre_name):
+    add_cache_tags(f"genre:{genre_name}")
+    return render_full_list({"genres": genre_name}, f'Genre: {genre_name}')
+
+@app.route('/trending_movies')
+@cached_page("shelves")
+def trending_movies(): return render_full_list({"is_trending": True, "is_coming_soon": {"$ne": True}}, "Trending Now")
+
+@app.route('/movies_only')
+@cached_page("shelves")
+def movies_only(): return render_full_list({"type": "movie", "is_coming_soon": {"$ne": True}}, "All Movies")
+
+@app.route('/webseries')
+@cached_page("shelves")
+def webseries(): return render_full_list({"type": "series", "is_coming_soon": {"$ne": True}}, "All Web Series")
+
+@app.route('/coming_soon')
+@cached_page("shelves")
+def coming_soon(): return render_full_list({"is_coming_soon": True}, "Coming Soon")
+
+@app.route('/recently_added')
+@cached_page("shelves")
+def recently_added_all(): return render_full_list({"is_coming_soon": {"$ne": True}}, "Recently Added")
+
+@app.route('/api/search')
+def api_search():
+    query = request.args.get('q', '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), SEARCH_RESULT_LIMIT)
+    except ValueError:
+        limit = 10
+    started = time.perf_counter()
+    results = search_index.search(query, limit=limit)
+    return jsonify(
+        query=query,
+        results=[{**card.to_dict(), "url": url_for('movie_detail', movie_id=card._id), "score": round(score, 4)} for card, score in results],
+        took_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
+
+# ======================================================================
+# --- Public Read API v1 (versioned JSON, ETag / gzip / brotli) ---
+# ======================================================================
+API_CACHE_CONTROL = "public, max-age=60"
+API_RESPONSE_CACHE_SIZE = 1024
+API_MIN_COMPRESS_BYTES = 1024
+CATALOG_VERSION_TTL = 2  # অন্য ওয়ার্কারের লেখা সর্বোচ্চ এত সেকেন্ড পরে ETag-এ ধরা পড়ে
+
+class CatalogVersion:
+    """
+    `meta` কালেকশনের একটি কাউন্টার, ক্যাটালগে প্রতিটি লেখায় বাড়ে। API-র ETag এটি থেকে তৈরি হয়,
+    তাই ক্লায়েন্টের revalidation-এ কোনো কুয়েরি বা সিরিয়ালাইজেশন লাগে না।
+    """
+    def __init__(self, ttl, name="catalog"):
+        self.ttl = ttl
+        self.name = name
+        self._value = None
+        self._expires_at = 0.0
+
+    def get(self):
+        if self._value is None or self._expires_at <= time.monotonic():
+            doc = meta.find_one({"_id": self.name}, {"version": 1})
+            self._value, self._expires_at = (doc or {}).get("version", 0), time.monotonic() + self.ttl
+        return self._value
+
+    def bump(self):
+        doc = meta.find_one_and_update({"_id": self.name}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER)
+        self._value, self._expires_at = doc["version"], time.monotonic() + self.ttl
+
+catalog_version = CatalogVersion(CATALOG_VERSION_TTL)
+# ভিউ কাউন্ট flush-এ বাড়ে; শুধু যেসব রেসপন্সে view_count থাকে (টাইটেল ডিটেইল) তাদের ETag-এ যোগ হয়
+views_version = CatalogVersion(CATALOG_VERSION_TTL, "views")
+# বিজ্ঞাপন কোড/সেটিংস বদলালে বাড়ে; পেজ ক্যাশ ও SettingsCache দুটোই এটি দেখে
+settings_version = CatalogVersion(CATALOG_VERSION_TTL, "settings")
+
+def api_default(value):
+    if isinstance(value, ObjectId): return str(value)
+    if isinstance(value, datetime): return value.isoformat()
+    if isinstance(value, MovieCard): return value.to_dict()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def api_dumps(payload):
+    """orjson থাকলে সেটি (কয়েকগুণ দ্রুত), নাহলে stdlib json। ObjectId/datetime সরাসরি এনকোড হয়, কপি লাগে না।"""
+    if orjson is not None: return orjson.dumps(payload, default=api_default)
+    return json.dumps(payload, default=api_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+class ApiResponseCache:
+    """(catalog version, path) → এনকোড করা বডি (identity/gzip/br)। ভার্সন বদলালে পুরোনো কী আর মেলে না।"""
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None: self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+
+api_cache = ApiResponseCache(API_RESPONSE_CACHE_SIZE)
+
+def negotiate_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]: return "br"
+    if accepted["gzip"]: return "gzip"
+    return "identity"
+
+def api_response(build, extra_versions=()):
+    """
+    `build()` থেকে JSON রেসপন্স। If-None-Match মিললে build না চালিয়েই 304। ETag weak এবং
+    এনকোডিং-নিরপেক্ষ (Vary: Accept-Encoding আছে), তাই ছোট বডি identity-তে গেলেও 304 মেলে।
+    """
+    version = catalog_version.get()
+    versions = "-".join(str(v) for v in (version, *(extra.get() for extra in extra_versions)))
+    encoding = negotiate_encoding()
+    tag = f"v{versions}-{hashlib.sha1(request.full_path.encode()).hexdigest()[:16]}"
+    headers = {"Cache-Control": API_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if request.if_none_match.contains_weak(tag):
+        response = Response(status=304, headers=headers)
+        response.set_etag(tag, weak=True)
+        return response
+
+    key = (versions, request.full_path)
+    entry = api_cache.get(key)
+    if entry is None:
+        payload = build()
+        if payload is None: return jsonify(error="Not found"), 404
+        entry = {"identity": api_dumps({**payload, "version": version})}
+        api_cache.set(key, entry)
+    body = entry["identity"]
+    if encoding != "identity" and len(body) >= API_MIN_COMPRESS_BYTES:
+        if encoding not in entry:
+            entry[encoding] = brotli.compress(body, quality=5) if encoding == "br" else gzip.compress(body, compresslevel=6)
+        body = entry[encoding]
+        headers["Content-Encoding"] = encoding
+    response = Response(body, mimetype="application/json", headers=headers)
+    response.set_etag(tag, weak=True)
+    return response
+
+def api_list_filter():
+    query_filter = {"is_coming_soon": True} if request.args.get("coming_soon") == "1" else {"is_coming_soon": {"$ne": True}}
+    if request.args.get("type") in ("movie", "series"): query_filter["type"] = request.args["type"]
+    if request.args.get("genre"): query_filter["genres"] = request.args["genre"]
+    if request.args.get("badge"): query_filter["poster_badge"] = request.args["badge"]
+    if request.args.get("trending") == "1": query_filter["is_trending"] = True
+    return query_filter
+
+@app.route('/api/v1/titles')
+def api_titles():
+    def build():
+        after_id, limit = get_page_args()
+        items, next_cursor = fetch_card_page(api_list_filter(), after_id, limit)
+        return {"items": items, "next": next_cursor}
+    return api_response(build)
+
+@app.route('/api/v1/titles/<movie_id>')
+def api_title(movie_id):
+    def build():
+        if not ObjectId.is_valid(movie_id): return None
+        detail = load_movie_detail(ObjectId(movie_id), request.args.get("season", type=int))
+        if not detail: return None
+        movie, related_movies, seasons, current_season = detail
+        movie.pop("related", None)
+        return {"title": movie, "related": related_movies, "seasons": seasons, "current_season": current_season}
+    return api_response(build, (views_version,))
+
+@app.route('/api/v1/genres')
+def api_genres():
+    return api_response(lambda: {"genres": all_genres()})
+
+@app.route('/api/v1/shelves/home')
+def api_home_shelves():
+    return api_response(lambda: get_homepage_data())
+
+# ======================================================================
+# --- Admin and Other Routes ---
+# ======================================================================
+@app.route('/admin', methods=["GET", "POST"])
+@requires_auth
+def admin():
+    if request.method == "POST":
+        user_title = request.form.get("title")
+        content_type = request.form.get("content_type", "movie")
+        tmdb_data = get_tmdb_details_from_api(user_title, content_type) or {}
+        
+        doc_data = {
+            "title": user_title, 
+            "type": content_type,
+            "is_trending": False, 
+            "is_coming_soon": False, 
+            "watch_links": [], "download_links": [], "files": [], "episodes": [], "season_packs": [],
+            "created_at": datetime.now(timezone.utc)
+        }
+        tmdb_data.pop('tmdb_title', None)
+        doc_data.update(tmdb_data)
+
+        if content_type == "movie":
+            doc_data['watch_links'] = parse_links_from_string(request.form.get('watch_links_str'))
+            doc_data['download_links'] = parse_links_from_string(request.form.get('download_links_str'))
+            doc_data['files'] = [{"quality": q, "message_id": int(mid)} for q, mid in zip(request.form.getlist('telegram_quality[]'), request.form.getlist('telegram_message_id[]')) if q and mid]
+        else: # Series
+            doc_data["episodes"] = [{"season": int(s), "episode_number": int(e), "title": t, "watch_links": parse_links_from_string(wl), "download_links": parse_links_from_string(dl), "message_id": int(m) if m else None} for s, e, t, wl, dl, m in zip(request.form.getlist('episode_season[]'), request.form.getlist('episode_number[]'), request.form.getlist('episode_title[]'), request.form.getlist('episode_watch_links_str[]'), request.form.getlist('episode_download_links_str[]'), request.form.getlist('episode_message_id[]'))]
+        
+        media = {field: doc_data.pop(field) for field in SERIES_MEDIA_FIELDS} if EPISODES_IN_COLLECTION else None
+        result = movies.insert_one(doc_data)
+        if media: replace_series_media(result.inserted_id, media["episodes"], media["season_packs"])
+        invalidate_catalog_cache(doc_data)
+        if result.inserted_id:
+            post_to_public_channel(result.inserted_id, post_type='content')
+
+        return redirect(url_for('admin'))
+
+    # কনটেন্ট ও ফিডব্যাক টেবিল /admin/api/* থেকে পেজে পেজে লোড হয়
+    return render_page("admin.html", search_query=request.args.get('search', '').strip())
+
+ADMIN_SORT_FIELDS = {"recent": "_id", "created_at": "created_at", "view_count": "view_count"}
+ADMIN_CONTENT_PROJECTION = {"title": 1, "type": 1, "poster_badge": 1, "created_at": 1, "view_count": 1}
+ADMIN_FEEDBACK_PROJECTION = {"type": 1, "content_title": 1, "message": 1, "email": 1, "timestamp": 1}
+
+def encode_admin_cursor(doc, field):
+    return base64.urlsafe_b64encode(json_util.dumps([doc.get(field), doc["_id"]]).encode()).decode()
+
+def decode_admin_cursor(cursor):
+    try:
+        value, last_id = json_util.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return value, last_id
+    except Exception:
+        return None
+
+def fetch_admin_page(collection, projection, field, cursor, limit, query_filter=None):
+    """
+    (field, _id) অনুযায়ী descending keyset pagination। field না থাকা/null ডকুমেন্ট Mongo-র
+    descending sort-এ সবার শেষে আসে, তাই কার্সরের মান null হলে শুধু null-গুলোর মধ্যেই এগোনো হয়।
+    """
+    query_filter = dict(query_filter or {})
+    sort = [("_id", -1)] if field == "_id" else [(field, -1), ("_id", -1)]
+    position = decode_admin_cursor(cursor) if cursor else None
+    if position:
+        value, last_id = position
+        if field == "_id":
+            query_filter["_id"] = {"$lt": last_id}
+        elif value is None:
+            query_filter.update({field: None, "_id": {"$lt": last_id}})
+        else:
+            query_filter["$or"] = [{field: {"$lt": value}}, {field: value, "_id": {"$lt": last_id}}, {field: None}]
+    docs = list(collection.find(query_filter, projection).sort(sort).limit(limit + 1))
+    next_cursor = encode_admin_cursor(docs[limit - 1], field) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+def admin_json(doc):
+    return {key: (value.isoformat() if isinstance(value, datetime) else str(value) if isinstance(value, ObjectId) else value) for key, value in doc.items()}
+
+@app.route('/admin/api/content')
+@requires_auth
+def admin_api_content():
+    _, limit = get_page_args()
+    search_query = request.args.get('q', '').strip()
+    if search_query:
+        # সার্চ ইনডেক্স র‍্যাঙ্ক অনুযায়ী সাজায়; শুধু ম্যাচ হওয়া আইডিগুলোর ডকুমেন্ট আনা হয়
+        # MovieCard-এ _id স্ট্রিং হিসেবে থাকে; কুয়েরির জন্য ObjectId-তে ফেরাতে হয়
+        ids = [card._id for card, _ in search_index.search(search_query, limit=LIST_MAX_PAGE_SIZE)]
+        object_ids = [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+        by_id = {str(doc["_id"]): doc for doc in movies.find({"_id": {"$in": object_ids}}, ADMIN_CONTENT_PROJECTION)}
+        docs, next_cursor = [by_id[i] for i in ids if i in by_id], None
+    else:
+        field = ADMIN_SORT_FIELDS.get(request.args.get('sort'), "_id")
+        query_filter = {"type": request.args['type']} if request.args.get('type') in ("movie", "series") else None
+        docs, next_cursor = fetch_admin_page(movies, ADMIN_CONTENT_PROJECTION, field, request.args.get('cursor'), limit, query_filter)
+    return jsonify(items=[{**admin_json(doc), "edit_url": url_for('edit_movie', movie_id=str(doc['_id']))} for doc in docs], next=next_cursor)
+
+@app.route('/admin/api/feedback')
+@requires_auth
+def admin_api_feedback():
+    _, limit = get_page_args()
+    docs, next_cursor = fetch_admin_page(feedback, ADMIN_FEEDBACK_PROJECTION, "timestamp", request.args.get('cursor'), limit)
+    return jsonify(items=[{**admin_json(doc), "delete_url": url_for('delete_feedback', feedback_id=str(doc['_id']))} for doc in docs], next=next_cursor)
+
+
+def run_import_job(job_id, path, fmt, announce):
+    """
+    আপলোড করা টেম্প ফাইল স্ট্রিম করে ইমপোর্ট করে। অবস্থা `import_jobs` কালেকশনে থাকে, তাই
+    যেকোনো ওয়ার্কার স্ট্যাটাস দেখাতে পারে।
+    """
+    def progress(report): import_jobs.update_one({"_id": job_id}, {"$set": {"report": report}})
+    with app.app_context():
+        try:
+            with open(path, "rb") as stream:
+                report = import_catalog(iter_import_records(stream, fmt), announce=announce, progress=progress)
+            import_jobs.update_one({"_id": job_id}, {"$set": {"status": "done", "report": report}})
+        except Exception as e:
+            print(f"ERROR: Catalog import {job_id} failed: {e}")
+            import_jobs.update_one({"_id": job_id}, {"$set": {"status": "failed", "error": str(e)}})
+        finally:
+            os.remove(path)
+
+@app.route('/admin/import', methods=['POST'])
+@requires_auth
+def admin_import():
+    upload = request.files.get('catalog_file')
+    if not upload or not upload.filename:
+        return jsonify(error="No file uploaded."), 400
+    # পুরো ফাইল মেমোরিতে না পড়ে টেম্প ফাইলে কপি (চাঙ্কে), জব শেষে মুছে যায়
+    with tempfile.NamedTemporaryFile(prefix="catalog-import-", delete=False) as tmp:
+        upload.save(tmp)
+    job_id = ObjectId()
+    import_jobs.insert_one({"_id": job_id, "status": "running", "file": upload.filename, "started_at": job_id.generation_time, "report": None})
+    args = (job_id, tmp.name, detect_import_format(upload.filename, request.form.get('format')), bool(request.form.get('announce')))
+    # Serverless-এ রেসপন্সের পর থ্রেড চলে না, তাই সেখানে রিকোয়েস্টের ভেতরেই ইমপোর্ট হয়
+    if SERVERLESS: run_import_job(*args)
+    else: threading.Thread(target=run_import_job, args=args, name=f"catalog-import-{job_id}", daemon=True).start()
+    return redirect(url_for('import_status', job_id=str(job_id)))
+
+@app.route('/admin/import/<job_id>')
+@requires_auth
+def import_status(job_id):
+    job = import_jobs.find_one({"_id": ObjectId(job_id)}) if ObjectId.is_valid(job_id) else None
+    if not job: return jsonify(error="Unknown import job."), 404
+    job.pop("_id")
+    job["started_at"] = job["started_at"].isoformat()
+    return jsonify(job_id=job_id, **job)
+
+def invalidate_settings_cache():
+    """`settings`-এ লেখার পর: এই প্রসেসের ক্যাশ মোছে এবং শেয়ার করা ভার্সন বাড়ায়, যাতে অন্য ওয়ার্কারও নতুন কোড নেয়।"""
+    settings_cache.invalidate()
+    page_cache.invalidate("settings")
+    try:
+        settings_version.bump()
+    except Exception as e:
+        print(f"ERROR: Settings version bump failed: {e}")
+
+@app.route('/admin/save_ads', methods=['POST'])
+@requires_auth
+def save_ads():
+    ad_codes = { "popunder_code": request.form.get("popunder_code", ""), "social_bar_code": request.form.get("social_bar_code", ""), "banner_ad_code": request.form.get("banner_ad_code", ""), "native_banner_code": request.form.get("native_banner_code", "") }
+    settings.update_one({}, {"$set": ad_codes}, upsert=True)
+    invalidate_settings_cache()
+    if STATIC_REGENERATE_ON_WRITE: static_site.schedule({"settings"})
+    return redirect(url_for('admin'))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus: METRICS_TOKEN দিয়ে Bearer auth, নাহলে অ্যাডমিন Basic auth
+    auth = request.authorization
+    bearer_ok = METRICS_TOKEN and request.headers.get("Authorization") == f"Bearer {METRICS_TOKEN}"
+    if not bearer_ok and not (auth and check_auth(auth.username, auth.password)):
+        return authenticate()
+    settings_stats, page_stats = settings_cache.stats(), page_cache.stats()
+    gauges = [
+        ("page_cache_entries", "Rendered pages held in the page cache.", page_stats["entries"]),
+        ("settings_cache_hits", "Settings cache hits since start.", settings_stats["hits"]),
+        ("settings_cache_misses", "Settings cache misses since start.", settings_stats["misses"]),
+        ("telegram_queue_depth", "Telegram messages waiting to be sent.", telegram.stats()["queued"]),
+        ("telegram_sent", "Telegram calls that succeeded since start.", telegram.sent),
+        ("webhook_queue_depth", "Webhook updates waiting to be processed.", update_workers.pending()),
+        ("tmdb_cache_hits", "TMDb cache hits since start.", tmdb.hits),
+        ("tmdb_cache_misses", "TMDb cache misses since start.", tmdb.misses),
+        ("deeplink_cache_hits", "Deep-link LRU hits since start.", deeplink_index.hits),
+        ("deeplink_cache_misses", "Deep-link LRU misses since start.", deeplink_index.misses),
+    ]
+    return Response(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
+
+@app.route('/admin/cache_stats')
+@requires_auth
+def cache_stats():
+    return jsonify(settings=settings_cache.stats(), pages=page_cache.stats(), telegram=telegram.stats(), tmdb=tmdb.stats(), deeplinks=deeplink_index.stats())
 
 @app.route('/edit_movie/<movie_id>', methods=["GET", "POST"])
 @requires_auth
@@ -943,6 +3436,8 @@ def edit_movie(movie_id):
     obj_id = ObjectId(movie_id)
     movie_obj = movies.find_one({"_id": obj_id})
     if not movie_obj: return "Movie not found", 404
+    if EPISODES_IN_COLLECTION and movie_obj.get("type") == "series":
+        movie_obj["episodes"], movie_obj["season_packs"] = load_series_media(obj_id)
 
     if request.method == "POST":
         content_type = request.form.get("content_type", "movie")
@@ -960,6 +3455,7 @@ def edit_movie(movie_id):
             update_data["download_links"] = parse_links_from_string(request.form.get('download_links_str'))
             update_data["files"] = [{"quality": q, "message_id": int(mid)} for q, mid in zip(request.form.getlist('telegram_quality[]'), request.form.getlist('telegram_message_id[]')) if q and mid]
             movies.update_one({"_id": obj_id}, {"$set": update_data, "$unset": {"episodes": "", "season_packs": ""}})
+            delete_series_media(obj_id)
         else: # Series
             update_data["episodes"] = [{"season": int(s), "episode_number": int(e), "title": t, "watch_links": parse_links_from_string(wl), "download_links": parse_links_from_string(dl), "message_id": int(m) if m else None} for s, e, t, wl, dl, m in zip(request.form.getlist('episode_season[]'), request.form.getlist('episode_number[]'), request.form.getlist('episode_title[]'), request.form.getlist('episode_watch_links_str[]'), request.form.getlist('episode_download_links_str[]'), request.form.getlist('episode_message_id[]'))]
             update_data["season_packs"] = [{
@@ -973,23 +3469,51 @@ def edit_movie(movie_id):
                 request.form.getlist('pack_download_links_str[]'), 
                 request.form.getlist('pack_message_id[]')
             ) if s]
+            # পুরো অ্যারে $set না করে প্রতি এলিমেন্ট: ফর্মে যা দেখানো হয়েছিল শুধু তার পরিবর্তন লেখা হয়,
+            # তাই ফর্ম খোলা থাকার সময় /addep-এ যোগ হওয়া এপিসোড মুছে যায় না
+            for kind, field, shown_field in (("episode", "episodes", "shown_episode[]"), ("pack", "season_packs", "shown_pack[]")):
+                shown = {parse_media_key(value, kind) for value in request.form.getlist(shown_field)}
+                edit_series_media(obj_id, kind, movie_obj.get(field), shown, update_data.pop(field))
             movies.update_one({"_id": obj_id}, {"$set": update_data, "$unset": {"watch_links": "", "download_links": "", "files": ""}})
+        invalidate_catalog_cache(movie_obj, {**movie_obj, **update_data})
         
         return redirect(url_for('admin'))
 
-    return render_template_string(edit_html, movie=movie_obj)
+    return render_page("edit.html", movie=movie_obj)
 
 
 @app.route('/delete_movie/<movie_id>')
 @requires_auth
 def delete_movie(movie_id):
-    movies.delete_one({"_id": ObjectId(movie_id)})
+    deleted = movies.find_one_and_delete({"_id": ObjectId(movie_id)}, projection=CACHE_TAG_PROJECTION)
+    if deleted:
+        delete_series_media(deleted["_id"])
+        invalidate_catalog_cache(deleted)
     return redirect(url_for('admin'))
 
+@app.route('/admin/export')
+@requires_auth
+def admin_export():
+    return Response(stream_with_context(export_catalog_chunks()), mimetype="application/gzip",
+                    headers={"Content-Disposition": f"attachment; filename={backup_filename()}"})
+
+@app.route('/admin/restore', methods=['POST'])
+@requires_auth
+def admin_restore():
+    upload = request.files.get('backup_file')
+    if not upload or not upload.filename:
+        return jsonify(error="No file uploaded."), 400
+    try:
+        return jsonify(restore_catalog(upload.stream, drop=bool(request.form.get('drop'))))
+    except (ValueError, OSError, EOFError) as e:
+        return jsonify(error=f"Invalid backup file: {e}"), 400
+
 @app.route('/admin/delete_all_movies')
 @requires_auth
 def delete_all_movies():
     movies.delete_many({})
+    delete_series_media()
+    invalidate_catalog_cache()
     return redirect(url_for('admin'))
 
 @app.route('/contact', methods=['GET', 'POST'])
@@ -1004,10 +3528,10 @@ def contact():
             "timestamp": datetime.now(timezone.utc)
         }
         feedback.insert_one(feedback_data)
-        return render_template_string(contact_html, message_sent=True)
+        return render_page("contact.html", message_sent=True)
     prefill_title, prefill_id = request.args.get('title', ''), request.args.get('report_id', '')
     prefill_type = 'Problem Report' if prefill_id else 'Movie Request'
-    return render_template_string(contact_html, message_sent=False, prefill_title=prefill_title, prefill_id=prefill_id, prefill_type=prefill_type)
+    return render_page("contact.html", message_sent=False, prefill_title=prefill_title, prefill_id=prefill_id, prefill_type=prefill_type)
 
 @app.route('/delete_feedback/<feedback_id>')
 @requires_auth
@@ -1016,27 +3540,313 @@ def delete_feedback(feedback_id):
     return redirect(url_for('admin'))
 
 
+# ======================================================================
+# --- Episode Storage (embedded / `episodes` collection) ---
+# ======================================================================
+# EPISODE_STORAGE=collection হলে এপিসোড ও সিজন প্যাক সিরিজ ডকুমেন্টে না রেখে আলাদা `episodes`
+# কালেকশনে রাখা হয় (বড় সিরিজ 16 MB BSON সীমায় পৌঁছায় না)। চালু করার আগে `flask migrate-episodes` চালান।
+EPISODES_IN_COLLECTION = os.environ.get("EPISODE_STORAGE", "embedded").strip().lower() == "collection"
+SERIES_MEDIA_FIELDS = ("episodes", "season_packs")
+# সিরিজের মেটাডেটা লাগে কিন্তু এপিসোড লাগে না এমন জায়গার প্রজেকশন
+WITHOUT_MEDIA_PROJECTION = dict.fromkeys(SERIES_MEDIA_FIELDS, 0)
+EPISODE_DOC_PROJECTION = {"_id": 0, "series_id": 0, "kind": 0}
+PACK_DOC_PROJECTION = {**EPISODE_DOC_PROJECTION, "episode_number": 0}
+
+def media_key(series_id, kind, item):
+    return {"series_id": series_id, "kind": kind, "season": item["season"], "episode_number": item["episode_number"] if kind == "episode" else None}
+
+def write_media(series_id, kind, items):
+    if items:
+        episodes_collection.bulk_write([ReplaceOne(media_key(series_id, kind, item), {**item, **media_key(series_id, kind, item)}, upsert=True) for item in items], ordered=False)
+
+def series_seasons(series_id):
+    """যেসব সিজনে অন্তত একটি এপিসোড আছে, সাজানো।"""
+    return sorted(episodes_collection.distinct("season", {"series_id": series_id, "kind": "episode"}))
+
+def load_series_media(series_id, season=None):
+    """
+    (episodes, season_packs)। `season` দিলে শুধু সেই সিজনের এপিসোড আনা হয়; প্যাক সবসময়
+    সব সিজনের (সংখ্যায় কম)।
+    """
+    episode_filter = {"series_id": series_id, "kind": "episode"}
+    if season is not None: episode_filter["season"] = season
+    episodes = list(episodes_collection.find(episode_filter, EPISODE_DOC_PROJECTION).sort([("season", 1), ("episode_number", 1)]))
+    packs = list(episodes_collection.find({"series_id": series_id, "kind": "pack"}, PACK_DOC_PROJECTION).sort("season", 1))
+    return episodes, packs
+
+def find_episode(series_id, season, episode_number):
+    """/start-এর জন্য একটি এপিসোডের ইনডেক্সড পয়েন্ট লুকআপ।"""
+    if EPISODES_IN_COLLECTION:
+        return episodes_collection.find_one({"series_id": series_id, "kind": "episode", "season": season, "episode_number": episode_number}, EPISODE_DOC_PROJECTION)
+    doc = movies.find_one({"_id": series_id}, {"episodes": {"$elemMatch": {"season": season, "episode_number": episode_number}}})
+    return (doc or {}).get("episodes", [None])[0]
+
+def find_season_pack(series_id, season):
+    if EPISODES_IN_COLLECTION:
+        return episodes_collection.find_one({"series_id": series_id, "kind": "pack", "season": season, "episode_number": None}, PACK_DOC_PROJECTION)
+    doc = movies.find_one({"_id": series_id}, {"season_packs": {"$elemMatch": {"season": season}}})
+    return (doc or {}).get("season_packs", [None])[0]
+
+def upsert_episodes(series_id, episodes):
+    """
+    একই (season, episode_number)-এর পুরোনো এপিসোড বাদ দিয়ে নতুনগুলো যোগ করে — একটিমাত্র
+    pipeline update-এ, তাই মাঝখানে এপিসোড হারিয়ে যাওয়া বা দুই অ্যাডমিনের রেস হয় না (MongoDB 4.2+)।
+    """
+    if EPISODES_IN_COLLECTION:
+        write_media(series_id, "episode", episodes)
+        return True
+    keys = [(ep["season"], ep["episode_number"]) for ep in episodes]
+    return movies.update_one({"_id": series_id}, [{"$set": {"episodes": {"$concatArrays": [
+        {"$filter": {"input": {"$ifNull": ["$episodes", []]}, "as": "ep", "cond": media_key_mismatch("ep", MEDIA_KEY_FIELDS["episode"], keys)}},
+        {"$literal": episodes},
+    ]}}}]).matched_count == 1
+
+def upsert_season_pack(series_id, pack):
+    """একই সিজনের পুরোনো প্যাক বদলে নতুনটা বসায়, এক রাউন্ড-ট্রিপে।"""
+    if EPISODES_IN_COLLECTION:
+        write_media(series_id, "pack", [pack])
+        return True
+    return movies.update_one({"_id": series_id}, [{"$set": {"season_packs": {"$concatArrays": [
+        {"$filter": {"input": {"$ifNull": ["$season_packs", []]}, "as": "pack", "cond": {"$ne": ["$$pack.season", pack["season"]]}}},
+        {"$literal": [pack]},
+    ]}}}]).matched_count == 1
+
+def replace_series_media(series_id, episodes=None, season_packs=None):
+    """অ্যাডমিন এডিট ফর্মের পুরো তালিকা দিয়ে কালেকশনের এপিসোড/প্যাক মেলায় (None হলে সেই ধরন অপরিবর্তিত)।"""
+    for kind, items in (("episode", episodes), ("pack", season_packs)):
+        if items is None: continue
+        write_media(series_id, kind, items)
+        keep = [{"season": item["season"], "episode_number": item["episode_number"] if kind == "episode" else None} for item in items]
+        episodes_collection.delete_many({"series_id": series_id, "kind": kind, **({"$nor": keep} if keep else {})})
+
+MEDIA_KEY_FIELDS = {"episode": ("season", "episode_number"), "pack": ("season",)}
+
+def edit_series_media(series_id, kind, current, shown_keys, items):
+    """
+    অ্যাডমিন এডিট ফর্ম প্রতি-এলিমেন্ট প্রয়োগ করে: ফর্মে দেখানো কিন্তু জমা না দেওয়া এলিমেন্ট মুছে,
+    বদলানো/নতুনগুলো বসিয়ে। ফর্ম খোলার পর /addep-এ যোগ হওয়া এপিসোড (ফর্মে ছিল না) অক্ষত থাকে।
+    এমবেডেড মোডে একটিমাত্র pipeline update, তাই একই সময়ের upsert হারায় না। কিছু লিখলে True।
+    """
+    fields = MEDIA_KEY_FIELDS[kind]
+    key_of = lambda item: tuple(item.get(field) for field in fields)
+    current_by_key = {key_of(item): item for item in current or []}
+    submitted = {key_of(item): item for item in items}
+    changed = [item for key, item in submitted.items() if current_by_key.get(key) != item]
+    removed = [key for key in shown_keys if key not in submitted]
+    if not changed and not removed: return False
+    if EPISODES_IN_COLLECTION:
+        write_media(series_id, kind, changed)
+        if removed:
+            episodes_collection.delete_many({"series_id": series_id, "kind": kind, "$or": [dict(zip(fields, key)) for key in removed]})
+        return True
+    array = "episodes" if kind == "episode" else "season_packs"
+    drop_keys = removed + [key_of(item) for item in changed]
+    movies.update_one({"_id": series_id}, [{"$set": {array: {"$concatArrays": [
+        {"$filter": {"input": {"$ifNull": [f"${array}", []]}, "as": "item", "cond": media_key_mismatch("item", fields, drop_keys)}},
+        {"$literal": changed},
+    ]}}}])
+    return True
+
+def media_key_mismatch(var, fields, keys):
+    """
+    $filter-এর cond: এলিমেন্টের কী `keys`-এর কোনোটির সাথে মেলে না। অনুপস্থিত ফিল্ড null ধরা হয়,
+    তাই 'None' কী-ও মেলে।
+    """
+    field_eq = lambda field, value: {"$eq": [{"$ifNull": [f"$${var}.{field}", None]}, {"$literal": value}]}
+    return {"$not": {"$or": [{"$and": [field_eq(field, value) for field, value in zip(fields, key)]} for key in keys]}}
+
+def parse_media_key(value, kind):
+    """ফর্মের লুকানো 'season:episode' মান → কী টাপল ('None' মানে ফিল্ড ছিল না)।"""
+    parts = [None if part in ("", "None") else int(part) for part in value.split(":")]
+    return tuple(parts[:len(MEDIA_KEY_FIELDS[kind])])
+
+def delete_series_media(*series_ids):
+    if EPISODES_IN_COLLECTION:
+        episodes_collection.delete_many({"series_id": {"$in": list(series_ids)}} if series_ids else {})
+
+def migrate_episodes(batch_size=200):
+    """এমবেডেড episodes/season_packs কালেকশনে সরিয়ে সিরিজ ডকুমেন্ট থেকে মুছে ফেলে। বারবার চালানো নিরাপদ।"""
+    migrated, moved = 0, 0
+    cursor = movies.find({"$or": [{"episodes.0": {"$exists": True}}, {"season_packs.0": {"$exists": True}}]}, {"episodes": 1, "season_packs": 1}).batch_size(batch_size)
+    for series in cursor:
+        write_media(series["_id"], "episode", series.get("episodes") or [])
+        write_media(series["_id"], "pack", series.get("season_packs") or [])
+        movies.update_one({"_id": series["_id"]}, {"$unset": dict.fromkeys(SERIES_MEDIA_FIELDS, "")})
+        migrated += 1
+        moved += len(series.get("episodes") or []) + len(series.get("season_packs") or [])
+        if migrated % 100 == 0: print(f"INFO: Migrated {migrated} series ({moved} episodes/packs)...")
+    movies.update_many({"$or": [{"episodes": []}, {"season_packs": []}]}, {"$unset": dict.fromkeys(SERIES_MEDIA_FIELDS, "")})
+    invalidate_catalog_cache()
+    print(f"SUCCESS: Migrated {moved} episodes/packs from {migrated} series into the episodes collection.")
+    return migrated, moved
+
+@app.cli.command("migrate-episodes")
+def migrate_episodes_command():
+    """Move embedded episodes and season packs into the episodes collection."""
+    episodes_collection.create_indexes(EPISODE_INDEXES)
+    migrate_episodes()
+    if not EPISODES_IN_COLLECTION:
+        print("WARNING: Set EPISODE_STORAGE=collection on every worker, otherwise the site will not see the migrated episodes.")
+
+# ======================================================================
+# --- Deep-link Index (/start payloads) ---
+# ======================================================================
+DEEPLINK_CACHE_SIZE = int(os.environ.get("DEEPLINK_CACHE_SIZE", 50000))
+DEEPLINK_CACHE_TTL = 300  # অন্য ওয়ার্কারের পরিবর্তন সর্বোচ্চ এতক্ষণ পরে দেখা যাবে
+DEEPLINK_MEDIA_PROJECTION = {"files": 1, "episodes.season": 1, "episodes.episode_number": 1, "episodes.message_id": 1,
+                             "season_packs.season": 1, "season_packs.message_id": 1}
+
+def deeplink_payloads(movie_id, files, episodes, season_packs):
+    """ওয়েবসাইটের "Get" বাটনের `start=` পেলোড → message_id।"""
+    links = {f"{movie_id}_{f['quality']}": f["message_id"] for f in files or [] if f.get("quality") and f.get("message_id")}
+    links.update({f"{movie_id}_S{p['season']}": p["message_id"] for p in season_packs or [] if p.get("message_id")})
+    links.update({f"{movie_id}_{e['season']}_{e['episode_number']}": e["message_id"] for e in episodes or [] if e.get("message_id")})
+    return links
+
+class DeepLinkIndex:
+    """
+    `/start` পেলোড → (from_chat_id, message_id)। লেখার সময় `deeplinks` কালেকশনে আগেই হিসাব করে রাখা
+    হয়; পড়ার সময় প্রসেসের LRU থেকে এক ডিকশনারি লুকআপ। LRU-তে না থাকলে কালেকশন, সেখানেও না থাকলে
+    (পুরোনো ডেটা) এপিসোড স্টোরেজ থেকে বের করে সংরক্ষণ করা হয়।
+    """
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, payload):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(payload)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(payload)
+                self.hits += 1
+                return entry[1]
+        self.misses += 1
+        doc = deeplinks.find_one({"_id": payload}, {"from_chat_id": 1, "message_id": 1})
+        link = (doc["from_chat_id"], doc["message_id"]) if doc else self._compute(payload)
+        with self._lock:
+            self._entries[payload] = (now + self.ttl, link)
+            self._entries.move_to_end(payload)
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+        return link
+
+    def sync(self, movie_ids):
+        """এক বা একাধিক টাইটেলের লিংক নতুন করে হিসাব করে কালেকশনে লেখে।"""
+        for movie_id in movie_ids:
+            doc = movies.find_one({"_id": movie_id}, DEEPLINK_MEDIA_PROJECTION) or {}
+            if EPISODES_IN_COLLECTION and doc:
+                episodes, season_packs = load_series_media(movie_id)
+            else:
+                episodes, season_packs = doc.get("episodes"), doc.get("season_packs")
+            links = deeplink_payloads(movie_id, doc.get("files"), episodes, season_packs)
+            if links:
+                deeplinks.bulk_write([ReplaceOne({"_id": payload}, {"movie_id": movie_id, "from_chat_id": ADMIN_CHANNEL_ID, "message_id": message_id}, upsert=True)
+                                      for payload, message_id in links.items()], ordered=False)
+            deeplinks.delete_many({"movie_id": movie_id, "_id": {"$nin": list(links)}})
+            prefix = f"{movie_id}_"
+            with self._lock:
+                for payload in [p for p in self._entries if p.startswith(prefix)]: del self._entries[payload]
+
+    def clear(self):
+        """পুরো ক্যাটালগ বদলালে (রিস্টোর, ইমপোর্ট, সব ডিলিট) — লিংকগুলো প্রথম ক্লিকে আবার তৈরি হবে।"""
+        deeplinks.delete_many({})
+        with self._lock: self._entries.clear()
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _compute(self, payload):
+        parts = payload.split('_')
+        if not ObjectId.is_valid(parts[0]) or len(parts) not in (2, 3): return None
+        movie_id = ObjectId(parts[0])
+        try:
+            if len(parts) == 3:
+                item = find_episode(movie_id, int(parts[1]), int(parts[2]))
+            elif parts[1].startswith('S') and parts[1][1:].isdigit():
+                item = find_season_pack(movie_id, int(parts[1][1:]))
+            else:
+                movie = movies.find_one({"_id": movie_id}, {"files": {"$elemMatch": {"quality": parts[1]}}})
+                item = (movie or {}).get('files', [None])[0]
+        except ValueError:
+            return None
+        if not item or not item.get("message_id"): return None
+        deeplinks.replace_one({"_id": payload}, {"movie_id": movie_id, "from_chat_id": ADMIN_CHANNEL_ID, "message_id": item["message_id"]}, upsert=True)
+        return ADMIN_CHANNEL_ID, item["message_id"]
+
+deeplink_index = DeepLinkIndex(DEEPLINK_CACHE_SIZE, DEEPLINK_CACHE_TTL)
+
+# ======================================================================
+# --- Webhook Command Parsing ---
+# ======================================================================
+def parse_title_part(title_part):
+    """'Name (Year) [Language]' → (title, year, badge)."""
+    lang_match = re.search(r'\[(.*?)\]', title_part)
+    badge = lang_match.group(1).strip() if lang_match else None
+    title_part_cleaned = re.sub(r'\s*\[.*?\]', '', title_part).strip()
+    year_match = re.search(r'\(?(\d{4})\)?$', title_part_cleaned)
+    year, user_title = (year_match.group(1), re.sub(r'\s*\(?\d{4}\)?$', '', title_part_cleaned).strip()) if year_match else (None, title_part_cleaned)
+    return user_title, year, badge
+
+def parse_episode_batch(lines, season_num):
+    """/addeps-এর প্রতিটি লাইন: 'E01 | Watch Links | Download Links' (S01E01-ও চলে)।"""
+    episodes = {}
+    for line in lines:
+        if not line.strip(): continue
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) != 3: raise ValueError(f"Incorrect episode line: {line}")
+        ep_match = re.fullmatch(r'(?:S(\d+))?E(\d+)', parts[0], re.IGNORECASE)
+        if not ep_match: raise ValueError(f"Invalid episode number: {parts[0]}")
+        season = int(ep_match.group(1)) if ep_match.group(1) else season_num
+        episode_num = int(ep_match.group(2))
+        episodes[(season, episode_num)] = {"season": season, "episode_number": episode_num, "title": f"Episode {episode_num}",
+                                           "watch_links": parse_links_from_string(parts[1]), "download_links": parse_links_from_string(parts[2]), "message_id": None}
+    if not episodes: raise ValueError("No episodes given")
+    return list(episodes.values())
+
+
 # ======================================================================
 # --- নতুন Helper ফাংশন: সিরিজ খুঁজে বের করা বা তৈরি করা ---
 # ======================================================================
+def series_matches(series, year=None, tmdb_id=None):
+    """দুই দিকেই সাল/tmdb_id থাকলে সেগুলো মিলতে হবে, নইলে অন্য সিরিজ ধরা হয়।"""
+    if year and series.get("release_date") and str(series["release_date"])[:4] != str(year): return False
+    if tmdb_id and series.get("tmdb_id") and series["tmdb_id"] != tmdb_id: return False
+    return True
+
 def find_or_create_series(user_title, year, badge, chat_id):
     """
     ডাটাবেজে সিরিজ খুঁজে বের করে। না পেলে TMDb থেকে তথ্য নিয়ে নতুন সিরিজ তৈরি করে।
     Returns the series document or None if creation fails.
     """
-    # প্রথমে ডাটাবেজে সিরিজটি খোঁজা হবে
-    series = movies.find_one({"title": {"$regex": f"^{re.escape(user_title)}$", "$options": "i"}, "type": "series"})
+    # প্রথমে ফাজি ইনডেক্সে (বানান-ভেদ, সাল, "Season X" উপেক্ষা করে) সিরিজটি খোঁজা হবে
+    # কড়া সীমা কী ও চূড়ান্ত স্কোর দুটোতেই, যাতে "Lucky" → "Loki"-র মতো ভুল মিল না হয়
+    match = search_index.match_title(user_title, content_type="series", min_similarity=SERIES_MATCH_MIN_SIMILARITY, min_score=SERIES_MATCH_MIN_SIMILARITY)
+    series = movies.find_one({"_id": ObjectId(match[0]), "type": "series"}, WITHOUT_MEDIA_PROJECTION) if match else None
+    if series and not series_matches(series, year): series = None
+    tmdb_data = None
+    if series and match[1] < 1.0:
+        # হুবহু মিল নয়: TMDb (ক্যাশড) একই সিরিজ বললেই কেবল পুরোনোটায় লেখা হবে
+        tmdb_data = get_tmdb_details_from_api(user_title, "series", year)
+        if tmdb_data and not series_matches(series, tmdb_id=tmdb_data.get("tmdb_id")): series = None
+    if not series:
+        # ইনডেক্স পুরোনো হলে (অন্য ওয়ার্কারে সদ্য তৈরি সিরিজ) ডাটাবেজে সরাসরি খোঁজা
+        series = movies.find_one({"title": {"$regex": f"^{re.escape(user_title)}$", "$options": "i"}, "type": "series"}, WITHOUT_MEDIA_PROJECTION)
+        if series and not series_matches(series, year): series = None
     if series:
-        print(f"INFO: Found existing series '{user_title}' in DB.")
+        print(f"INFO: Found existing series '{series['title']}' in DB for '{user_title}'.")
         return series
 
     # যদি সিরিজটি ডাটাবেজে না থাকে
     print(f"INFO: Series '{user_title}' not in DB. Creating new entry.")
-    requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': f"⏳ Series page for `{user_title}` not found. Creating it now...", 'parse_mode': 'Markdown'})
+    telegram.send_message(chat_id, f"⏳ Series page for `{user_title}` not found. Creating it now...", parse_mode='Markdown')
     
-    tmdb_data = get_tmdb_details_from_api(user_title, "series", year)
+    tmdb_data = tmdb_data or get_tmdb_details_from_api(user_title, "series", year)
     if not tmdb_data:
-        requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': f"❌ TMDb search failed for '{user_title}'. Cannot create series."})
+        telegram.send_message(chat_id, f"❌ TMDb search failed for '{user_title}'. Cannot create series.")
         return None
 
     final_languages = [badge.title()] if badge else tmdb_data.get('languages', [])
@@ -1048,29 +3858,68 @@ def find_or_create_series(user_title, year, badge, chat_id):
         "type": "series",
         "languages": final_languages,
         "poster_badge": badge,
-        "episodes": [],
-        "season_packs": [],
         "created_at": datetime.now(timezone.utc)
     }
     
-    result = movies.update_one({"tmdb_id": tmdb_data["tmdb_id"], "type": "series"}, {"$set": series_doc}, upsert=True)
+    series_filter = {"tmdb_id": tmdb_data["tmdb_id"], "type": "series"}
+    # একই tmdb_id-র সিরিজ আগে থেকে থাকলে তার এপিসোড মুছে না যায়, তাই খালি অ্যারে শুধু নতুন ডকুমেন্টে
+    update = {"$set": series_doc} if EPISODES_IN_COLLECTION else {"$set": series_doc, "$setOnInsert": dict.fromkeys(SERIES_MEDIA_FIELDS, [])}
+    previous = movies.find_one_and_update(series_filter, update, projection=CACHE_TAG_PROJECTION, upsert=True)
+    # সর্বশেষ আপডেটেড ডকুমেন্টটি ডাটাবেজ থেকে আবার আনা হচ্ছে
+    series = movies.find_one(series_filter, WITHOUT_MEDIA_PROJECTION)
+    invalidate_catalog_cache(previous, series)
     
-    if result.upserted_id:
-        post_to_public_channel(result.upserted_id, post_type='content')
+    if previous is None:
+        post_to_public_channel(series['_id'], post_type='content')
         print(f"SUCCESS: Created new series '{user_title}' and posted to channel.")
-        requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': f"✅ Successfully created series page for `{user_title}`.", 'parse_mode': 'Markdown'})
+        telegram.send_message(chat_id, f"✅ Successfully created series page for `{user_title}`.", parse_mode='Markdown')
     
-    # সর্বশেষ আপডেটেড ডকুমেন্টটি ডাটাবেজ থেকে আবার আনা হচ্ছে
-    return movies.find_one({"tmdb_id": tmdb_data["tmdb_id"], "type": "series"})
+    return series
 
 
 # ======================================================================
 # --- Webhook Route (FINAL VERSION) ---
 # ======================================================================
+def update_chat_key(data):
+    """একই চ্যাটের আপডেট একই ওয়ার্কারে যায়, তাই ক্রম বজায় থাকে।"""
+    for field in ('message', 'edited_message', 'channel_post'):
+        if field in data: return data[field].get('chat', {}).get('id')
+    return data.get('update_id')
+
+def is_new_update(update_id):
+    """update_id আগে দেখা হলে False। Telegram ধীর উত্তরে একই আপডেট আবার পাঠায়।"""
+    try:
+        webhook_updates.insert_one({"_id": update_id, "received_at": datetime.now(timezone.utc)})
+    except DuplicateKeyError:
+        return False
+    except Exception as e:
+        print(f"WARNING: Could not record webhook update {update_id}: {e}")
+    return True
+
+def run_update(data):
+    with app.app_context():
+        try:
+            process_update(data)
+        except Exception as e:
+            print(f"ERROR: Failed to process update {data.get('update_id')}: {e}")
+
 @app.route('/webhook', methods=['POST'])
 def telegram_webhook():
-    data = request.get_json()
+    if WEBHOOK_SECRET and request.headers.get('X-Telegram-Bot-Api-Secret-Token') != WEBHOOK_SECRET:
+        return jsonify(status='forbidden'), 403
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('update_id'), int):
+        return jsonify(status='ignored')
+    if not is_new_update(data['update_id']):
+        return jsonify(status='duplicate')
 
+    if WEBHOOK_ASYNC:
+        update_workers.submit(update_chat_key(data), run_update, data)
+    else:
+        run_update(data)
+    return jsonify(status='ok')
+
+def process_update(data):
     if 'channel_post' in data:
         pass # চ্যানেল পোস্ট এখানে হ্যান্ডেল করা হয় না
 
@@ -1084,43 +3933,26 @@ def telegram_webhook():
             payload_str = text.split(' ', 1)[-1]
             if payload_str != '/start':
                 try:
-                    parts = payload_str.split('_')
-                    movie_id_str = parts[0]
-                    movie = movies.find_one({"_id": ObjectId(movie_id_str)})
-                    if not movie: raise ValueError("Movie not found")
-
-                    if len(parts) == 2 and parts[1].startswith('S'): # Season pack
-                        season_num = int(parts[1][1:])
-                        pack = next((p for p in movie.get('season_packs', []) if p['season'] == season_num), None)
-                        if pack and pack.get('message_id'):
-                            requests.post(f"{TELEGRAM_API_URL}/copyMessage", json={'chat_id': chat_id, 'from_chat_id': ADMIN_CHANNEL_ID, 'message_id': pack['message_id']})
-                        else:
-                            requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': "Sorry, this season pack is not available via Telegram. Please check the website for direct links."})
-                    
-                    elif len(parts) == 2: # Movie file
-                        quality = parts[1]
-                        file_info = next((f for f in movie.get('files', []) if f['quality'] == quality), None)
-                        if file_info:
-                            requests.post(f"{TELEGRAM_API_URL}/copyMessage", json={'chat_id': chat_id, 'from_chat_id': ADMIN_CHANNEL_ID, 'message_id': file_info['message_id']})
-                    
-                    elif len(parts) == 3: # Series episode
-                        season, episode = int(parts[1]), int(parts[2])
-                        ep_info = next((e for e in movie.get('episodes', []) if e['season'] == season and e['episode_number'] == episode), None)
-                        if ep_info and ep_info.get('message_id'):
-                            requests.post(f"{TELEGRAM_API_URL}/copyMessage", json={'chat_id': chat_id, 'from_chat_id': ADMIN_CHANNEL_ID, 'message_id': ep_info['message_id']})
+                    # প্রিকম্পিউটেড ডিপ-লিংক ইনডেক্স: সাধারণত শুধু এক ডিকশনারি লুকআপ
+                    link = deeplink_index.resolve(payload_str)
+                    if link:
+                        from_chat_id, message_id = link
+                        telegram.send("copyMessage", chat_id=chat_id, from_chat_id=from_chat_id, message_id=message_id)
+                    elif re.fullmatch(r'[0-9a-f]{24}_S\d+', payload_str): # Season pack
+                        telegram.send_message(chat_id, "Sorry, this season pack is not available via Telegram. Please check the website for direct links.")
 
                 except Exception as e:
                     print(f"Error processing start payload: {e}")
             else:
                  welcome_text = (f"👋 Welcome!\n\nI am {BOT_USERNAME}, your assistant for finding movies and series.\n\n"
                                  f"🌐 Please visit our website to browse thousands of titles.")
-                 requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': welcome_text, 'disable_web_page_preview': 'true'})
+                 telegram.send_message(chat_id, welcome_text, disable_web_page_preview=True)
             
-            return jsonify(status='ok')
+            return
 
         # --- Admin-only commands ---
         if str(chat_id) not in ADMIN_USER_IDS:
-            return jsonify(status='ok')
+            return
         
         # --- /add command (for Movies) ---
         if text.startswith('/add '):
@@ -1136,33 +3968,35 @@ def telegram_webhook():
                 year_match = re.search(r'\(?(\d{4})\)?$', title_part_cleaned)
                 year, user_title = (year_match.group(1), re.sub(r'\s*\(?\d{4}\)?$', '', title_part_cleaned).strip()) if year_match else (None, title_part_cleaned)
 
-                requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': f"⏳ Searching for `{user_title}`...", 'parse_mode': 'Markdown'})
+                telegram.send_message(chat_id, f"⏳ Searching for `{user_title}`...", parse_mode='Markdown')
                 tmdb_data = get_tmdb_details_from_api(user_title, "movie", year)
                 
                 if not tmdb_data:
-                    requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': f"❌ Sorry, could not find any movie named '{user_title}'."})
-                    return jsonify(status='ok')
+                    telegram.send_message(chat_id, f"❌ Sorry, could not find any movie named '{user_title}'.")
+                    return
                 
                 final_languages = [badge.title()] if badge else tmdb_data.get('languages', [])
 
                 tmdb_data.pop('tmdb_title', None)
                 movie_doc = {**tmdb_data, "title": user_title, "type": "movie", "languages": final_languages, "poster_badge": badge, "watch_links": parse_links_from_string(watch_links_str), "download_links": parse_links_from_string(download_links_str), "created_at": datetime.now(timezone.utc)}
                 
-                result = movies.update_one({"tmdb_id": tmdb_data["tmdb_id"]}, {"$set": movie_doc}, upsert=True)
+                previous = movies.find_one_and_update({"tmdb_id": tmdb_data["tmdb_id"]}, {"$set": movie_doc}, projection=CACHE_TAG_PROJECTION, upsert=True)
+                saved = movies.find_one({"tmdb_id": tmdb_data["tmdb_id"]}, CACHE_TAG_PROJECTION)
+                invalidate_catalog_cache(previous, saved)
                 
-                content_id_to_post = result.upserted_id or movies.find_one({"tmdb_id": tmdb_data["tmdb_id"]})['_id']
+                content_id_to_post = saved['_id']
                 post_to_public_channel(content_id_to_post, post_type='content')
                 
-                requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': f"✅ Successfully added/updated `{user_title}` to the website.", 'parse_mode': 'Markdown'})
+                telegram.send_message(chat_id, f"✅ Successfully added/updated `{user_title}` to the website.", parse_mode='Markdown')
             except Exception as e:
                 print(f"Error in /add command: {e}")
-                requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': "❌ Wrong format! Use `/add` for help."})
+                telegram.send_message(chat_id, "❌ Wrong format! Use `/add` for help.")
         
         elif text == '/add':
             reply_text = (f"👇 Use the format below to add a movie:\n\n"
                           f"`/add Movie Name (Year) [Language] | Watch Links | Download Links`\n\n"
                           f"*Separate multiple links with commas. E.g., `Hindi: url, Bangla: url`*")
-            requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': reply_text, 'parse_mode': 'Markdown'})
+            telegram.send_message(chat_id, reply_text, parse_mode='Markdown')
 
         # --- নতুন: /addep command (for Series Episodes) ---
         elif text.startswith('/addep '):
@@ -1185,7 +4019,7 @@ def telegram_webhook():
                 # সিরিজ খুঁজে বের করা বা তৈরি করা
                 series = find_or_create_series(user_title, year, badge, chat_id)
                 if not series:
-                    return jsonify(status='ok') # Helper function already sent an error message
+                    return # Helper function already sent an error message
 
                 series_id = series['_id']
                 new_episode = {
@@ -1196,19 +4030,50 @@ def telegram_webhook():
                     "download_links": parse_links_from_string(download_links_str), 
                     "message_id": None
                 }
-                # পুরোনো এপিসোড থাকলে ডিলেট করে নতুনটা যোগ করা
-                movies.update_one({"_id": series_id}, {"$pull": {"episodes": {"season": season_num, "episode_number": episode_num}}})
-                movies.update_one({"_id": series_id}, {"$push": {"episodes": new_episode}})
+                # পুরোনো এপিসোড থাকলে একই আপডেটে বদলে যায়
+                upsert_episodes(series_id, [new_episode])
+                invalidate_catalog_cache(series)
                 
-                requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': f"✅ Successfully added S{season_num:02d}E{episode_num:02d} to `{series['title']}`.", 'parse_mode': 'Markdown'})
+                telegram.send_message(chat_id, f"✅ Successfully added S{season_num:02d}E{episode_num:02d} to `{series['title']}`.", parse_mode='Markdown')
             except Exception as e:
                 print(f"Error in /addep command: {e}")
-                requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': "❌ Wrong format! Use `/addep` for help."})
+                telegram.send_message(chat_id, "❌ Wrong format! Use `/addep` for help.")
 
         elif text == '/addep':
             reply_text = (f"👇 Use this format to add an episode (it will create the series if it doesn't exist):\n\n"
                           f"`/addep Series Name (Year) [Language] | S01E01 | Watch Links | Download Links`")
-            requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': reply_text, 'parse_mode': 'Markdown'})
+            telegram.send_message(chat_id, reply_text, parse_mode='Markdown')
+
+        # --- /addeps command (একটি মেসেজে পুরো সিজনের এপিসোড) ---
+        elif text.startswith('/addeps '):
+            try:
+                header, *episode_lines = text.split('/addeps ', 1)[1].split('\n')
+                parts = [p.strip() for p in header.split('|')]
+                if len(parts) != 2: raise ValueError("Incorrect format")
+                user_title, year, badge = parse_title_part(parts[0])
+
+                se_match = re.fullmatch(r'S(\d+)', parts[1], re.IGNORECASE)
+                if not se_match: raise ValueError("Invalid season format. Use S01.")
+                new_episodes = parse_episode_batch(episode_lines, int(se_match.group(1)))
+
+                series = find_or_create_series(user_title, year, badge, chat_id)
+                if not series:
+                    return
+
+                upsert_episodes(series['_id'], new_episodes)
+                invalidate_catalog_cache(series)
+
+                telegram.send_message(chat_id, f"✅ Successfully added {len(new_episodes)} episodes to `{series['title']}`.", parse_mode='Markdown')
+            except Exception as e:
+                print(f"Error in /addeps command: {e}")
+                telegram.send_message(chat_id, "❌ Wrong format! Use `/addeps` for help.")
+
+        elif text == '/addeps':
+            reply_text = (f"👇 Use this format to add many episodes at once (one episode per line):\n\n"
+                          f"`/addeps Series Name (Year) [Language] | S01\n"
+                          f"E01 | Watch Links | Download Links\n"
+                          f"E02 | Watch Links | Download Links`")
+            telegram.send_message(chat_id, reply_text, parse_mode='Markdown')
 
         # --- নতুন: /addpack command (for Season Packs) ---
         elif text.startswith('/addpack '):
@@ -1231,7 +4096,7 @@ def telegram_webhook():
                 # সিরিজ খুঁজে বের করা বা তৈরি করা
                 series = find_or_create_series(user_title, year, badge, chat_id)
                 if not series:
-                    return jsonify(status='ok')
+                    return
 
                 new_pack = {
                     "season": season_num, 
@@ -1240,23 +4105,21 @@ def telegram_webhook():
                     "message_id": None
                 }
                 
-                # পুরোনো প্যাক থাকলে ডিলেট করে নতুনটা যোগ করা
-                movies.update_one({"_id": series['_id']}, {"$pull": {"season_packs": {"season": season_num}}})
-                movies.update_one({"_id": series['_id']}, {"$push": {"season_packs": new_pack}})
+                # পুরোনো প্যাক থাকলে একই আপডেটে বদলে যায়
+                upsert_season_pack(series['_id'], new_pack)
+                invalidate_catalog_cache(series)
                 
                 post_to_public_channel(series['_id'], post_type='season_pack', season_num=season_num)
 
-                requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': f"✅ Successfully added Season {season_num} pack to `{series['title']}` and posted to channel.", 'parse_mode': 'Markdown'})
+                telegram.send_message(chat_id, f"✅ Successfully added Season {season_num} pack to `{series['title']}` and posted to channel.", parse_mode='Markdown')
             except Exception as e:
                 print(f"Error in /addpack command: {e}")
-                requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': "❌ Wrong format! Use `/addpack` for help."})
+                telegram.send_message(chat_id, "❌ Wrong format! Use `/addpack` for help.")
 
         elif text == '/addpack':
             reply_text = (f"👇 Use this format to add a season pack (it will create the series if it doesn't exist):\n\n"
                           f"`/addpack Series Name (Year) [Language] | S01 | Watch Links | Download Links`")
-            requests.get(f"{TELEGRAM_API_URL}/sendMessage", params={'chat_id': chat_id, 'text': reply_text, 'parse_mode': 'Markdown'})
-
-    return jsonify(status='ok')
+            telegram.send_message(chat_id, reply_text, parse_mode='Markdown')
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
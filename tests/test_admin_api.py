@@ -0,0 +1,78 @@
+import base64
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("flask")
+mongomock = pytest.importorskip("mongomock")
+import pymongo  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+for _name in ("BOT_TOKEN", "TMDB_API_KEY", "ADMIN_CHANNEL_ID", "BOT_USERNAME", "ADMIN_USERNAME",
+              "ADMIN_PASSWORD", "ADMIN_USER_IDS", "MAIN_CHANNEL_LINK", "UPDATE_CHANNEL_LINK",
+              "DEVELOPER_USER_LINK", "PUBLIC_CHANNEL_ID", "WEBSITE_URL"):
+    os.environ.setdefault(_name, "test")
+os.environ.setdefault("MONGO_URI", "mongodb://127.0.0.1:27017")
+os.environ["MONGO_DB_NAME"] = "moviezone_test"
+pymongo.MongoClient = mongomock.MongoClient
+
+import bot  # noqa: E402
+
+AUTH = {"Authorization": "Basic " + base64.b64encode(f"{bot.ADMIN_USERNAME}:{bot.ADMIN_PASSWORD}".encode()).decode()}
+
+
+@pytest.fixture()
+def client():
+    bot.movies.delete_many({})
+    bot.movies.insert_many([{"title": f"Movie {i}", "type": "movie"} for i in range(30)]
+                           + [{"title": "Dark Shadows", "type": "series"}])
+    bot.search_index.mark_stale()
+    return bot.app.test_client()
+
+
+def test_admin_search_returns_matching_titles(client):
+    response = client.get("/admin/api/content?q=Dark Shadows", headers=AUTH)
+    assert response.status_code == 200
+    titles = [item["title"] for item in response.get_json()["items"]]
+    assert titles and titles[0] == "Dark Shadows"
+
+
+def test_admin_search_items_have_edit_urls(client):
+    items = client.get("/admin/api/content?q=Movie", headers=AUTH).get_json()["items"]
+    assert items
+    assert all(item["edit_url"].startswith("/edit_movie/") for item in items)
+
+
+def episode(season, number):
+    return {"season": season, "episode_number": number, "title": f"Episode {number}",
+            "watch_links": [], "download_links": [], "message_id": None}
+
+
+def stored_episodes(series_id):
+    if bot.EPISODES_IN_COLLECTION:
+        return {(ep["season"], ep["episode_number"]) for ep in bot.load_series_media(series_id)[0]}
+    return {(ep["season"], ep["episode_number"]) for ep in bot.movies.find_one({"_id": series_id})["episodes"]}
+
+
+@pytest.mark.parametrize("in_collection", [False, True], ids=["embedded", "collection"])
+def test_edit_series_keeps_episodes_added_while_form_was_open(client, monkeypatch, in_collection):
+    monkeypatch.setattr(bot, "EPISODES_IN_COLLECTION", in_collection)
+    bot.episodes_collection.delete_many({})
+    series_id = bot.movies.insert_one({"title": "Open Form", "type": "series"}).inserted_id
+    bot.upsert_episodes(series_id, [episode(1, 1), episode(1, 2)])
+
+    form_page = client.get(f"/edit_movie/{series_id}", headers=AUTH).get_data(as_text=True)
+    assert 'name="shown_episode[]" value="1:1"' in form_page and 'name="shown_episode[]" value="1:2"' in form_page
+    # ফর্ম খোলা থাকার সময় /addep যা লেখে
+    bot.upsert_episodes(series_id, [episode(1, 3)])
+
+    # অ্যাডমিন ফর্ম থেকে S01E02 সরিয়ে সেভ করে
+    response = client.post(f"/edit_movie/{series_id}", headers=AUTH, data={
+        "title": "Open Form", "content_type": "series",
+        "shown_episode[]": ["1:1", "1:2"],
+        "episode_season[]": ["1"], "episode_number[]": ["1"], "episode_title[]": ["Episode 1"],
+        "episode_watch_links_str[]": [""], "episode_download_links_str[]": [""], "episode_message_id[]": [""],
+    })
+    assert response.status_code == 302
+    assert stored_episodes(series_id) == {(1, 1), (1, 3)}